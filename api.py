@@ -0,0 +1,452 @@
+"""API JSON des disponibilités et des réservations pour les channel managers
+
+Service asyncio autonome (bibliothèque standard uniquement) à lancer à côté de
+app.py sur la même base. Les lectures s'exécutent dans un pool de threads
+lecteurs, chacun avec sa connexion WAL ; les écritures passent toutes par un
+unique thread écrivain, donc sans attente de verrou entre elles. Les
+recherches de disponibilité sont gardées en cache TTL_CACHE_SECONDES,
+déjà sérialisées en JSON ; une écriture n'invalide que les périodes qui
+chevauchent les dates de la réservation touchée.
+
+Routes :
+    GET    /sante
+    GET    /disponibilites?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ
+    GET    /clients?q=texte[&limite=20]
+    GET    /reservations/<id>
+    POST   /reservations         {"id_client", "date_debut", "date_fin", "chambres"}
+    PATCH  /reservations/<id>    {"date_debut", "date_fin"[, "chambres"]}
+    DELETE /reservations/<id>
+    POST   /reservations/suppression  {"ids"}               (suppression groupée, une transaction)
+    POST   /clients/suppression       {"ids"[, "cascade"]}  (refusée si un client a des réservations,
+                                                              sauf cascade : elles sont supprimées aussi)
+
+Usage : python api.py --port 8080  (la base est désignée par HOTEL_DB)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import booking
+import profiling
+from archive import attacher_archive, clients_avec_archives
+from availability import REQUETE_CHAMBRES_DISPONIBLES
+from booking import ChambreIndisponible, ReservationInvalide
+from db import DB_PATH, ConnectionPool
+from migrations import migrer
+from search import rechercher_clients
+
+NB_LECTEURS = int(os.environ.get('HOTEL_API_LECTEURS', 8))
+# 0 désactive le cache des disponibilités
+TTL_CACHE_SECONDES = float(os.environ.get('HOTEL_API_CACHE_TTL', 2))
+TAILLE_MAX_CORPS = 64 * 1024
+MAX_ENTREES_CACHE = 4096
+
+MESSAGES_STATUT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class ErreurRequete(Exception):
+    """Requête refusée : porte le statut HTTP à renvoyer"""
+
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+def _date(valeur, nom):
+    """Convertit un paramètre AAAA-MM-JJ en date (400 si absent ou invalide)"""
+    try:
+        return date.fromisoformat(valeur)
+    except (TypeError, ValueError):
+        raise ErreurRequete(400, f"Paramètre {nom} invalide : date AAAA-MM-JJ attendue") from None
+
+
+def _periode(debut, fin):
+    """Valide une période [debut, fin) et la retourne en dates"""
+    debut, fin = _date(debut, 'date_debut'), _date(fin, 'date_fin')
+    if debut >= fin:
+        raise ErreurRequete(400, "La date de départ doit être postérieure à la date d'arrivée")
+    return debut, fin
+
+
+def _entier(valeur, nom):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ErreurRequete(400, f"Paramètre {nom} invalide : entier attendu") from None
+
+
+def _ids(valeur, nom):
+    """Valide une liste non vide d'identifiants"""
+    if not isinstance(valeur, list) or not valeur:
+        raise ErreurRequete(400, f"Paramètre {nom} invalide : liste d'identifiants attendue")
+    return [_entier(identifiant, nom) for identifiant in valeur]
+
+
+def _chambres(valeur):
+    """Valide la liste des chambres ; une chambre citée deux fois n'est réservée qu'une fois"""
+    return list(dict.fromkeys(_ids(valeur, 'chambres')))
+
+
+def _json(donnees):
+    return json.dumps(donnees, ensure_ascii=False).encode('utf-8')
+
+
+def lire_disponibilites(cursor, debut, fin):
+    """Corps JSON de la recherche de disponibilité, produit directement par SQLite
+
+    Requête de availability.chambres_disponibles, dont les lignes sont
+    sérialisées dans SQLite : pas de dict Python par chambre, et le GIL est
+    libéré pendant tout le calcul, ce qui laisse les lecteurs travailler en
+    parallèle. Le résultat est mis en cache tel quel.
+    """
+    cursor.execute(f'''
+    SELECT json_object('debut', ?, 'fin', ?, 'chambres', json_group_array(json_object(
+        'id_chambre', id_chambre, 'numero', numero, 'etage', etage, 'ville', ville, 'type', libelle,
+        'prix_base', prix_base, 'id_hotel', id_hotel, 'id_type', id_type
+    )))
+    FROM ({REQUETE_CHAMBRES_DISPONIBLES})
+    ''', (debut.isoformat(), fin.isoformat(), debut.isoformat(), fin.isoformat()))
+    return cursor.fetchone()[0].encode('utf-8')
+
+
+def lire_clients(cursor, texte, limite):
+    colonnes = ('id_client', 'nom', 'adresse', 'ville', 'code_postal', 'email', 'telephone')
+    return {'clients': [dict(zip(colonnes, ligne)) for ligne in rechercher_clients(cursor, texte, limite)]}
+
+
+def lire_reservation(cursor, id_reservation):
+    """Retourne la réservation et ses chambres, ou None si elle n'existe pas"""
+    cursor.execute("SELECT date_debut, date_fin, id_client FROM Reservation WHERE id_reservation = ?",
+                   (id_reservation,))
+    ligne = cursor.fetchone()
+    if ligne is None:
+        return None
+    cursor.execute("SELECT id_chambre FROM ReservationChambre WHERE id_reservation = ? ORDER BY id_chambre",
+                   (id_reservation,))
+    return {'id_reservation': id_reservation, 'date_debut': ligne[0], 'date_fin': ligne[1],
+            'id_client': ligne[2], 'chambres': [id_chambre for id_chambre, in cursor.fetchall()]}
+
+
+def _periode_reservation(conn, id_reservation):
+    """Période actuelle d'une réservation (404 si elle n'existe pas)"""
+    reservation = lire_reservation(conn.cursor(), id_reservation)
+    if reservation is None:
+        raise ErreurRequete(404, f"La réservation {id_reservation} n'existe pas")
+    return date.fromisoformat(reservation['date_debut']), date.fromisoformat(reservation['date_fin'])
+
+
+# Écritures exécutées sur le thread écrivain : chacune retourne (résultat, périodes dont la disponibilité a changé)
+
+def creer(conn, id_client, debut, fin, chambres):
+    return booking.creer_reservation(conn, id_client, debut, fin, chambres), [(debut, fin)]
+
+
+def modifier(conn, id_reservation, debut, fin, chambres):
+    ancienne = _periode_reservation(conn, id_reservation)
+    booking.modifier_reservation(conn, id_reservation, debut, fin, chambres)
+    return lire_reservation(conn.cursor(), id_reservation), [ancienne, (debut, fin)]
+
+
+def annuler(conn, id_reservation):
+    ancienne = _periode_reservation(conn, id_reservation)
+    booking.supprimer_reservation(conn, id_reservation)
+    return None, [ancienne]
+
+
+def _periode_englobante(conn, colonne, ids):
+    """Période qui couvre toutes les réservations dont `colonne` est dans `ids` (aucune si pas de réservation)"""
+    debut, fin = conn.execute(
+        f"SELECT MIN(date_debut), MAX(date_fin) FROM Reservation WHERE {colonne} IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),)
+    ).fetchone()
+    return [] if debut is None else [(date.fromisoformat(debut), date.fromisoformat(fin))]
+
+
+def annuler_plusieurs(conn, ids):
+    periodes = _periode_englobante(conn, 'id_reservation', ids)
+    return {'supprimees': booking.supprimer_reservations(conn, ids)}, periodes
+
+
+def supprimer_clients(conn, ids, cascade):
+    periodes = _periode_englobante(conn, 'id_client', ids) if cascade else []
+    try:
+        nb_clients, nb_reservations = booking.supprimer_clients(conn, ids, cascade)
+    except sqlite3.IntegrityError:
+        raise ErreurRequete(409, "Un des clients a des réservations (\"cascade\": true pour les supprimer aussi)") from None
+    return {'clients_supprimes': nb_clients, 'reservations_supprimees': nb_reservations}, periodes
+
+
+class CacheDisponibilites:
+    """Réponses de disponibilité par période [debut, fin), valables TTL_CACHE_SECONDES
+
+    Une écriture retire les périodes qui chevauchent les siennes, y compris
+    les lectures encore en cours (leur résultat ne sera pas conservé). Les
+    demandes simultanées d'une même période partagent une seule requête SQL.
+    """
+
+    def __init__(self, ttl=TTL_CACHE_SECONDES):
+        self.ttl = ttl
+        self._entrees = {}
+        self._en_cours = {}
+        self._perimees = set()
+        self.succes = 0
+        self.echecs = 0
+
+    def invalider(self, periodes=None):
+        """Retire les périodes qui chevauchent l'une de `periodes` (toutes si None)"""
+        def touchee(cle):
+            return periodes is None or any(cle[0] < fin and debut < cle[1] for debut, fin in periodes)
+
+        for cle in [cle for cle in self._entrees if touchee(cle)]:
+            del self._entrees[cle]
+        for cle in [cle for cle in self._en_cours if touchee(cle)]:
+            self._perimees.add(self._en_cours.pop(cle))
+
+    async def obtenir(self, cle, calculer):
+        entree = self._entrees.get(cle)
+        if entree is not None and entree[0] > time.monotonic():
+            self.succes += 1
+            return entree[1]
+        self.echecs += 1
+        if self.ttl <= 0:
+            return await calculer()
+
+        future = self._en_cours.get(cle)
+        if future is None:
+            future = asyncio.ensure_future(calculer())
+            self._en_cours[cle] = future
+            try:
+                valeur = await asyncio.shield(future)
+            finally:
+                if self._en_cours.get(cle) is future:
+                    del self._en_cours[cle]
+                perimee = future in self._perimees
+                self._perimees.discard(future)
+            if not perimee:
+                if len(self._entrees) >= MAX_ENTREES_CACHE:
+                    self._entrees.clear()
+                self._entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            return valeur
+        return await asyncio.shield(future)
+
+
+class ServiceApi:
+    """Routage des requêtes vers le pool de lecteurs ou l'écrivain unique"""
+
+    def __init__(self, chemin=DB_PATH, nb_lecteurs=NB_LECTEURS, ttl=TTL_CACHE_SECONDES):
+        conn = sqlite3.connect(chemin)
+        try:
+            migrer(conn)
+        finally:
+            conn.close()
+        factory = profiling.classe_connexion()
+        self.pool_lecture = ConnectionPool(chemin, max_idle=nb_lecteurs, factory=factory)
+        self.pool_ecriture = ConnectionPool(chemin, max_idle=1, factory=factory)
+        # Connexions réservées aux lectures de l'historique : elles seules attachent la base d'archive
+        self.pool_historique = ConnectionPool(chemin, max_idle=1, factory=factory)
+        self.lecteurs = ThreadPoolExecutor(nb_lecteurs, thread_name_prefix='lecteur')
+        self.ecrivain = ThreadPoolExecutor(1, thread_name_prefix='ecrivain')
+        self.cache = CacheDisponibilites(ttl)
+
+    def _lire(self, fonction, args):
+        with self.pool_lecture.connection() as conn:
+            return fonction(conn.cursor(), *args)
+
+    def _lire_historique(self, fonction, args):
+        with self.pool_historique.connection() as conn:
+            return fonction(attacher_archive(conn).cursor(), *args)
+
+    def _ecrire(self, fonction, args):
+        with self.pool_ecriture.connection() as conn:
+            return fonction(conn, *args)
+
+    async def lire(self, fonction, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.lecteurs, self._lire, fonction, args)
+
+    async def lire_historique(self, fonction, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.lecteurs, self._lire_historique, fonction, args
+        )
+
+    async def ecrire(self, fonction, *args):
+        """Exécute une écriture sur le thread écrivain puis invalide les disponibilités des périodes touchées"""
+        try:
+            resultat, periodes = await asyncio.get_running_loop().run_in_executor(
+                self.ecrivain, self._ecrire, fonction, args
+            )
+        except (ErreurRequete, ChambreIndisponible, ReservationInvalide, sqlite3.IntegrityError):
+            # Refus métier : la transaction a été annulée, rien n'a changé
+            raise
+        except Exception:
+            self.cache.invalider()
+            raise
+        self.cache.invalider(periodes)
+        return resultat
+
+    async def traiter(self, methode, chemin, requete, corps):
+        """Retourne (statut, corps JSON en octets) pour une requête"""
+        segments = [s for s in chemin.strip('/').split('/') if s]
+        if segments == ['sante']:
+            return 200, _json({'statut': 'ok', 'cache': {'succes': self.cache.succes, 'echecs': self.cache.echecs}})
+
+        if segments == ['disponibilites']:
+            if methode != 'GET':
+                raise ErreurRequete(405, "Méthode non autorisée")
+            debut, fin = _periode(requete.get('debut'), requete.get('fin'))
+            return 200, await self.cache.obtenir((debut, fin), lambda: self.lire(lire_disponibilites, debut, fin))
+
+        if segments == ['clients']:
+            if methode != 'GET':
+                raise ErreurRequete(405, "Méthode non autorisée")
+            texte = requete.get('q', '')
+            limite = _entier(requete.get('limite', 20), 'limite')
+            if limite < 1:
+                raise ErreurRequete(400, "Paramètre limite invalide : entier positif attendu")
+            limite = min(limite, 100)
+            return 200, _json(await self.lire(lire_clients, texte, limite))
+
+        if segments == ['reservations'] and methode == 'POST':
+            debut, fin = _periode(corps.get('date_debut'), corps.get('date_fin'))
+            id_client = _entier(corps.get('id_client'), 'id_client')
+            chambres = _chambres(corps.get('chambres'))
+            id_reservation = await self.ecrire(creer, id_client, debut, fin, chambres)
+            return 201, _json({'id_reservation': id_reservation})
+
+        if segments == ['reservations', 'suppression'] and methode == 'POST':
+            return 200, _json(await self.ecrire(annuler_plusieurs, _ids(corps.get('ids'), 'ids')))
+
+        if segments == ['clients', 'suppression'] and methode == 'POST':
+            ids = _ids(corps.get('ids'), 'ids')
+            archives = await self.lire_historique(clients_avec_archives, ids)
+            if archives:
+                raise ErreurRequete(409, "Clients ayant des réservations archivées : "
+                                    + ", ".join(map(str, sorted(archives))))
+            return 200, _json(await self.ecrire(supprimer_clients, ids, bool(corps.get('cascade'))))
+
+        if len(segments) == 2 and segments[0] == 'reservations':
+            id_reservation = _entier(segments[1], 'id_reservation')
+            if methode == 'GET':
+                reservation = await self.lire(lire_reservation, id_reservation)
+                if reservation is None:
+                    raise ErreurRequete(404, f"La réservation {id_reservation} n'existe pas")
+                return 200, _json(reservation)
+            if methode == 'PATCH':
+                debut, fin = _periode(corps.get('date_debut'), corps.get('date_fin'))
+                chambres = _chambres(corps['chambres']) if 'chambres' in corps else None
+                return 200, _json(await self.ecrire(modifier, id_reservation, debut, fin, chambres))
+            if methode == 'DELETE':
+                await self.ecrire(annuler, id_reservation)
+                return 200, _json({'id_reservation': id_reservation, 'annulee': True})
+            raise ErreurRequete(405, "Méthode non autorisée")
+
+        raise ErreurRequete(404, "Route inconnue")
+
+    async def repondre(self, methode, cible, corps_brut):
+        """Décode la requête, la traite et traduit les erreurs métier en statuts HTTP"""
+        url = urlsplit(cible)
+        requete = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        try:
+            corps = json.loads(corps_brut) if corps_brut else {}
+            if not isinstance(corps, dict):
+                raise ErreurRequete(400, "Corps JSON invalide : objet attendu")
+            return await self.traiter(methode, url.path, requete, corps)
+        except json.JSONDecodeError:
+            return 400, _json({'erreur': "Corps JSON invalide"})
+        except ErreurRequete as e:
+            return e.statut, _json({'erreur': str(e)})
+        except ChambreIndisponible as e:
+            return 409, _json({'erreur': str(e)})
+        except ReservationInvalide as e:
+            return 400, _json({'erreur': str(e)})
+        except sqlite3.IntegrityError as e:
+            if 'FOREIGN KEY' in str(e):
+                return 400, _json({'erreur': "Client ou chambre inexistant"})
+            return 400, _json({'erreur': str(e)})
+
+    async def connexion(self, reader, writer):
+        """Boucle HTTP/1.1 d'une connexion (keep-alive)"""
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, cible, version_http = ligne.decode('latin-1').split()
+                except ValueError:
+                    break
+                entetes = {}
+                while True:
+                    entete = await reader.readline()
+                    if entete in (b'\r\n', b'\n', b''):
+                        break
+                    nom, _, valeur = entete.decode('latin-1').partition(':')
+                    entetes[nom.strip().lower()] = valeur.strip()
+
+                longueur = int(entetes.get('content-length', 0) or 0)
+                if longueur > TAILLE_MAX_CORPS:
+                    statut, corps, garder = 413, _json({'erreur': "Corps trop volumineux"}), False
+                else:
+                    corps_brut = await reader.readexactly(longueur) if longueur else b''
+                    try:
+                        statut, corps = await self.repondre(methode.upper(), cible, corps_brut)
+                    except Exception as e:
+                        statut, corps = 500, _json({'erreur': f"Erreur interne : {e}"})
+                    connexion = entetes.get('connection', '').lower()
+                    garder = connexion != 'close' and (version_http == 'HTTP/1.1' or connexion == 'keep-alive')
+
+                writer.write(
+                    f"HTTP/1.1 {statut} {MESSAGES_STATUT.get(statut, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(corps)}\r\n"
+                    f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n".encode('latin-1') + corps
+                )
+                await writer.drain()
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def fermer(self):
+        self.lecteurs.shutdown()
+        self.ecrivain.shutdown()
+        self.pool_lecture.close_all()
+        self.pool_ecriture.close_all()
+        self.pool_historique.close_all()
+
+
+async def servir(hote, port, chemin=DB_PATH):
+    service = ServiceApi(chemin)
+    serveur = await asyncio.start_server(service.connexion, hote, port, backlog=1024)
+    print(f"API en écoute sur http://{hote}:{port} (base {chemin}, {NB_LECTEURS} lecteurs, "
+          f"cache {TTL_CACHE_SECONDES}s)", flush=True)
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        service.fermer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.hote, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
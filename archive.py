@@ -0,0 +1,368 @@
+"""Archivage des réservations terminées dans une base séparée (hotel_archive.db)
+
+Les réservations dont le départ est plus ancien que l'horizon (HORIZON_JOURS)
+sont déplacées, avec leurs liens chambre, vers la base d'archive : les tables
+opérationnelles (Reservation, ReservationChambre et OccupationNuit, tenue à
+jour par triggers) ne contiennent plus que les séjours récents et à venir.
+
+Le déplacement se fait par lots, dont la taille s'ajuste pour que la base
+principale ne reste verrouillée en écriture qu'environ VERROU_CIBLE_MS par
+lot, en deux transactions par lot :
+1. copie vers l'archive dans une transaction différée, qui ne verrouille que
+   le fichier d'archive (la base principale n'est que lue) ;
+2. suppression dans la base principale (BEGIN IMMEDIATE) des seules
+   réservations dont la copie est identique : une réservation modifiée entre
+   les deux étapes reste en place et sera recopiée au passage suivant.
+Un arrêt entre les deux étapes laisse au pire une réservation présente dans
+les deux bases, ce que la vue historique ignore. Les agrégats StatNuit des
+nuits archivées sont conservés : le tableau de bord garde tout l'historique.
+
+La base d'archive ne doit être attachée qu'à des connexions dédiées
+(historique, rapports) : BEGIN IMMEDIATE verrouille toutes les bases
+attachées, les connexions de la réception resteraient sinon bloquées pendant
+la copie d'un lot.
+
+Usage : python archive.py --horizon-jours 365
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from db import DB_PATH, configure_connection, transaction
+from migrations import migrer
+
+HORIZON_JOURS = int(os.environ.get('HOTEL_ARCHIVE_HORIZON_JOURS', 365))
+# Taille du premier lot ; les suivants sont ajustés pour tenir le verrou d'écriture environ VERROU_CIBLE_MS
+TAILLE_LOT = 50
+TAILLE_LOT_MAX = 2000
+VERROU_CIBLE_MS = 5
+# Pause entre deux lots pour laisser passer les écritures de la réception
+PAUSE_SECONDES = 0.01
+SCHEMA = 'archive'
+
+
+def chemin_archive(chemin_base=DB_PATH):
+    """Chemin de la base d'archive : HOTEL_ARCHIVE_DB ou <base>_archive.db à côté de la base principale"""
+    return os.environ.get('HOTEL_ARCHIVE_DB') or os.path.splitext(chemin_base)[0] + '_archive.db'
+
+
+def init_archive(cursor):
+    """Crée les tables de la base d'archive attachée (idempotent)"""
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.Reservation (
+        id_reservation INTEGER PRIMARY KEY,
+        date_debut TEXT NOT NULL,
+        date_fin TEXT NOT NULL,
+        id_client INTEGER,
+        date_archivage TEXT NOT NULL
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.ReservationChambre (
+        id_reservation INTEGER,
+        id_chambre INTEGER,
+        PRIMARY KEY (id_reservation, id_chambre)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_client ON Reservation(id_client)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_debut ON Reservation(date_debut)")
+
+
+def attacher_archive(conn, chemin=None):
+    """Attache la base d'archive à une connexion et crée les vues historiques (idempotent)
+
+    Les vues temporaires ReservationHistorique et ReservationChambreHistorique
+    réunissent réservations courantes et archivées ; une réservation présente
+    dans les deux bases n'y figure qu'une fois.
+    """
+    if any(nom == SCHEMA for _, nom, _ in conn.execute("PRAGMA database_list")):
+        return conn
+    if chemin is None:
+        fichier_principal = next(f for _, nom, f in conn.execute("PRAGMA database_list") if nom == 'main')
+        chemin = chemin_archive(fichier_principal or DB_PATH)
+    conn.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (chemin,))
+    conn.execute(f"PRAGMA {SCHEMA}.journal_mode = WAL")
+    cursor = conn.cursor()
+    init_archive(cursor)
+    cursor.execute(f'''
+    CREATE TEMP VIEW IF NOT EXISTS ReservationHistorique AS
+    SELECT id_reservation, date_debut, date_fin, id_client, 0 AS archivee
+    FROM main.Reservation
+    UNION ALL
+    SELECT A.id_reservation, A.date_debut, A.date_fin, A.id_client, 1
+    FROM {SCHEMA}.Reservation A
+    WHERE NOT EXISTS (SELECT 1 FROM main.Reservation R WHERE R.id_reservation = A.id_reservation)
+    ''')
+    cursor.execute(f'''
+    CREATE TEMP VIEW IF NOT EXISTS ReservationChambreHistorique AS
+    SELECT id_reservation, id_chambre
+    FROM main.ReservationChambre
+    UNION ALL
+    SELECT AC.id_reservation, AC.id_chambre
+    FROM {SCHEMA}.ReservationChambre AC
+    WHERE NOT EXISTS (SELECT 1 FROM main.Reservation R WHERE R.id_reservation = AC.id_reservation)
+    ''')
+    conn.commit()
+    return conn
+
+
+def _signatures(schema):
+    """Requête (id_reservation, signature) des réservations du lot dans un schéma : dates, client et chambres"""
+    return f'''
+    SELECT R.id_reservation AS id_reservation,
+           R.date_debut || '|' || R.date_fin || '|' || IFNULL(R.id_client, '') || '|' || IFNULL((
+               SELECT group_concat(id_chambre) FROM (
+                   SELECT id_chambre FROM {schema}.ReservationChambre RC
+                   WHERE RC.id_reservation = R.id_reservation
+                   ORDER BY id_chambre
+               )
+           ), '') AS signature
+    FROM {schema}.Reservation R
+    WHERE R.id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+    '''
+
+
+def archiver_lot(conn, limite, taille_lot=TAILLE_LOT):
+    """Archive au plus taille_lot réservations terminées avant `limite`
+
+    Retourne (réservations archivées, réservations candidates, durée du verrou d'écriture en secondes).
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS LotArchivage (id_reservation INTEGER PRIMARY KEY)")
+    cursor.execute('''
+    CREATE TEMP TABLE IF NOT EXISTS StatArchivage (
+        id_hotel INTEGER, nuit TEXT, chambres_occupees INTEGER, revenu REAL
+    )
+    ''')
+
+    # 1. Copie vers l'archive : transaction différée, seule la base d'archive est écrite
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute("DELETE FROM temp.LotArchivage")
+        cursor.execute('''
+        INSERT INTO temp.LotArchivage (id_reservation)
+        SELECT id_reservation FROM main.Reservation
+        WHERE date_fin < ?
+        ORDER BY date_fin
+        LIMIT ?
+        ''', (limite, taille_lot))
+        candidates = cursor.rowcount
+        if not candidates:
+            conn.rollback()
+            return 0, 0, 0.0
+        cursor.execute(f'''
+        DELETE FROM {SCHEMA}.ReservationChambre
+        WHERE id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+        ''')
+        cursor.execute(f'''
+        INSERT OR REPLACE INTO {SCHEMA}.Reservation (id_reservation, date_debut, date_fin, id_client, date_archivage)
+        SELECT id_reservation, date_debut, date_fin, id_client, datetime('now')
+        FROM main.Reservation
+        WHERE id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+        ''')
+        cursor.execute(f'''
+        INSERT INTO {SCHEMA}.ReservationChambre (id_reservation, id_chambre)
+        SELECT id_reservation, id_chambre
+        FROM main.ReservationChambre
+        WHERE id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+        ''')
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+    # 2. Suppression des réservations dont la copie est identique, en conservant leurs agrégats
+    t0 = time.perf_counter()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute(f'''
+        DELETE FROM temp.LotArchivage
+        WHERE id_reservation NOT IN (
+            SELECT P.id_reservation
+            FROM ({_signatures('main')}) P
+            JOIN ({_signatures(SCHEMA)}) A
+              ON A.id_reservation = P.id_reservation AND A.signature = P.signature
+        )
+        ''')
+        cursor.execute("DELETE FROM temp.StatArchivage")
+        cursor.execute('''
+        INSERT INTO temp.StatArchivage (id_hotel, nuit, chambres_occupees, revenu)
+        SELECT O.id_hotel, O.nuit, COUNT(*), SUM(O.revenu)
+        FROM main.OccupationNuit O
+        WHERE O.id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+          AND O.id_hotel IS NOT NULL
+        GROUP BY O.id_hotel, O.nuit
+        ''')
+        cursor.execute('''
+        DELETE FROM main.ReservationChambre
+        WHERE id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+        ''')
+        cursor.execute('''
+        DELETE FROM main.Reservation
+        WHERE id_reservation IN (SELECT id_reservation FROM temp.LotArchivage)
+        ''')
+        archivees = cursor.rowcount
+        # Les triggers ont retiré ces nuits de StatNuit : elles restent dans l'historique du tableau de bord
+        cursor.execute('''
+        INSERT INTO main.StatNuit (id_hotel, nuit, chambres_occupees, revenu)
+        SELECT id_hotel, nuit, chambres_occupees, revenu FROM temp.StatArchivage WHERE true
+        ON CONFLICT (id_hotel, nuit) DO UPDATE
+        SET chambres_occupees = chambres_occupees + excluded.chambres_occupees,
+            revenu = revenu + excluded.revenu
+        ''')
+        # Restauration faite hors triggers : journalisée pour que les répliques la rejouent
+        cursor.execute('''
+        INSERT INTO main.JournalModifications (table_nom, operation, cle, ligne)
+        SELECT 'StatNuit', 'U', json_array(S.id_hotel, S.nuit),
+               json_object('id_hotel', S.id_hotel, 'nuit', S.nuit,
+                           'chambres_occupees', S.chambres_occupees, 'revenu', S.revenu)
+        FROM temp.StatArchivage A
+        JOIN main.StatNuit S ON S.id_hotel = A.id_hotel AND S.nuit = A.nuit
+        ''')
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return archivees, candidates, time.perf_counter() - t0
+
+
+def identifiant_max_archive(chemin):
+    """Plus grand identifiant de réservation d'une base d'archive, lue sans l'attacher (None si absente ou vide)"""
+    if not os.path.exists(chemin):
+        return None
+    conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT MAX(id_reservation) FROM Reservation").fetchone()[0]
+    except sqlite3.OperationalError:
+        # Fichier créé sans table d'archive
+        return None
+    finally:
+        conn.close()
+
+
+def identifiants_archives(chemin, ids):
+    """Identifiants de réservation parmi `ids` présents dans une base d'archive, lue sans l'attacher"""
+    if not ids or not os.path.exists(chemin):
+        return set()
+    conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute("SELECT id_reservation FROM Reservation WHERE id_reservation IN "
+                              "(SELECT value FROM json_each(?))", (json.dumps(sorted(ids)),))
+        return {ligne[0] for ligne in cursor}
+    except sqlite3.OperationalError:
+        return set()
+    finally:
+        conn.close()
+
+
+def aligner_sequence(cursor, maximum=None):
+    """Porte la séquence AUTOINCREMENT de main.Reservation au-delà des identifiants archivés
+
+    Depuis la migration 10, un identifiant n'est jamais réattribué ; une
+    archive plus ancienne peut cependant contenir des identifiants supérieurs
+    à la séquence reprise des seules réservations courantes. Sans `maximum`,
+    il est lu dans la base d'archive attachée.
+    """
+    if maximum is None:
+        cursor.execute(f"SELECT MAX(id_reservation) FROM {SCHEMA}.Reservation")
+        maximum = cursor.fetchone()[0]
+    if maximum is None:
+        return
+    cursor.execute("UPDATE main.sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'Reservation'", (maximum,))
+    if not cursor.rowcount:
+        cursor.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES ('Reservation', ?)", (maximum,))
+
+
+def archiver(conn, horizon_jours=HORIZON_JOURS, taille_lot=TAILLE_LOT, pause=PAUSE_SECONDES, aujourd_hui=None):
+    """Archive par lots toutes les réservations terminées depuis plus de horizon_jours
+
+    Incrémental : chaque passage ne traite que ce qui a franchi l'horizon
+    depuis le précédent. Retourne (réservations archivées, durées du verrou
+    d'écriture de chaque lot en secondes).
+    """
+    attacher_archive(conn)
+    with transaction(conn) as cursor:
+        aligner_sequence(cursor)
+    limite = ((aujourd_hui or date.today()) - timedelta(days=horizon_jours)).isoformat()
+    total, verrous = 0, []
+    # Points de contrôle WAL faits entre les lots, hors du verrou d'écriture mesuré
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    try:
+        while True:
+            archivees, candidates, verrou = archiver_lot(conn, limite, taille_lot)
+            if candidates:
+                total += archivees
+                verrous.append(verrou)
+            # Lot vide, ou réservations toutes modifiées pendant la copie : le reste attendra le prochain passage
+            if not archivees:
+                return total, verrous
+            # Taille du lot suivant proportionnelle à la marge sur le verrou cible (au plus doublée à chaque lot)
+            ratio = VERROU_CIBLE_MS / 1000 / max(verrou, 1e-4)
+            taille_lot = max(1, min(TAILLE_LOT_MAX, int(taille_lot * min(ratio, 2))))
+            conn.execute("PRAGMA main.wal_checkpoint(PASSIVE)")
+            time.sleep(pause)
+    finally:
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
+
+
+def sejours_client(cursor, id_client):
+    """Historique complet d'un client (courant et archivé), du plus récent au plus ancien
+
+    Chaque ligne contient (id_reservation, date_debut, date_fin, numéros des chambres, villes, archivee).
+    Le curseur doit appartenir à une connexion où l'archive est attachée.
+    """
+    cursor.execute('''
+    SELECT R.id_reservation, R.date_debut, R.date_fin,
+           group_concat(CH.numero, ', '), group_concat(DISTINCT H.ville), R.archivee
+    FROM ReservationHistorique R
+    LEFT JOIN ReservationChambreHistorique RC ON RC.id_reservation = R.id_reservation
+    LEFT JOIN Chambre CH ON RC.id_chambre = CH.id_chambre
+    LEFT JOIN Hotel H ON CH.id_hotel = H.id_hotel
+    WHERE R.id_client = ?
+    GROUP BY R.id_reservation
+    ORDER BY R.date_debut DESC, R.id_reservation DESC
+    ''', (id_client,))
+    return cursor.fetchall()
+
+
+def nb_reservations_archivees(cursor, id_client):
+    """Nombre de réservations archivées d'un client (l'archive doit être attachée)"""
+    cursor.execute(f"SELECT COUNT(*) FROM {SCHEMA}.Reservation WHERE id_client = ?", (id_client,))
+    return cursor.fetchone()[0]
+
+
+def clients_avec_archives(cursor, ids):
+    """Parmi `ids`, clients qui ont des réservations archivées (l'archive doit être attachée)"""
+    cursor.execute(f'''
+    SELECT DISTINCT id_client FROM {SCHEMA}.Reservation
+    WHERE id_client IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(ids)),))
+    return {ligne[0] for ligne in cursor.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", default=None, help="base d'archive (par défaut <base>_archive.db)")
+    parser.add_argument("--horizon-jours", type=int, default=HORIZON_JOURS)
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT, help="taille du premier lot")
+    args = parser.parse_args()
+
+    conn = configure_connection(sqlite3.connect(args.db))
+    migrer(conn)
+    attacher_archive(conn, args.archive)
+    t0 = time.perf_counter()
+    total, verrous = archiver(conn, args.horizon_jours, args.taille_lot)
+    verrous.sort()
+    print(f"{total} réservation(s) archivée(s) en {len(verrous)} lot(s) et {time.perf_counter() - t0:.1f}s")
+    if verrous:
+        print(f"Verrou d'écriture par lot : médiane {verrous[len(verrous) // 2] * 1000:.1f} ms, "
+              f"p99 {verrous[int(len(verrous) * 0.99)] * 1000:.1f} ms, max {verrous[-1] * 1000:.1f} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
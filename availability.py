@@ -0,0 +1,271 @@
+import json
+from datetime import date
+
+# Plage couverte par le calendrier des nuits (utilisé par les triggers)
+CALENDRIER_DEBUT = '2000-01-01'
+CALENDRIER_FIN = '2100-01-01'
+
+TRIGGERS_OCCUPATION = (
+    'trg_occupation_rc_insert',
+    'trg_occupation_rc_delete',
+    'trg_occupation_rc_update',
+    'trg_occupation_reservation_update',
+    'trg_occupation_reservation_delete',
+)
+
+
+def format_date(valeur):
+    """Convertit une date Python en chaîne 'YYYY-MM-DD' (les chaînes sont laissées telles quelles)"""
+    if isinstance(valeur, date):
+        return valeur.strftime('%Y-%m-%d')
+    return valeur
+
+
+def init_availability(cursor):
+    """Crée le calendrier, la table d'occupation par nuit et ses triggers (idempotent)
+
+    Chaque ligne de OccupationNuit représente une chambre occupée pour une nuit
+    donnée. La table est tenue à jour par des triggers sur Reservation et
+    ReservationChambre, ce qui permet de répondre à « chambres libres pour
+    [d1, d2) » par une recherche indexée par chambre, indépendamment de la
+    taille de l'historique des réservations.
+    """
+    # Calendrier des nuits : les triggers ne peuvent pas utiliser de CTE récursive
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Calendrier (
+        nuit TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("SELECT COUNT(*) FROM Calendrier")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+        INSERT INTO Calendrier (nuit)
+        WITH RECURSIVE jours(nuit) AS (
+            SELECT date(?)
+            UNION ALL
+            SELECT date(nuit, '+1 day') FROM jours WHERE nuit < date(?, '-1 day')
+        )
+        SELECT nuit FROM jours
+        ''', (CALENDRIER_DEBUT, CALENDRIER_FIN))
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='OccupationNuit'")
+    occupation_existante = cursor.fetchone() is not None
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS OccupationNuit (
+        id_chambre INTEGER NOT NULL,
+        nuit TEXT NOT NULL,
+        id_reservation INTEGER NOT NULL,
+        PRIMARY KEY (id_chambre, nuit)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_occupation_reservation
+    ON OccupationNuit(id_reservation, id_chambre)
+    ''')
+
+    # Triggers de maintenance de l'occupation, recréés pour appliquer leur dernière définition.
+    # Une nuit déjà occupée par une autre réservation viole la clé primaire
+    # (id_chambre, nuit) : la double réservation est refusée par la base elle-même.
+    for nom in TRIGGERS_OCCUPATION:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_rc_insert
+    AFTER INSERT ON ReservationChambre
+    BEGIN
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation)
+        SELECT NEW.id_chambre, K.nuit, NEW.id_reservation
+        FROM Reservation R
+        JOIN Calendrier K ON K.nuit >= R.date_debut AND K.nuit < R.date_fin
+        WHERE R.id_reservation = NEW.id_reservation;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_rc_delete
+    AFTER DELETE ON ReservationChambre
+    BEGIN
+        DELETE FROM OccupationNuit
+        WHERE id_reservation = OLD.id_reservation AND id_chambre = OLD.id_chambre;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_rc_update
+    AFTER UPDATE OF id_reservation, id_chambre ON ReservationChambre
+    BEGIN
+        DELETE FROM OccupationNuit
+        WHERE id_reservation = OLD.id_reservation AND id_chambre = OLD.id_chambre;
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation)
+        SELECT NEW.id_chambre, K.nuit, NEW.id_reservation
+        FROM Reservation R
+        JOIN Calendrier K ON K.nuit >= R.date_debut AND K.nuit < R.date_fin
+        WHERE R.id_reservation = NEW.id_reservation;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_reservation_update
+    AFTER UPDATE OF date_debut, date_fin ON Reservation
+    BEGIN
+        DELETE FROM OccupationNuit WHERE id_reservation = OLD.id_reservation;
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation)
+        SELECT RC.id_chambre, K.nuit, RC.id_reservation
+        FROM ReservationChambre RC
+        JOIN Calendrier K ON K.nuit >= NEW.date_debut AND K.nuit < NEW.date_fin
+        WHERE RC.id_reservation = NEW.id_reservation;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_reservation_delete
+    AFTER DELETE ON Reservation
+    BEGIN
+        DELETE FROM OccupationNuit WHERE id_reservation = OLD.id_reservation;
+    END
+    ''')
+
+    # Remplissage initial à partir de l'historique existant (les chevauchements passés sont ignorés)
+    if not occupation_existante:
+        cursor.execute('''
+        INSERT OR IGNORE INTO OccupationNuit (id_chambre, nuit, id_reservation)
+        SELECT RC.id_chambre, K.nuit, R.id_reservation
+        FROM ReservationChambre RC
+        JOIN Reservation R ON RC.id_reservation = R.id_reservation
+        JOIN Calendrier K ON K.nuit >= R.date_debut AND K.nuit < R.date_fin
+        ''')
+
+
+def init_montants(cursor):
+    """Enregistre avec chaque nuit occupée l'hôtel et le tarif de la chambre au moment de la réservation
+
+    Les agrégats (StatNuit) retirent ainsi exactement ce qu'ils ont ajouté,
+    même après un changement de tarif ou le rattachement d'une chambre à un
+    autre hôtel. Les nuits déjà occupées reçoivent les valeurs actuelles.
+    """
+    cursor.execute("SELECT name FROM pragma_table_info('OccupationNuit')")
+    colonnes = {ligne[0] for ligne in cursor.fetchall()}
+    if 'id_hotel' not in colonnes:
+        cursor.execute("ALTER TABLE OccupationNuit ADD COLUMN id_hotel INTEGER")
+    if 'revenu' not in colonnes:
+        cursor.execute("ALTER TABLE OccupationNuit ADD COLUMN revenu REAL NOT NULL DEFAULT 0")
+    cursor.execute('''
+    UPDATE OccupationNuit
+    SET id_hotel = CH.id_hotel, revenu = COALESCE(TC.prix_base, 0)
+    FROM Chambre CH
+    LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+    WHERE CH.id_chambre = OccupationNuit.id_chambre
+    ''')
+
+    # Les triggers qui inscrivent des nuits lisent hôtel et tarif une fois par chambre
+    for nom in ('trg_occupation_rc_insert', 'trg_occupation_rc_update', 'trg_occupation_reservation_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_rc_insert
+    AFTER INSERT ON ReservationChambre
+    BEGIN
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation, id_hotel, revenu)
+        SELECT NEW.id_chambre, K.nuit, NEW.id_reservation, CH.id_hotel, COALESCE(TC.prix_base, 0)
+        FROM Reservation R
+        JOIN Calendrier K ON K.nuit >= R.date_debut AND K.nuit < R.date_fin
+        LEFT JOIN Chambre CH ON CH.id_chambre = NEW.id_chambre
+        LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+        WHERE R.id_reservation = NEW.id_reservation;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_rc_update
+    AFTER UPDATE OF id_reservation, id_chambre ON ReservationChambre
+    BEGIN
+        DELETE FROM OccupationNuit
+        WHERE id_reservation = OLD.id_reservation AND id_chambre = OLD.id_chambre;
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation, id_hotel, revenu)
+        SELECT NEW.id_chambre, K.nuit, NEW.id_reservation, CH.id_hotel, COALESCE(TC.prix_base, 0)
+        FROM Reservation R
+        JOIN Calendrier K ON K.nuit >= R.date_debut AND K.nuit < R.date_fin
+        LEFT JOIN Chambre CH ON CH.id_chambre = NEW.id_chambre
+        LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+        WHERE R.id_reservation = NEW.id_reservation;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_occupation_reservation_update
+    AFTER UPDATE OF date_debut, date_fin ON Reservation
+    BEGIN
+        DELETE FROM OccupationNuit WHERE id_reservation = OLD.id_reservation;
+        INSERT INTO OccupationNuit (id_chambre, nuit, id_reservation, id_hotel, revenu)
+        SELECT RC.id_chambre, K.nuit, RC.id_reservation, CH.id_hotel, COALESCE(TC.prix_base, 0)
+        FROM ReservationChambre RC
+        JOIN Calendrier K ON K.nuit >= NEW.date_debut AND K.nuit < NEW.date_fin
+        LEFT JOIN Chambre CH ON CH.id_chambre = RC.id_chambre
+        LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+        WHERE RC.id_reservation = NEW.id_reservation;
+    END
+    ''')
+
+
+# Chambres libres sur toutes les nuits de [?, ?) ; aussi sérialisée en JSON par l'API (api.lire_disponibilites)
+REQUETE_CHAMBRES_DISPONIBLES = '''
+SELECT Ch.id_chambre, Ch.numero, Ch.etage, H.ville, TC.libelle, TC.prix_base, Ch.id_hotel, Ch.id_type
+FROM Chambre Ch
+JOIN Hotel H ON Ch.id_hotel = H.id_hotel
+JOIN TypeChambre TC ON Ch.id_type = TC.id_type
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM OccupationNuit O
+    WHERE O.id_chambre = Ch.id_chambre
+      AND O.nuit >= ? AND O.nuit < ?
+)
+ORDER BY H.ville, Ch.numero
+'''
+
+
+def chambres_disponibles(cursor, date_debut, date_fin):
+    """Retourne les chambres libres sur toutes les nuits de [date_debut, date_fin)
+
+    Chaque ligne contient (id_chambre, numero, etage, ville, libelle, prix_base, id_hotel, id_type).
+    """
+    cursor.execute(REQUETE_CHAMBRES_DISPONIBLES, (format_date(date_debut), format_date(date_fin)))
+    return cursor.fetchall()
+
+
+def chambre_disponible(cursor, id_chambre, date_debut, date_fin, id_reservation_exclue=None):
+    """Indique si une chambre est libre sur [date_debut, date_fin), en ignorant éventuellement une réservation"""
+    cursor.execute('''
+    SELECT 1
+    FROM OccupationNuit
+    WHERE id_chambre = ? AND nuit >= ? AND nuit < ?
+      AND id_reservation IS NOT ?
+    LIMIT 1
+    ''', (id_chambre, format_date(date_debut), format_date(date_fin), id_reservation_exclue))
+    return cursor.fetchone() is None
+
+
+def chambres_occupees(cursor, chambres, date_debut, date_fin, id_reservation_exclue=None):
+    """Retourne, parmi une liste de chambres, celles déjà réservées sur [date_debut, date_fin) (une seule requête)"""
+    cursor.execute('''
+    SELECT DISTINCT id_chambre
+    FROM OccupationNuit
+    WHERE id_chambre IN (SELECT value FROM json_each(?))
+      AND nuit >= ? AND nuit < ?
+      AND id_reservation IS NOT ?
+    ''', (json.dumps(list(chambres)), format_date(date_debut), format_date(date_fin), id_reservation_exclue))
+    return {ligne[0] for ligne in cursor.fetchall()}
+
+
+def bloc_chambres_libres(cursor, id_hotel, id_type, date_debut, date_fin, limite=None):
+    """Retourne les identifiants des chambres d'un type et d'un hôtel libres sur [date_debut, date_fin)
+
+    Les chambres sont triées par étage puis numéro, pour qu'un groupe soit
+    logé dans des chambres voisines.
+    """
+    cursor.execute('''
+    SELECT Ch.id_chambre
+    FROM Chambre Ch
+    WHERE Ch.id_hotel = ? AND Ch.id_type = ?
+      AND NOT EXISTS (
+        SELECT 1
+        FROM OccupationNuit O
+        WHERE O.id_chambre = Ch.id_chambre
+          AND O.nuit >= ? AND O.nuit < ?
+      )
+    ORDER BY Ch.etage, Ch.numero
+    LIMIT ?
+    ''', (id_hotel, id_type, format_date(date_debut), format_date(date_fin), -1 if limite is None else limite))
+    return [ligne[0] for ligne in cursor.fetchall()]
@@ -0,0 +1,80 @@
+"""Benchmark : requête NOT IN historique vs moteur de disponibilité par nuit
+
+Usage : python -m benchmarks.bench_availability --reservations 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from availability import chambres_disponibles
+from benchmarks.generator import generer
+
+ANCIENNE_REQUETE = '''
+SELECT Ch.id_chambre, Ch.numero, Ch.etage, H.ville, TC.libelle, TC.prix_base
+FROM Chambre Ch
+JOIN Hotel H ON Ch.id_hotel = H.id_hotel
+JOIN TypeChambre TC ON Ch.id_type = TC.id_type
+WHERE Ch.id_chambre NOT IN (
+    SELECT RC.id_chambre
+    FROM ReservationChambre RC
+    JOIN Reservation R ON RC.id_reservation = R.id_reservation
+    WHERE R.date_debut <= ? AND R.date_fin >= ?
+)
+'''
+
+
+def chronometrer(fonction, repetitions):
+    """Retourne la durée médiane (en ms) de plusieurs appels"""
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - t0) * 1000)
+    durees.sort()
+    return durees[len(durees) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hotels", type=int, default=20)
+    parser.add_argument("--chambres-par-hotel", type=int, default=100)
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="bench_dispo_")
+    chemin = os.path.join(dossier, "hotel.db")
+    conn = sqlite3.connect(chemin)
+    cursor = conn.cursor()
+
+    t0 = time.perf_counter()
+    generer(conn, args.reservations, args.hotels, args.chambres_par_hotel, graine=args.graine)
+    print(f"{args.reservations} réservations générées en {time.perf_counter() - t0:.1f}s ({chemin})")
+    cursor.execute("SELECT MIN(date_debut), MAX(date_fin) FROM Reservation")
+    premier_jour, dernier_jour = (date.fromisoformat(d) for d in cursor.fetchone())
+
+    rng = random.Random(args.graine)
+    periodes = []
+    for _ in range(args.repetitions):
+        d1 = premier_jour + timedelta(days=rng.randint(0, (dernier_jour - premier_jour).days))
+        periodes.append((d1, d1 + timedelta(days=rng.randint(1, 7))))
+
+    print(f"{'période':<25} {'NOT IN (ms)':>12} {'occupation (ms)':>16} {'libres':>8}")
+    for d1, d2 in periodes:
+        # La requête historique bloque aussi le jour de départ : on lui passe la dernière nuit
+        ancienne = chronometrer(lambda: cursor.execute(
+            ANCIENNE_REQUETE, ((d2 - timedelta(days=1)).isoformat(), d1.isoformat())).fetchall(), 3)
+        nouvelle = chronometrer(lambda: chambres_disponibles(cursor, d1, d2), 3)
+        libres = len(chambres_disponibles(cursor, d1, d2))
+        print(f"{d1} -> {d2}   {ancienne:>12.1f} {nouvelle:>16.1f} {libres:>8}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
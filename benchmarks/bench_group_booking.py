@@ -0,0 +1,110 @@
+"""Benchmark : allocation d'un bloc de chambres pour une réservation de groupe
+
+Compare la réservation ensembliste (booking.reserver_groupe : une requête pour
+choisir le bloc, un executemany pour les liens) à l'approche chambre par
+chambre (une vérification et une insertion par chambre), sur une base générée.
+
+Usage : python -m benchmarks.bench_group_booking --reservations 1000000 --bloc 200
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from availability import chambre_disponible
+from benchmarks.generator import generer
+from booking import ChambreIndisponible, reserver_groupe, supprimer_reservation
+from db import configure_connection, transaction
+
+
+def reserver_groupe_par_chambre(conn, id_client, id_hotel, id_type, nb_chambres, date_debut, date_fin):
+    """Référence : parcourt les chambres une à une et insère un lien par requête"""
+    debut, fin = date_debut.isoformat(), date_fin.isoformat()
+    with transaction(conn) as cursor:
+        cursor.execute("SELECT id_chambre FROM Chambre WHERE id_hotel = ? AND id_type = ? ORDER BY etage, numero",
+                       (id_hotel, id_type))
+        chambres = []
+        for (id_chambre,) in cursor.fetchall():
+            if chambre_disponible(cursor, id_chambre, debut, fin):
+                chambres.append(id_chambre)
+                if len(chambres) == nb_chambres:
+                    break
+        if len(chambres) < nb_chambres:
+            raise ChambreIndisponible(f"Seulement {len(chambres)} chambre(s) disponible(s)")
+        cursor.execute("INSERT INTO Reservation (date_debut, date_fin, id_client) VALUES (?, ?, ?) "
+                       "RETURNING id_reservation", (debut, fin, id_client))
+        id_reservation = cursor.fetchone()[0]
+        for id_chambre in chambres:
+            cursor.execute("INSERT INTO ReservationChambre (id_reservation, id_chambre) VALUES (?, ?)",
+                           (id_reservation, id_chambre))
+        return id_reservation, chambres
+
+
+def mesurer(conn, reserver, id_hotel, id_type, nb_chambres, debut, fin, repetitions):
+    """Retourne (médiane ms, p95 ms, chambres allouées) ; chaque réservation est annulée avant la suivante"""
+    durees = []
+    allouees = 0
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        try:
+            id_reservation, chambres = reserver(conn, 1, id_hotel, id_type, nb_chambres, debut, fin)
+        except ChambreIndisponible:
+            id_reservation, chambres = None, []
+        durees.append((time.perf_counter() - t0) * 1000)
+        allouees = len(chambres)
+        if id_reservation is not None:
+            supprimer_reservation(conn, id_reservation)
+    durees.sort()
+    return durees[len(durees) // 2], durees[min(len(durees) - 1, int(len(durees) * 0.95))], allouees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=1000000)
+    parser.add_argument("--hotels", type=int, default=4)
+    parser.add_argument("--chambres-par-hotel", type=int, default=700)
+    parser.add_argument("--bloc", type=int, default=200, help="nombre de chambres du groupe")
+    parser.add_argument("--nuits", type=int, default=3)
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        conn = sqlite3.connect(os.path.join(dossier, "hotel.db"))
+        t0 = time.perf_counter()
+        generer(conn, args.reservations, args.hotels, args.chambres_par_hotel, graine=args.graine)
+        configure_connection(conn)
+        print(f"Base de {args.reservations} réservations générée en {time.perf_counter() - t0:.1f}s")
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT id_hotel, id_type, COUNT(*) FROM Chambre GROUP BY id_hotel, id_type "
+                       "ORDER BY COUNT(*) DESC LIMIT 1")
+        id_hotel, id_type, nb_du_type = cursor.fetchone()
+        cursor.execute("SELECT MIN(date_debut), MAX(date_fin) FROM Reservation")
+        premiere, derniere = (date.fromisoformat(d) for d in cursor.fetchone())
+        print(f"Hôtel {id_hotel}, type {id_type} : {nb_du_type} chambres ; bloc de {args.bloc} chambres, "
+              f"{args.nuits} nuits")
+
+        fenetres = [
+            ("après l'historique", derniere + timedelta(days=30)),
+            ("milieu de l'historique (janvier)", date(premiere.year + (derniere.year - premiere.year) // 2, 1, 10)),
+        ]
+        methodes = [
+            ("ensembliste", reserver_groupe),
+            ("chambre par chambre", reserver_groupe_par_chambre),
+        ]
+        for libelle, debut in fenetres:
+            fin = debut + timedelta(days=args.nuits)
+            print(f"Période {debut} -> {fin} ({libelle})")
+            for nom, reserver in methodes:
+                mediane, p95, allouees = mesurer(conn, reserver, id_hotel, id_type, args.bloc, debut, fin,
+                                                 args.repetitions)
+                statut = f"{allouees} chambres allouées" if allouees else "refusée (chambres insuffisantes)"
+                print(f"  {nom:<20} médiane {mediane:8.2f} ms   p95 {p95:8.2f} ms   {statut}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Benchmark de toutes les requêtes de app.py à plusieurs échelles
+
+Les bases générées sont conservées dans --cache (une par échelle et par graine)
+et copiées avant chaque passe, les écritures mesurées ne les modifient donc pas.
+Les résultats sont écrits en JSON ; --comparer affiche l'écart avec un fichier
+de résultats précédent (par exemple celui d'un autre commit).
+
+Usage : python -m benchmarks.bench_queries --echelles 10000 100000 1000000 --sortie resultats.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, timedelta
+
+import booking
+import metrics
+from availability import chambres_disponibles
+from benchmarks.generator import generer
+from db import configure_connection
+from migrations import migrer
+from planning import construire_planning
+from pricing import HORIZON_NUITS, calculer_grille
+from repository import lister_reservations
+from search import rechercher_clients
+
+
+def _requetes(conn):
+    """Retourne la liste (nom, fonction) des requêtes mesurées sur une base"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(date_debut), MAX(date_fin) FROM Reservation")
+    premiere, derniere = (date.fromisoformat(d) for d in cursor.fetchone())
+    milieu = premiere + (derniere - premiere) / 2
+    cursor.execute("SELECT date_debut, id_reservation FROM Reservation WHERE date_debut <= ? "
+                   "ORDER BY date_debut DESC, id_reservation DESC LIMIT 1", (milieu.isoformat(),))
+    curseur_milieu = cursor.fetchone()
+    cursor.execute("SELECT id_reservation, date_debut, date_fin FROM Reservation "
+                   "WHERE julianday(date_fin) - julianday(date_debut) >= 2 "
+                   "ORDER BY id_reservation DESC LIMIT 1000")
+    a_modifier = cursor.fetchall()
+
+    def requete(sql, params=()):
+        return lambda: cursor.execute(sql, params).fetchall()
+
+    def totaux_sans_cache():
+        metrics.invalider('reservations', 'clients', 'chambres')
+        return metrics.totaux(cursor)
+
+    def tableau_de_bord_sans_cache():
+        metrics.invalider('reservations')
+        metrics.occupation_par_hotel(cursor, milieu, milieu + timedelta(days=30))
+        metrics.occupation_par_nuit(cursor, milieu, milieu + timedelta(days=30))
+        metrics.duree_moyenne_sejour(cursor, milieu, milieu + timedelta(days=30))
+        return metrics.mouvements(cursor, milieu, milieu + timedelta(days=7))
+
+    def modifier():
+        id_reservation, debut, fin = a_modifier[0]
+        # Séjour raccourci d'une nuit puis rétabli : la base reste identique d'une répétition à l'autre
+        booking.modifier_reservation(conn, id_reservation, debut, date.fromisoformat(fin) - timedelta(days=1))
+        booking.modifier_reservation(conn, id_reservation, debut, fin)
+
+    def supprimer():
+        booking.supprimer_reservation(conn, a_modifier.pop()[0])
+
+    return [
+        ("disponibilite", lambda: chambres_disponibles(cursor, milieu, milieu + timedelta(days=3))),
+        ("reservations_page_1", lambda: lister_reservations(cursor, 26)),
+        ("reservations_page_milieu", lambda: lister_reservations(cursor, 26, apres=curseur_milieu)),
+        ("reservations_filtre_nom", lambda: lister_reservations(cursor, 26, nom_client="Dupont")),
+        ("clients_premiere_page", requete("SELECT * FROM Client ORDER BY nom LIMIT 25")),
+        ("clients_recherche_nom", lambda: rechercher_clients(cursor, "Dupont")),
+        ("clients_recherche_prefixe", lambda: rechercher_clients(cursor, "ma")),
+        ("clients_recherche_email", lambda: rechercher_clients(cursor, "marie.leroy@")),
+        ("chambres_edition", requete("SELECT id_chambre, numero FROM Chambre")),
+        ("tableau_de_bord_totaux", totaux_sans_cache),
+        ("tableau_de_bord_agregats", tableau_de_bord_sans_cache),
+        ("tableau_de_bord_cache", lambda: metrics.totaux(cursor)),
+        ("planning_90_nuits", lambda: construire_planning(cursor, 1, milieu, milieu + timedelta(days=90))),
+        ("tarifs_grille_horizon", lambda: calculer_grille(cursor, milieu, milieu + timedelta(days=HORIZON_NUITS),
+                                                          aujourd_hui=milieu)),
+        ("modifier_reservation", modifier),
+        ("supprimer_reservation", supprimer),
+    ]
+
+
+def mesurer(fonction, repetitions):
+    """Retourne les statistiques (ms) de plusieurs exécutions après un appel de chauffe"""
+    fonction()
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - t0) * 1000)
+    durees.sort()
+    return {
+        "mediane_ms": round(durees[len(durees) // 2], 3),
+        "p95_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.95))], 3),
+        "min_ms": round(durees[0], 3),
+        "repetitions": repetitions,
+    }
+
+
+def base_pour_echelle(dossier_cache, echelle, graine):
+    """Retourne le chemin d'une base générée pour l'échelle donnée (générée si absente)"""
+    os.makedirs(dossier_cache, exist_ok=True)
+    chemin = os.path.join(dossier_cache, f"hotel_{echelle}_{graine}.db")
+    if not os.path.exists(chemin):
+        t0 = time.perf_counter()
+        conn = sqlite3.connect(chemin + ".tmp")
+        generer(conn, echelle, nb_hotels=max(2, echelle // 50000), chambres_par_hotel=100, graine=graine)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+        os.replace(chemin + ".tmp", chemin)
+        print(f"  base de {echelle} réservations générée en {time.perf_counter() - t0:.1f}s")
+    return chemin
+
+
+def version_code():
+    """Retourne le commit git courant, si disponible"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--echelles", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--cache", default=os.path.join(tempfile.gettempdir(), "hotel_bench"))
+    parser.add_argument("--sortie", default="bench_results.json")
+    parser.add_argument("--comparer", help="fichier JSON de résultats précédents")
+    args = parser.parse_args()
+
+    resultats = []
+    for echelle in args.echelles:
+        print(f"Échelle {echelle} réservations")
+        source = base_pour_echelle(args.cache, echelle, args.graine)
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "hotel.db")
+            shutil.copy(source, chemin)
+            conn = configure_connection(sqlite3.connect(chemin))
+            # Une base en cache générée par un commit antérieur reçoit les migrations récentes
+            migrer(conn)
+            for nom, fonction in _requetes(conn):
+                stats = mesurer(fonction, args.repetitions)
+                resultats.append({"echelle": echelle, "requete": nom, **stats})
+                print(f"  {nom:<28} médiane {stats['mediane_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+            conn.close()
+
+    rapport = {
+        "commit": version_code(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "resultats": resultats,
+    }
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            precedent = json.load(f)
+        references = {(r["echelle"], r["requete"]): r["mediane_ms"] for r in precedent["resultats"]}
+        print(f"Comparaison avec {precedent.get('commit')} (médianes)")
+        for r in resultats:
+            ancien = references.get((r["echelle"], r["requete"]))
+            if ancien:
+                print(f"  {r['echelle']:>8} {r['requete']:<28} {ancien:>9.3f} -> {r['mediane_ms']:>9.3f} ms "
+                      f"(x{r['mediane_ms'] / ancien:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Temps de démarrage à froid et d'exécution du script Streamlit à chaque interaction
+
+Chaque mesure tourne dans un processus neuf (AppTest, sans navigateur) sur une
+base générée : import de Streamlit, premier rendu (imports du projet, mise à
+jour du schéma, page d'accueil) et modules lourds chargés à ce stade, puis
+pour chaque page le temps de la première visite et celui d'un rerun sans
+changement. Seule l'exécution du script est chronométrée (ScriptRunner), pas
+l'attente active d'AppTest ; comme sur le serveur, le bytecode de chaque
+script (compilation et transformation « magic » de Streamlit) est mis en cache
+pour le processus, alors qu'AppTest le recompile à chaque exécution. Fonctionne avec l'application multipage (st.navigation) comme
+avec l'ancien menu en liste déroulante : --app permet de mesurer une autre
+copie du dépôt (par exemple un git worktree d'un commit antérieur).
+
+Usage : python -m benchmarks.bench_startup --reservations 100000 --demarrages 3 --reruns 20
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULES_LOURDS = ('numpy', 'pandas', 'pyarrow', 'altair')
+APP_DEFAUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _chronometrer_scripts():
+    """Enveloppe ScriptRunner._run_script ; retourne la liste où s'ajoutent les durées d'exécution"""
+    from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+
+    durees = []
+    origine = ScriptRunner._run_script
+
+    def _run_script(self, rerun_data):
+        debut = time.perf_counter()
+        try:
+            return origine(self, rerun_data)
+        finally:
+            durees.append(time.perf_counter() - debut)
+
+    ScriptRunner._run_script = _run_script
+    return durees
+
+
+def _partager_cache_bytecode():
+    """Un seul cache de bytecode pour le processus, comme le Runtime du serveur"""
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    partage = ScriptCache()
+    origine = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, chemin: origine(partage, chemin)
+
+
+def _menu(at):
+    """Ancien menu en liste déroulante (None pour l'application multipage)"""
+    return next((s for s in at.sidebar.selectbox if s.label == "Menu"), None)
+
+
+def mesurer(app, nb_reruns):
+    """Mesures d'un processus neuf ; retourne un dictionnaire sérialisable en JSON"""
+    sys.path.insert(0, os.path.dirname(app))
+    debut = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    resultat = {'import_streamlit_ms': round((time.perf_counter() - debut) * 1000, 2)}
+    durees = _chronometrer_scripts()
+    _partager_cache_bytecode()
+
+    def executer(action):
+        """Durée totale (ms) des exécutions du script déclenchées par l'action (un st.rerun en ajoute une)"""
+        del durees[:]
+        action()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        return round(sum(durees) * 1000, 2)
+
+    at = AppTest.from_file(app, default_timeout=300)
+    resultat['premier_rendu_ms'] = executer(at.run)
+    resultat['modules_charges'] = [m for m in MODULES_LOURDS if m in sys.modules]
+
+    # Pages de l'application multipage (app.PAGES) ou options de l'ancien menu
+    menu = _menu(at)
+    if menu is None:
+        pages = {titre: fichier for fichier, titre in importlib.import_module('app').PAGES}
+    else:
+        pages = {titre: None for titre in menu.options}
+
+    resultat['pages'] = {}
+    for titre, fichier in pages.items():
+        if fichier is None:
+            premiere_visite = executer(lambda: _menu(at).select(titre).run())
+        else:
+            premiere_visite = executer(lambda: at.switch_page(fichier).run())
+        reruns = [executer(at.run) for _ in range(nb_reruns)]
+        resultat['pages'][titre] = {
+            'premiere_visite_ms': premiere_visite,
+            'rerun_ms': statistics.median(reruns) if reruns else None,
+            'modules_charges': [m for m in MODULES_LOURDS if m in sys.modules],
+        }
+    return resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=APP_DEFAUT, help="script Streamlit à mesurer")
+    parser.add_argument("--db", help="base existante (générée sinon)")
+    parser.add_argument("--reservations", type=int, default=100000)
+    parser.add_argument("--demarrages", type=int, default=3, help="nombre de processus neufs mesurés")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns mesurés par page")
+    parser.add_argument("--mesure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    app = os.path.abspath(args.app)
+
+    if args.mesure:
+        print(json.dumps(mesurer(app, args.reruns)))
+        return
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = args.db
+        if chemin is None:
+            # Chargé ici seulement : le processus mesuré ne doit importer que l'application
+            import sqlite3
+            from benchmarks.generator import generer
+            chemin = os.path.join(dossier, "hotel.db")
+            conn = sqlite3.connect(chemin)
+            debut = time.perf_counter()
+            generer(conn, args.reservations, 4, 300)
+            conn.close()
+            print(f"Base de {args.reservations} réservations générée en {time.perf_counter() - debut:.1f}s")
+
+        mesures = []
+        for _ in range(args.demarrages):
+            sortie = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mesure", "--app", app, "--reruns", str(args.reruns)],
+                env={**os.environ, 'HOTEL_DB': chemin}, cwd=os.path.dirname(app),
+                capture_output=True, text=True, check=True,
+            )
+            mesures.append(json.loads(sortie.stdout.splitlines()[-1]))
+
+    def mediane(extraire):
+        valeurs = [extraire(m) for m in mesures]
+        return statistics.median(valeurs) if None not in valeurs else None
+
+    print(f"{app} : médianes sur {len(mesures)} démarrage(s), {args.reruns} rerun(s) par page")
+    print(f"  import de Streamlit   {mediane(lambda m: m['import_streamlit_ms']):8.1f} ms")
+    print(f"  premier rendu         {mediane(lambda m: m['premier_rendu_ms']):8.1f} ms   "
+          f"modules lourds chargés : {', '.join(mesures[0]['modules_charges']) or 'aucun'}")
+    print(f"  {'page':<26} {'1re visite':>12} {'rerun':>10}   modules lourds chargés après la visite")
+    for titre in mesures[0]['pages']:
+        premiere = mediane(lambda m: m['pages'][titre]['premiere_visite_ms'])
+        rerun = mediane(lambda m: m['pages'][titre]['rerun_ms'])
+        print(f"  {titre:<26} {premiere:9.1f} ms {rerun:7.1f} ms   "
+              f"{', '.join(mesures[0]['pages'][titre]['modules_charges']) or 'aucun'}")
+
+
+if __name__ == "__main__":
+    main()
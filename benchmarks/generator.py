@@ -0,0 +1,189 @@
+"""Générateur reproductible de données synthétiques pour le schéma hôtelier
+
+Produit des hôtels, chambres, clients et réservations sans double réservation,
+avec une saisonnalité marquée (été et fêtes de fin d'année très chargés) et
+une part de réservations de groupe sur plusieurs chambres. Les arrivées déjà
+passées sont pointées (une part PART_NO_SHOW de no-shows).
+
+Usage : python -m benchmarks.generator --db /tmp/hotel_1m.db --reservations 1000000
+"""
+import argparse
+import heapq
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from bulk import reglages_chargement
+from migrations import VERSION_SCHEMA, migrer
+from replication import derniere_sequence, purger_journal
+
+VILLES = [
+    ('Paris', 75001), ('Lyon', 69002), ('Marseille', 13001), ('Nice', 6000), ('Bordeaux', 33000),
+    ('Toulouse', 31000), ('Nantes', 44000), ('Lille', 59000), ('Strasbourg', 67000), ('Biarritz', 64200),
+]
+PRENOMS = ['Jean', 'Marie', 'Paul', 'Sophie', 'Mohamed', 'Camille', 'Lucas', 'Léa', 'Hugo', 'Chloé',
+           'Louis', 'Emma', 'Nathan', 'Inès', 'Thomas', 'Manon', 'Yasmine', 'Karim', 'Julie', 'Éric']
+NOMS = ['Dupont', 'Leroy', 'Martin', 'Bernard', 'Durand', 'Petit', 'Moreau', 'Laurent', 'Simon', 'Michel',
+        'Lefèvre', 'Garcia', 'Roux', 'Fournier', 'Girard', 'Benali', 'Mercier', 'Faure', 'André', 'Blanc']
+TYPES = [(1, 'Simple', 80), (2, 'Double', 120), (3, 'Suite', 250)]
+
+# Écart moyen (en jours) entre deux séjours dans une même chambre, par mois
+ECART_PAR_MOIS = {1: 5, 2: 4, 3: 3, 4: 2.5, 5: 2, 6: 1, 7: 0.3, 8: 0.3, 9: 1.5, 10: 3, 11: 5, 12: 1}
+PART_GROUPES = 0.05
+PART_NO_SHOW = 0.03
+TAILLE_LOT = 50000
+
+
+def _executer_par_lots(cursor, requete, lignes):
+    """Insère un itérable de lignes par lots de TAILLE_LOT"""
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= TAILLE_LOT:
+            cursor.executemany(requete, lot)
+            lot = []
+    if lot:
+        cursor.executemany(requete, lot)
+
+
+def _sejours(rng, chambres_hotel, nb_reservations, debut):
+    """Produit les réservations (id, date_debut, date_fin, [chambres]) par ordre chronologique
+
+    Chaque chambre a sa propre date de disponibilité : un séjour commence
+    toujours après le départ précédent, donc aucune nuit n'est réservée deux fois.
+    """
+    libre = {}
+    tas = []
+    for id_hotel, chambres in chambres_hotel.items():
+        for id_chambre in chambres:
+            libre[id_chambre] = debut + timedelta(days=rng.randint(0, 3))
+            heapq.heappush(tas, (libre[id_chambre], id_chambre, id_hotel))
+
+    for id_reservation in range(1, nb_reservations + 1):
+        while True:
+            arrivee, id_chambre, id_hotel = heapq.heappop(tas)
+            if libre[id_chambre] == arrivee:
+                break
+        duree = 1 + min(int(rng.expovariate(1 / 2.5)), 20)
+        depart = arrivee + timedelta(days=duree)
+
+        # Réservation de groupe : d'autres chambres libres du même hôtel aux mêmes dates
+        chambres = [id_chambre]
+        if rng.random() < PART_GROUPES:
+            voisines = [c for c in chambres_hotel[id_hotel] if c != id_chambre and libre[c] <= arrivee]
+            chambres += rng.sample(voisines, min(len(voisines), rng.randint(1, 8)))
+
+        for c in chambres:
+            ecart = rng.expovariate(1 / ECART_PAR_MOIS[depart.month])
+            libre[c] = depart + timedelta(days=int(ecart))
+            heapq.heappush(tas, (libre[c], c, id_hotel))
+        yield id_reservation, arrivee.isoformat(), depart.isoformat(), chambres
+
+
+def generer(conn, nb_reservations, nb_hotels=10, chambres_par_hotel=100, nb_clients=None,
+            debut=date(2015, 1, 1), graine=42):
+    """Remplit une base vide et retourne le nombre de lignes créées par table
+
+    Les tables de base sont chargées d'abord (migration 1 seulement), puis les
+    migrations suivantes construisent index, triggers et tables dérivées
+    (occupation, statistiques) en une passe.
+    """
+    rng = random.Random(graine)
+    nb_clients = nb_clients or max(nb_reservations // 4, 10)
+    migrer(conn, cible=1)
+    cursor = conn.cursor()
+
+    with reglages_chargement(conn):
+        cursor.executemany("INSERT INTO TypeChambre VALUES (?, ?, ?)", TYPES)
+        cursor.executemany("INSERT INTO Hotel VALUES (?, ?, 'France', ?)", [
+            (h, VILLES[(h - 1) % len(VILLES)][0] + ('' if h <= len(VILLES) else f" {h}"),
+             VILLES[(h - 1) % len(VILLES)][1])
+            for h in range(1, nb_hotels + 1)
+        ])
+
+        chambres = {}
+        lignes_chambres = []
+        for h in range(1, nb_hotels + 1):
+            chambres[h] = []
+            for i in range(chambres_par_hotel):
+                id_chambre = (h - 1) * chambres_par_hotel + i + 1
+                etage = 1 + i // 20
+                chambres[h].append(id_chambre)
+                lignes_chambres.append((id_chambre, etage * 100 + i % 20 + 1, etage,
+                                        int(rng.random() < 0.2), h, rng.choice(TYPES)[0]))
+        cursor.executemany("INSERT INTO Chambre VALUES (?, ?, ?, ?, ?, ?)", lignes_chambres)
+
+        def clients():
+            for c in range(1, nb_clients + 1):
+                prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+                ville, code_postal = rng.choice(VILLES)
+                yield (c, f"{prenom} {nom}", f"{rng.randint(1, 200)} rue de la Paix", ville, code_postal,
+                       f"{prenom.lower()}.{nom.lower()}.{c}@email.fr", f"06{rng.randint(0, 99999999):08d}")
+        _executer_par_lots(cursor, "INSERT INTO Client VALUES (?, ?, ?, ?, ?, ?, ?)", clients())
+
+        # Réservations et liens écrits par lots, sans tout garder en mémoire
+        nb_liens = 0
+        reservations, liens = [], []
+        for id_reservation, arrivee, depart, chambres_resa in _sejours(rng, chambres, nb_reservations, debut):
+            reservations.append((id_reservation, arrivee, depart, rng.randint(1, nb_clients)))
+            liens.extend((id_reservation, c) for c in chambres_resa)
+            if len(reservations) >= TAILLE_LOT:
+                cursor.executemany("INSERT INTO Reservation VALUES (?, ?, ?, ?)", reservations)
+                cursor.executemany("INSERT INTO ReservationChambre VALUES (?, ?)", liens)
+                nb_liens += len(liens)
+                reservations, liens = [], []
+        cursor.executemany("INSERT INTO Reservation VALUES (?, ?, ?, ?)", reservations)
+        cursor.executemany("INSERT INTO ReservationChambre VALUES (?, ?)", liens)
+        nb_liens += len(liens)
+        conn.commit()
+
+        migrer(conn, cible=VERSION_SCHEMA)
+
+        # Pointage des arrivées passées ; le journal d'une base générée repart de ces données
+        cursor.execute("SELECT COUNT(*) FROM Reservation WHERE date_debut <= ?", (date.today().isoformat(),))
+        nb_arrivees = cursor.fetchone()[0]
+        _executer_par_lots(cursor, "INSERT INTO Arrivee (id_reservation, statut) VALUES (?, ?)", (
+            (id_reservation, 'no_show' if rng.random() < PART_NO_SHOW else 'arrive')
+            for id_reservation, in conn.execute("SELECT id_reservation FROM Reservation WHERE date_debut <= ?",
+                                                (date.today().isoformat(),))
+        ))
+        conn.commit()
+        purger_journal(conn, derniere_sequence(cursor))
+        cursor.execute("ANALYZE")
+        conn.commit()
+
+    return {
+        'Hotel': nb_hotels,
+        'Chambre': len(lignes_chambres),
+        'Client': nb_clients,
+        'Reservation': nb_reservations,
+        'ReservationChambre': nb_liens,
+        'Arrivee': nb_arrivees,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="fichier SQLite à créer")
+    parser.add_argument("--reservations", type=int, default=100000)
+    parser.add_argument("--hotels", type=int, default=10)
+    parser.add_argument("--chambres-par-hotel", type=int, default=100)
+    parser.add_argument("--clients", type=int, help="défaut : un client pour quatre réservations")
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} existe déjà")
+    conn = sqlite3.connect(args.db)
+    t0 = time.perf_counter()
+    lignes = generer(conn, args.reservations, args.hotels, args.chambres_par_hotel, args.clients,
+                     graine=args.graine)
+    conn.close()
+    print(f"Base générée en {time.perf_counter() - t0:.1f}s : "
+          + ", ".join(f"{table} {nombre}" for table, nombre in lignes.items()))
+
+
+if __name__ == "__main__":
+    main()
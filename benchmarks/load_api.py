@@ -0,0 +1,185 @@
+"""Test de charge de l'API JSON (api.py) : latences p50/p99 et débit
+
+Lance le service dans un processus séparé sur une base générée, puis simule
+des channel managers : des connexions keep-alive simultanées qui enchaînent
+surtout des recherches de disponibilité (sur un nombre limité de périodes,
+comme les interrogations répétées des OTA), quelques recherches de client et
+des cycles réservation / modification / annulation. Chaque configuration
+de cache est mesurée séparément.
+
+Usage : python -m benchmarks.load_api --reservations 100000 --connexions 64 --duree 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.generator import generer
+
+
+class ClientHttp:
+    """Connexion HTTP/1.1 keep-alive minimale vers l'API"""
+
+    def __init__(self, hote, port):
+        self.hote, self.port = hote, port
+        self.reader = self.writer = None
+
+    async def requete(self, methode, cible, corps=None, decoder=True):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.hote, self.port)
+        donnees = json.dumps(corps).encode() if corps is not None else b''
+        self.writer.write(f"{methode} {cible} HTTP/1.1\r\nHost: {self.hote}\r\n"
+                          f"Content-Length: {len(donnees)}\r\n\r\n".encode() + donnees)
+        await self.writer.drain()
+        statut = int((await self.reader.readline()).split()[1])
+        longueur = 0
+        while True:
+            ligne = await self.reader.readline()
+            if ligne in (b'\r\n', b''):
+                break
+            nom, _, valeur = ligne.decode().partition(':')
+            if nom.lower() == 'content-length':
+                longueur = int(valeur)
+        reponse = await self.reader.readexactly(longueur)
+        return statut, json.loads(reponse) if decoder else reponse
+
+    def fermer(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def centile(valeurs, p):
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p))] * 1000 if valeurs else 0.0
+
+
+async def canal(hote, port, fin_test, graine, periodes, id_clients, stats):
+    """Boucle d'un channel manager : 90 % disponibilités, 5 % clients, 5 % cycles de réservation"""
+    rng = random.Random(graine)
+    client = ClientHttp(hote, port)
+    try:
+        while time.perf_counter() < fin_test:
+            tirage = rng.random()
+            t0 = time.perf_counter()
+            if tirage < 0.90:
+                debut, fin = rng.choice(periodes)
+                operation = 'disponibilites'
+                statut, _ = await client.requete('GET', f"/disponibilites?debut={debut}&fin={fin}", decoder=False)
+            elif tirage < 0.95:
+                operation = 'clients'
+                statut, _ = await client.requete('GET', f"/clients?q={rng.choice(['mar', 'dup', 'le', 'pa'])}")
+            else:
+                operation = 'reservation'
+                debut, fin = rng.choice(periodes)
+                statut, corps = await client.requete('GET', f"/disponibilites?debut={debut}&fin={fin}")
+                if statut == 200 and corps['chambres']:
+                    chambre = rng.choice(corps['chambres'])['id_chambre']
+                    statut, corps = await client.requete('POST', '/reservations', {
+                        'id_client': rng.choice(id_clients), 'date_debut': debut, 'date_fin': fin,
+                        'chambres': [chambre],
+                    })
+                    if statut == 201:
+                        id_reservation = corps['id_reservation']
+                        nouvelle_fin = (date.fromisoformat(fin) + timedelta(days=1)).isoformat()
+                        await client.requete('PATCH', f"/reservations/{id_reservation}",
+                                             {'date_debut': debut, 'date_fin': nouvelle_fin})
+                        statut, _ = await client.requete('DELETE', f"/reservations/{id_reservation}")
+            duree = time.perf_counter() - t0
+            stats.setdefault(operation, []).append(duree)
+            stats.setdefault(('statut', statut), []).append(duree)
+    finally:
+        client.fermer()
+
+
+async def attendre_service(hote, port, delai=60):
+    limite = time.perf_counter() + delai
+    while time.perf_counter() < limite:
+        try:
+            client = ClientHttp(hote, port)
+            await client.requete('GET', '/sante')
+            client.fermer()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Le service ne répond pas")
+
+
+async def mesurer(hote, port, nb_connexions, duree, periodes, id_clients):
+    await attendre_service(hote, port)
+    stats = {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        canal(hote, port, t0 + duree, i, periodes, id_clients, stats) for i in range(nb_connexions)
+    ))
+    ecoule = time.perf_counter() - t0
+    client = ClientHttp(hote, port)
+    _, sante = await client.requete('GET', '/sante')
+    client.fermer()
+    return stats, ecoule, sante['cache']
+
+
+def afficher(libelle, stats, ecoule, cache):
+    total = sum(len(v) for k, v in stats.items() if not isinstance(k, tuple))
+    print(f"[{libelle}] {total} opérations en {ecoule:.1f}s ({total / ecoule:.0f} op/s) ; "
+          f"cache : {cache['succes']} succès / {cache['echecs']} échecs")
+    for operation in ('disponibilites', 'clients', 'reservation'):
+        durees = sorted(stats.get(operation, []))
+        if durees:
+            print(f"  {operation:<15} {len(durees):>7} op   p50 {centile(durees, 0.5):8.2f} ms   "
+                  f"p99 {centile(durees, 0.99):8.2f} ms")
+    statuts = sorted((k[1], len(v)) for k, v in stats.items() if isinstance(k, tuple))
+    print("  statuts : " + ", ".join(f"{statut} x {nombre}" for statut, nombre in statuts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=100000)
+    parser.add_argument("--hotels", type=int, default=4)
+    parser.add_argument("--chambres-par-hotel", type=int, default=300)
+    parser.add_argument("--connexions", type=int, default=64)
+    parser.add_argument("--duree", type=float, default=10, help="durée de chaque mesure en secondes")
+    parser.add_argument("--periodes", type=int, default=30, help="nombre de périodes distinctes interrogées")
+    parser.add_argument("--ttl", type=float, nargs="+", default=[0, 2],
+                        help="durées de cache à comparer (0 = sans cache)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "hotel.db")
+        conn = sqlite3.connect(chemin)
+        t0 = time.perf_counter()
+        generer(conn, args.reservations, args.hotels, args.chambres_par_hotel)
+        print(f"Base de {args.reservations} réservations générée en {time.perf_counter() - t0:.1f}s")
+        derniere = date.fromisoformat(conn.execute("SELECT MAX(date_fin) FROM Reservation").fetchone()[0])
+        id_clients = [id_client for id_client, in conn.execute("SELECT id_client FROM Client LIMIT 1000")]
+        conn.close()
+
+        # Périodes de 1 à 4 nuits dans les mois qui suivent l'historique (disponibilités non vides)
+        rng = random.Random(0)
+        periodes = []
+        for _ in range(args.periodes):
+            debut = derniere + timedelta(days=rng.randint(1, 120))
+            periodes.append((debut.isoformat(), (debut + timedelta(days=rng.randint(1, 4))).isoformat()))
+
+        for ttl in args.ttl:
+            env = {**os.environ, 'HOTEL_DB': chemin, 'HOTEL_API_CACHE_TTL': str(ttl)}
+            service = subprocess.Popen([sys.executable, "-m", "api", "--port", str(args.port)], env=env,
+                                       stdout=subprocess.DEVNULL)
+            try:
+                stats, ecoule, cache = asyncio.run(
+                    mesurer("127.0.0.1", args.port, args.connexions, args.duree, periodes, id_clients)
+                )
+            finally:
+                service.terminate()
+                service.wait()
+            afficher("sans cache" if ttl <= 0 else f"cache {ttl:g}s", stats, ecoule, cache)
+
+
+if __name__ == "__main__":
+    main()
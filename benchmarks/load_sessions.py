@@ -0,0 +1,114 @@
+"""Test de charge : sessions simultanées sur une base locale
+
+Simule des sessions de réception (lectures du tableau de bord, recherches de
+disponibilité, créations de clients et de réservations) dans des threads, soit
+avec une connexion ouverte à chaque appel (ancien comportement), soit avec le
+pool WAL de db.py.
+
+Usage : python -m benchmarks.load_sessions --sessions 50 --operations 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from availability import chambres_disponibles
+from db import ConnectionPool
+from migrations import migrer
+from views.common import insert_sample_data
+
+
+def preparer_base(chemin):
+    """Crée une base de test avec les données d'exemple"""
+    conn = sqlite3.connect(chemin)
+    migrer(conn)
+    insert_sample_data(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+def session(ouvrir, nb_operations, graine, stats):
+    """Boucle d'une session : 80 % de lectures, 20 % d'écritures"""
+    rng = random.Random(graine)
+    for _ in range(nb_operations):
+        t0 = time.perf_counter()
+        conn = ouvrir()
+        try:
+            cursor = conn.cursor()
+            if rng.random() < 0.8:
+                cursor.execute("SELECT COUNT(*) FROM Reservation").fetchone()
+                cursor.execute("SELECT COUNT(*) FROM Client").fetchone()
+                d1 = date(2025, 1, 1) + timedelta(days=rng.randint(0, 365))
+                chambres_disponibles(cursor, d1, d1 + timedelta(days=2))
+            else:
+                cursor.execute(
+                    "INSERT INTO Client (nom, email) VALUES (?, ?)",
+                    (f"Client {graine}", f"client{graine}-{rng.random()}@test.fr")
+                )
+                d1 = date(2026, 1, 1) + timedelta(days=rng.randint(0, 365))
+                cursor.execute(
+                    "INSERT INTO Reservation (date_debut, date_fin, id_client) VALUES (?, ?, ?)",
+                    (d1.isoformat(), (d1 + timedelta(days=1)).isoformat(), cursor.lastrowid)
+                )
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            with stats["lock"]:
+                stats["erreurs"][str(e)] = stats["erreurs"].get(str(e), 0) + 1
+            continue
+        finally:
+            conn.close()
+        with stats["lock"]:
+            stats["latences"].append(time.perf_counter() - t0)
+
+
+def lancer(mode, chemin, nb_sessions, nb_operations):
+    """Exécute toutes les sessions et affiche le débit, la latence et les erreurs"""
+    if mode == "pool":
+        pool = ConnectionPool(chemin, max_idle=nb_sessions)
+        ouvrir = pool.acquire
+    else:
+        pool = None
+        ouvrir = lambda: sqlite3.connect(chemin)
+
+    stats = {"lock": threading.Lock(), "latences": [], "erreurs": {}}
+    threads = [
+        threading.Thread(target=session, args=(ouvrir, nb_operations, i, stats))
+        for i in range(nb_sessions)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duree = time.perf_counter() - t0
+    if pool is not None:
+        pool.close_all()
+
+    latences = sorted(stats["latences"])
+    p50 = latences[len(latences) // 2] * 1000 if latences else 0
+    p99 = latences[int(len(latences) * 0.99)] * 1000 if latences else 0
+    print(f"[{mode}] {len(latences)} opérations en {duree:.2f}s "
+          f"({len(latences) / duree:.0f} op/s), p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    for message, nombre in stats["erreurs"].items():
+        print(f"[{mode}]   {nombre} x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--operations", type=int, default=200)
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="charge_")
+    for mode in ("connexion", "pool"):
+        chemin = os.path.join(dossier, f"{mode}.db")
+        preparer_base(chemin)
+        lancer(mode, chemin, args.sessions, args.operations)
+
+
+if __name__ == "__main__":
+    main()
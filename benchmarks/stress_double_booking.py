@@ -0,0 +1,119 @@
+"""Test de stress : réservations concurrentes de la même chambre aux mêmes dates
+
+Des threads (ou des processus) tentent en boucle de réserver la même chambre
+sur des périodes qui se chevauchent. À la fin, on vérifie qu'aucune nuit n'est
+réservée deux fois et on mesure le débit de COMMIT.
+
+Usage : python -m benchmarks.stress_double_booking --workers 16 --tentatives 200 [--processus]
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from db import ConnectionPool
+from booking import ChambreIndisponible, creer_reservation
+from migrations import migrer
+
+NB_CHAMBRES = 4
+
+
+def preparer_base(chemin):
+    """Crée une base avec un hôtel, quelques chambres et un client"""
+    conn = sqlite3.connect(chemin)
+    migrer(conn)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO Hotel VALUES (1, 'Paris', 'France', 75001)")
+    cursor.execute("INSERT INTO TypeChambre VALUES (1, 'Simple', 80)")
+    cursor.executemany("INSERT INTO Chambre VALUES (?, ?, 1, 0, 1, 1)",
+                       [(c, 100 + c) for c in range(1, NB_CHAMBRES + 1)])
+    cursor.execute("INSERT INTO Client (id_client, nom) VALUES (1, 'Client test')")
+    conn.commit()
+    conn.close()
+
+
+def travailleur(chemin, graine, nb_tentatives, resultats):
+    """Tente nb_tentatives réservations sur la même chambre autour des mêmes dates"""
+    pool = ConnectionPool(chemin, max_idle=1)
+    rng = random.Random(graine)
+    succes = conflits = 0
+    for _ in range(nb_tentatives):
+        conn = pool.acquire()
+        debut = date(2026, 1, 1) + timedelta(days=rng.randint(0, 60))
+        try:
+            creer_reservation(conn, 1, debut, debut + timedelta(days=rng.randint(1, 4)),
+                              [rng.randint(1, NB_CHAMBRES)])
+            succes += 1
+        except ChambreIndisponible:
+            conflits += 1
+        finally:
+            conn.close()
+    pool.close_all()
+    resultats.put((succes, conflits))
+
+
+def verifier(chemin):
+    """Retourne le nombre de nuits réservées plusieurs fois pour la même chambre"""
+    conn = sqlite3.connect(chemin)
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT COUNT(*)
+    FROM ReservationChambre RC1
+    JOIN Reservation R1 ON RC1.id_reservation = R1.id_reservation
+    JOIN ReservationChambre RC2 ON RC2.id_chambre = RC1.id_chambre
+                                AND RC2.id_reservation > RC1.id_reservation
+    JOIN Reservation R2 ON RC2.id_reservation = R2.id_reservation
+    WHERE R1.date_debut < R2.date_fin AND R2.date_debut < R1.date_fin
+    ''')
+    chevauchements = cursor.fetchone()[0]
+    conn.close()
+    return chevauchements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--tentatives", type=int, default=200)
+    parser.add_argument("--processus", action="store_true", help="utiliser des processus au lieu de threads")
+    args = parser.parse_args()
+
+    chemin = os.path.join(tempfile.mkdtemp(prefix="stress_"), "hotel.db")
+    preparer_base(chemin)
+
+    if args.processus:
+        resultats = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=travailleur, args=(chemin, i, args.tentatives, resultats))
+                   for i in range(args.workers)]
+    else:
+        resultats = queue.Queue()
+        workers = [threading.Thread(target=travailleur, args=(chemin, i, args.tentatives, resultats))
+                   for i in range(args.workers)]
+
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    bilans = [resultats.get() for _ in workers]
+    for w in workers:
+        w.join()
+    duree = time.perf_counter() - t0
+
+    succes = sum(b[0] for b in bilans)
+    conflits = sum(b[1] for b in bilans)
+    chevauchements = verifier(chemin)
+    mode = "processus" if args.processus else "threads"
+    print(f"{args.workers} {mode} x {args.tentatives} tentatives en {duree:.2f}s")
+    print(f"  réservations validées : {succes} ({succes / duree:.0f} commits/s)")
+    print(f"  refus pour conflit    : {conflits}")
+    print(f"  doubles réservations  : {chevauchements}")
+    if chevauchements:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Test : identifiants de réservation uniques entre la base principale et l'archive
+
+Scénario de la réattribution d'identifiants : la réservation 1 (pointée
+no-show) est archivée, la réservation 2 reste en place puis est supprimée, et
+une nouvelle réservation est créée. Elle ne doit reprendre aucun identifiant
+archivé : l'historique du premier client garde son séjour archivé et la
+nouvelle réservation n'hérite d'aucun pointage. Le scénario est rejoué sur une
+base créée avant les migrations 9 et 10 (sans AUTOINCREMENT), mise à jour ensuite.
+
+Usage : python -m benchmarks.verif_identifiants
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import date
+
+from archive import archiver, attacher_archive, sejours_client
+from booking import creer_reservation, pointer_arrivee, supprimer_reservation
+from db import configure_connection, transaction
+from migrations import VERSION_SCHEMA, migrer
+
+
+def preparer_base(chemin, version):
+    """Crée une base au schéma `version` avec un hôtel, deux chambres et deux clients"""
+    conn = configure_connection(sqlite3.connect(chemin))
+    migrer(conn, cible=version)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO Hotel VALUES (1, 'Paris', 'France', 75001)")
+    cursor.execute("INSERT INTO TypeChambre VALUES (1, 'Simple', 80)")
+    cursor.executemany("INSERT INTO Chambre VALUES (?, ?, 1, 0, 1, 1)", [(1, 101), (2, 102)])
+    cursor.executemany("INSERT INTO Client (id_client, nom) VALUES (?, ?)", [(1, 'Client A'), (2, 'Client B')])
+    conn.commit()
+    return conn
+
+
+def archiver_ancienne_version(conn):
+    """Archive toutes les réservations comme une version sans AUTOINCREMENT ; retourne leur nombre"""
+    attacher_archive(conn)
+    with transaction(conn) as cursor:
+        cursor.execute('''
+        INSERT INTO archive.Reservation (id_reservation, date_debut, date_fin, id_client, date_archivage)
+        SELECT id_reservation, date_debut, date_fin, id_client, datetime('now') FROM main.Reservation
+        ''')
+        cursor.execute("INSERT INTO archive.ReservationChambre SELECT id_reservation, id_chambre FROM main.ReservationChambre")
+        cursor.execute("DELETE FROM main.ReservationChambre")
+        cursor.execute("DELETE FROM main.Reservation")
+        return cursor.rowcount
+
+
+def verifier(version):
+    """Rejoue le scénario sur une base créée au schéma `version` ; lève AssertionError en cas d'échec"""
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "hotel.db")
+        conn = preparer_base(chemin, version)
+        archivee = creer_reservation(conn, 1, '2020-01-01', '2020-01-03', [1])
+        pointer_arrivee(conn, archivee, 'no_show')
+        derniere = creer_reservation(conn, 1, '2020-02-01', '2020-02-03', [2])
+        if version < VERSION_SCHEMA:
+            nb_archivees = archiver_ancienne_version(conn)
+        else:
+            nb_archivees, _ = archiver(conn, horizon_jours=0, aujourd_hui=date(2021, 1, 1))
+        assert nb_archivees == 2, f"{nb_archivees} réservation(s) archivée(s) au lieu de 2"
+
+        # Base créée avant la migration 9 : mise à jour au redémarrage, une fois l'archive remplie
+        conn.close()
+        conn = configure_connection(sqlite3.connect(chemin))
+        migrer(conn)
+        nouvelle = creer_reservation(conn, 2, '2030-01-01', '2030-01-03', [1])
+        supprimer_reservation(conn, nouvelle)
+        nouvelle = creer_reservation(conn, 2, '2030-01-01', '2030-01-03', [1])
+
+        attacher_archive(conn)
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT COUNT(*) FROM main.Reservation R
+        WHERE EXISTS (SELECT 1 FROM archive.Reservation A WHERE A.id_reservation = R.id_reservation)
+        ''')
+        assert cursor.fetchone()[0] == 0, "identifiant archivé réattribué"
+        assert nouvelle > derniere, f"nouvelle réservation {nouvelle} <= {derniere}"
+        assert [ligne[0] for ligne in sejours_client(cursor, 1)] == [derniere, archivee], \
+            "séjours archivés absents de l'historique du client A"
+        cursor.execute("SELECT COUNT(*) FROM Arrivee WHERE id_reservation = ?", (nouvelle,))
+        assert cursor.fetchone()[0] == 0, "la nouvelle réservation hérite d'un pointage"
+        conn.close()
+
+
+def main():
+    for version in (8, VERSION_SCHEMA):
+        verifier(version)
+        print(f"Base créée au schéma {version} : identifiants uniques entre la base et l'archive")
+
+
+if __name__ == "__main__":
+    main()
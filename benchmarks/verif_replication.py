@@ -0,0 +1,85 @@
+"""Test : réplique fidèle après un changement de tarif, purge du journal limitée aux répliques
+
+1. Une réplique est initialisée, puis le tarif d'un type de chambre change et
+   une réservation est créée : les agrégats StatNuit de la réplique doivent
+   être ceux de la source (ses triggers lisent le tarif rejoué).
+2. La purge de la maintenance ne supprime que les modifications déjà
+   appliquées par la réplique : elle se rattrape ensuite sans réinitialisation.
+3. Purgé au-delà de sa position, une réplique est réinitialisée par sauvegarde
+   et reste identique à la source.
+
+Usage : python -m benchmarks.verif_replication
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+from booking import creer_reservation
+from db import configure_connection
+from migrations import migrer
+from replication import limite_purge, ouvrir_replique, purger_journal, rattraper
+
+REQUETE_STATS = "SELECT id_hotel, nuit, chambres_occupees, revenu FROM StatNuit ORDER BY id_hotel, nuit"
+
+
+def preparer_source(chemin):
+    """Crée une base à jour avec un hôtel, un type de chambre, deux chambres et un client"""
+    conn = configure_connection(sqlite3.connect(chemin))
+    migrer(conn)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO Hotel VALUES (1, 'Paris', 'France', 75001)")
+    cursor.execute("INSERT INTO TypeChambre VALUES (1, 'Simple', 80)")
+    cursor.executemany("INSERT INTO Chambre VALUES (?, ?, 1, 0, 1, 1)", [(1, 101), (2, 102)])
+    cursor.execute("INSERT INTO Client (id_client, nom) VALUES (1, 'Client A')")
+    conn.commit()
+    return conn
+
+
+def comparer(source, replica, etape):
+    stats_source = source.execute(REQUETE_STATS).fetchall()
+    stats_replique = replica.execute(REQUETE_STATS).fetchall()
+    assert stats_source == stats_replique, f"{etape} : StatNuit {stats_replique} au lieu de {stats_source}"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as dossier:
+        source = preparer_source(os.path.join(dossier, "hotel.db"))
+        chemin_replique = os.path.join(dossier, "replique.db")
+        replica = ouvrir_replique(chemin_replique)
+        assert rattraper(source, replica) is None, "première synchronisation sans sauvegarde complète"
+
+        creer_reservation(source, 1, '2030-01-01', '2030-01-03', [1])
+        source.execute("UPDATE TypeChambre SET prix_base = 200 WHERE id_type = 1")
+        source.commit()
+        creer_reservation(source, 1, '2030-01-01', '2030-01-03', [2])
+        assert rattraper(source, replica), "modifications non rejouées"
+        comparer(source, replica, "changement de tarif")
+        print("Changement de tarif : StatNuit identique sur la source et la réplique")
+
+        cursor = source.cursor()
+        creer_reservation(source, 1, '2030-02-01', '2030-02-03', [1])
+        # Horodatage du journal à la milliseconde : les modifications doivent être antérieures à la purge
+        time.sleep(0.01)
+        limite = limite_purge(cursor, 0, [chemin_replique])
+        position = replica.execute("SELECT seq FROM EtatReplique").fetchone()[0]
+        assert limite == position, f"purge jusqu'à {limite} au lieu de la position de la réplique {position}"
+        assert purger_journal(source, limite) > 0, "rien n'a été purgé"
+        cursor.execute("SELECT COUNT(*) FROM JournalModifications WHERE seq > ?", (limite,))
+        assert cursor.fetchone()[0] > 0, "modifications non appliquées purgées"
+        assert rattraper(source, replica), "la réplique ne se rattrape pas après la purge"
+        comparer(source, replica, "purge limitée à la réplique")
+        print(f"Purge jusqu'à la séquence {limite} : la réplique se rattrape sans réinitialisation")
+
+        creer_reservation(source, 1, '2030-03-01', '2030-03-03', [1])
+        time.sleep(0.01)
+        purger_journal(source, limite_purge(cursor, 0))
+        assert rattraper(source, replica) is None, "réplique en retard sur la purge non réinitialisée"
+        comparer(source, replica, "réinitialisation après purge")
+        print("Purge au-delà de la réplique : réinitialisée par sauvegarde")
+        source.close()
+        replica.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+from datetime import date
+
+from availability import CALENDRIER_DEBUT, CALENDRIER_FIN, bloc_chambres_libres, chambres_occupees, format_date
+from db import transaction
+
+
+class ChambreIndisponible(Exception):
+    """Une des chambres demandées est déjà réservée sur la période"""
+
+
+class ReservationInvalide(Exception):
+    """Modification qui laisserait la réservation dans un état incohérent"""
+
+
+# Pointage d'une réservation à sa date d'arrivée
+STATUTS_ARRIVEE = {'arrive': "Client arrivé", 'no_show': "No-show"}
+
+
+def _est_conflit_occupation(erreur):
+    """Indique si une IntegrityError provient de l'unicité (chambre, nuit)"""
+    return "OccupationNuit" in str(erreur)
+
+
+def valider_periode(date_debut, date_fin):
+    """Retourne la période au format 'YYYY-MM-DD' après l'avoir validée (ReservationInvalide sinon)
+
+    Les nuits hors du calendrier ne seraient pas inscrites dans OccupationNuit :
+    une période vide, inversée ou hors calendrier échapperait au contrôle des
+    doubles réservations.
+    """
+    debut, fin = format_date(date_debut), format_date(date_fin)
+    for valeur in (debut, fin):
+        try:
+            valide = date.fromisoformat(valeur).isoformat() == valeur
+        except (TypeError, ValueError):
+            valide = False
+        if not valide:
+            raise ReservationInvalide(f"Date invalide : {valeur} (AAAA-MM-JJ attendu)")
+    if debut >= fin:
+        raise ReservationInvalide("La date de départ doit être postérieure à la date d'arrivée")
+    if debut < CALENDRIER_DEBUT or fin > CALENDRIER_FIN:
+        raise ReservationInvalide(f"Les séjours doivent être compris entre le {CALENDRIER_DEBUT} et le {CALENDRIER_FIN}")
+    return debut, fin
+
+
+def _inserer_reservation(cursor, id_client, debut, fin, chambres):
+    """Insère une réservation et ses liens chambre ; retourne son identifiant"""
+    cursor.execute('''
+    INSERT INTO Reservation (date_debut, date_fin, id_client)
+    VALUES (?, ?, ?)
+    RETURNING id_reservation
+    ''', (debut, fin, id_client))
+    id_reservation = cursor.fetchone()[0]
+    cursor.executemany(
+        "INSERT INTO ReservationChambre (id_reservation, id_chambre) VALUES (?, ?)",
+        [(id_reservation, id_chambre) for id_chambre in chambres]
+    )
+    return id_reservation
+
+
+def _message_occupees(occupees):
+    """Message d'erreur listant les chambres déjà réservées"""
+    if len(occupees) == 1:
+        return f"La chambre {next(iter(occupees))} est déjà réservée sur cette période"
+    return f"Les chambres {', '.join(map(str, sorted(occupees)))} sont déjà réservées sur cette période"
+
+
+def _chambres_reservation(cursor, id_reservation):
+    """Retourne les identifiants des chambres liées à une réservation"""
+    cursor.execute("SELECT id_chambre FROM ReservationChambre WHERE id_reservation = ?", (id_reservation,))
+    return [ligne[0] for ligne in cursor.fetchall()]
+
+
+def creer_client(conn, nom, adresse, ville, code_postal, email, telephone):
+    """Insère un client et retourne son identifiant (alloué par SQLite)"""
+    with transaction(conn) as cursor:
+        cursor.execute('''
+        INSERT INTO Client (nom, adresse, ville, code_postal, email, telephone)
+        VALUES (?, ?, ?, ?, ?, ?)
+        RETURNING id_client
+        ''', (nom, adresse, ville, code_postal, email, telephone))
+        return cursor.fetchone()[0]
+
+
+def creer_reservation(conn, id_client, date_debut, date_fin, chambres):
+    """Crée une réservation pour une ou plusieurs chambres et retourne son identifiant
+
+    La vérification de disponibilité et les insertions se font dans une même
+    transaction BEGIN IMMEDIATE : aucune autre session ne peut réserver les
+    mêmes nuits entre les deux. La contrainte d'unicité de OccupationNuit
+    reste le garde-fou final.
+    """
+    debut, fin = valider_periode(date_debut, date_fin)
+    try:
+        with transaction(conn) as cursor:
+            occupees = chambres_occupees(cursor, chambres, debut, fin)
+            if occupees:
+                raise ChambreIndisponible(_message_occupees(occupees))
+            return _inserer_reservation(cursor, id_client, debut, fin, chambres)
+    except sqlite3.IntegrityError as e:
+        if _est_conflit_occupation(e):
+            raise ChambreIndisponible("Une des chambres est déjà réservée sur cette période") from e
+        raise
+
+
+def reserver_groupe(conn, id_client, id_hotel, id_type, nb_chambres, date_debut, date_fin):
+    """Réserve nb_chambres chambres d'un type dans un hôtel et retourne (id_reservation, chambres)
+
+    Le bloc de chambres libres est choisi par une seule requête ensembliste,
+    sous le verrou d'écriture de la transaction, puis tous les liens sont
+    insérés en un seul executemany : la réservation est complète ou n'existe pas.
+    """
+    debut, fin = valider_periode(date_debut, date_fin)
+    try:
+        with transaction(conn) as cursor:
+            chambres = bloc_chambres_libres(cursor, id_hotel, id_type, debut, fin, nb_chambres)
+            if len(chambres) < nb_chambres:
+                raise ChambreIndisponible(
+                    f"Seulement {len(chambres)} chambre(s) de ce type disponible(s) sur cette période "
+                    f"({nb_chambres} demandée(s))"
+                )
+            return _inserer_reservation(cursor, id_client, debut, fin, chambres), chambres
+    except sqlite3.IntegrityError as e:
+        if _est_conflit_occupation(e):
+            raise ChambreIndisponible("Une des chambres est déjà réservée sur cette période") from e
+        raise
+
+
+def modifier_reservation(conn, id_reservation, date_debut, date_fin, chambres=None):
+    """Change les dates d'une réservation et, si `chambres` est précisé, remplace ses chambres
+
+    Sans `chambres`, toutes les chambres actuelles sont conservées aux nouvelles dates.
+    """
+    debut, fin = valider_periode(date_debut, date_fin)
+    try:
+        with transaction(conn) as cursor:
+            if chambres is None:
+                chambres = _chambres_reservation(cursor, id_reservation)
+            if not chambres:
+                raise ReservationInvalide("Une réservation doit comporter au moins une chambre")
+            occupees = chambres_occupees(cursor, chambres, debut, fin, id_reservation)
+            if occupees:
+                raise ChambreIndisponible(_message_occupees(occupees))
+            # Les liens sont retirés puis recréés : l'occupation n'est jamais évaluée
+            # sur un état intermédiaire (nouvelles dates avec les anciennes chambres)
+            cursor.execute("DELETE FROM ReservationChambre WHERE id_reservation = ?", (id_reservation,))
+            cursor.execute('''
+            UPDATE Reservation
+            SET date_debut = ?, date_fin = ?
+            WHERE id_reservation = ?
+            ''', (debut, fin, id_reservation))
+            cursor.executemany(
+                "INSERT INTO ReservationChambre (id_reservation, id_chambre) VALUES (?, ?)",
+                [(id_reservation, id_chambre) for id_chambre in chambres]
+            )
+    except sqlite3.IntegrityError as e:
+        if _est_conflit_occupation(e):
+            raise ChambreIndisponible("La chambre est déjà réservée sur cette période") from e
+        raise
+
+
+def ajouter_chambre(conn, id_reservation, id_chambre):
+    """Ajoute une chambre à une réservation existante, aux dates de la réservation"""
+    try:
+        with transaction(conn) as cursor:
+            cursor.execute("SELECT date_debut, date_fin FROM Reservation WHERE id_reservation = ?",
+                           (id_reservation,))
+            ligne = cursor.fetchone()
+            if ligne is None:
+                raise ReservationInvalide(f"La réservation {id_reservation} n'existe pas")
+            if chambres_occupees(cursor, [id_chambre], *ligne):
+                raise ChambreIndisponible(_message_occupees({id_chambre}))
+            cursor.execute(
+                "INSERT INTO ReservationChambre (id_reservation, id_chambre) VALUES (?, ?)",
+                (id_reservation, id_chambre)
+            )
+    except sqlite3.IntegrityError as e:
+        if _est_conflit_occupation(e):
+            raise ChambreIndisponible(_message_occupees({id_chambre})) from e
+        raise
+
+
+def retirer_chambre(conn, id_reservation, id_chambre):
+    """Retire une chambre d'une réservation (la dernière chambre ne peut pas être retirée)"""
+    with transaction(conn) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM ReservationChambre WHERE id_reservation = ?", (id_reservation,))
+        if cursor.fetchone()[0] <= 1:
+            raise ReservationInvalide("Impossible de retirer la dernière chambre : supprimez la réservation")
+        cursor.execute("DELETE FROM ReservationChambre WHERE id_reservation = ? AND id_chambre = ?",
+                       (id_reservation, id_chambre))
+
+
+def pointer_arrivee(conn, id_reservation, statut, aujourd_hui=None):
+    """Enregistre l'arrivée du client ou son absence (no-show) ; un nouveau pointage remplace le précédent"""
+    if statut not in STATUTS_ARRIVEE:
+        raise ReservationInvalide(f"Statut d'arrivée inconnu : {statut}")
+    with transaction(conn) as cursor:
+        cursor.execute("SELECT date_debut FROM Reservation WHERE id_reservation = ?", (id_reservation,))
+        ligne = cursor.fetchone()
+        if ligne is None:
+            raise ReservationInvalide(f"La réservation {id_reservation} n'existe pas")
+        if ligne[0] > format_date(aujourd_hui or date.today()):
+            raise ReservationInvalide("L'arrivée ne peut être pointée qu'à partir de la date d'arrivée")
+        cursor.execute('''
+        INSERT INTO Arrivee (id_reservation, statut) VALUES (?, ?)
+        ON CONFLICT (id_reservation) DO UPDATE
+        SET statut = excluded.statut, horodatage = excluded.horodatage
+        ''', (id_reservation, statut))
+
+
+def supprimer_reservation(conn, id_reservation):
+    """Supprime une réservation, ses liens chambre et son pointage d'arrivée"""
+    supprimer_reservations(conn, [id_reservation])
+
+
+def supprimer_reservations(conn, ids):
+    """Supprime un ensemble de réservations en une transaction ; retourne le nombre supprimé
+
+    Les liens chambre suivent par la clé étrangère (ON DELETE CASCADE). Le
+    pointage d'arrivée, sans clé étrangère pour survivre à l'archivage, est
+    supprimé explicitement.
+    """
+    ids = json.dumps(list(ids))
+    with transaction(conn) as cursor:
+        cursor.execute("DELETE FROM Arrivee WHERE id_reservation IN (SELECT value FROM json_each(?))", (ids,))
+        cursor.execute("DELETE FROM Reservation WHERE id_reservation IN (SELECT value FROM json_each(?))", (ids,))
+        return cursor.rowcount
+
+
+def supprimer_clients(conn, ids, cascade=False):
+    """Supprime un ensemble de clients en une transaction ; retourne (clients, réservations) supprimés
+
+    Sans cascade, la clé étrangère (ON DELETE RESTRICT) refuse toute la
+    suppression (IntegrityError) si l'un des clients a encore des réservations.
+    Avec cascade, leurs réservations (liens chambre et pointages compris) sont
+    supprimées d'abord.
+    """
+    ids = json.dumps(list(ids))
+    nb_reservations = 0
+    with transaction(conn) as cursor:
+        if cascade:
+            cursor.execute('''
+            DELETE FROM Arrivee WHERE id_reservation IN (
+                SELECT id_reservation FROM Reservation WHERE id_client IN (SELECT value FROM json_each(?))
+            )
+            ''', (ids,))
+            cursor.execute("DELETE FROM Reservation WHERE id_client IN (SELECT value FROM json_each(?))", (ids,))
+            nb_reservations = cursor.rowcount
+        cursor.execute("DELETE FROM Client WHERE id_client IN (SELECT value FROM json_each(?))", (ids,))
+        return cursor.rowcount, nb_reservations
@@ -0,0 +1,371 @@
+"""Import et export en masse des clients et des réservations (CSV, Parquet si pyarrow est installé)
+
+Usage :
+    python bulk.py import clients clients.csv
+    python bulk.py import reservations reservations.parquet --taille-lot 50000
+    python bulk.py export reservations export.csv
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from archive import chemin_archive, identifiants_archives
+from booking import ReservationInvalide, valider_periode
+from db import DB_PATH, configure_connection, transaction
+from migrations import migrer
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TAILLE_LOT = 20000
+
+COLONNES = {
+    'clients': ['id_client', 'nom', 'adresse', 'ville', 'code_postal', 'email', 'telephone'],
+    # Une ligne par chambre réservée ; les lignes d'une même réservation partagent ses dates et son client
+    'reservations': ['id_reservation', 'date_debut', 'date_fin', 'id_client', 'id_chambre'],
+}
+
+# Types Parquet déclarés : une colonne vide dans le premier lot exporté ne doit pas fixer le type du fichier
+TYPES_PARQUET = {
+    'clients': ['int64', 'string', 'string', 'string', 'int64', 'string', 'string'],
+    'reservations': ['int64', 'string', 'string', 'int64', 'int64'],
+}
+
+# Colonnes sans lesquelles un fichier est refusé ; les autres peuvent manquer (valeur vide)
+COLONNES_OBLIGATOIRES = {
+    'clients': ['nom'],
+    'reservations': ['id_reservation', 'date_debut', 'date_fin', 'id_chambre'],
+}
+
+REQUETES_EXPORT = {
+    'clients': '''
+    SELECT id_client, nom, adresse, ville, code_postal, email, telephone
+    FROM Client
+    ORDER BY id_client
+    ''',
+    'reservations': '''
+    SELECT R.id_reservation, R.date_debut, R.date_fin, R.id_client, RC.id_chambre
+    FROM Reservation R
+    LEFT JOIN ReservationChambre RC ON R.id_reservation = RC.id_reservation
+    ORDER BY R.id_reservation
+    ''',
+}
+
+
+class ErreurImport(Exception):
+    """Fichier d'import invalide"""
+
+
+def _format_fichier(chemin):
+    """Déduit le format ('csv' ou 'parquet') de l'extension du fichier"""
+    if chemin.lower().endswith('.parquet'):
+        if pyarrow is None:
+            raise ErreurImport("Le format Parquet nécessite pyarrow (pip install pyarrow)")
+        return 'parquet'
+    return 'csv'
+
+
+def lire_lignes(chemin, taille_lot=TAILLE_LOT):
+    """Itère sur les lignes d'un fichier sous forme de dictionnaires, sans le charger en mémoire"""
+    if _format_fichier(chemin) == 'parquet':
+        fichier = pyarrow.parquet.ParquetFile(chemin)
+        for lot in fichier.iter_batches(batch_size=taille_lot):
+            yield from lot.to_pylist()
+    else:
+        with open(chemin, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def _par_lots(lignes, taille_lot):
+    """Découpe un itérable en listes de taille_lot éléments"""
+    iterateur = iter(lignes)
+    while True:
+        lot = list(itertools.islice(iterateur, taille_lot))
+        if not lot:
+            return
+        yield lot
+
+
+def _vide(valeur):
+    """Normalise les champs vides des fichiers CSV en None"""
+    return None if valeur in ('', None) else valeur
+
+
+def _ids_existants(cursor, table, colonne, ids):
+    """Retourne l'ensemble des ids présents dans la table, en une seule requête pour tout le lot"""
+    cursor.execute(
+        f"SELECT {colonne} FROM {table} WHERE {colonne} IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(ids)),)
+    )
+    return {ligne[0] for ligne in cursor.fetchall()}
+
+
+@contextmanager
+def reglages_chargement(conn):
+    """Ajuste les PRAGMA pour un chargement massif, puis rétablit les réglages normaux"""
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    try:
+        yield conn
+    finally:
+        conn.execute("PRAGMA cache_size = -2000")
+        conn.execute("PRAGMA temp_store = DEFAULT")
+        configure_connection(conn)
+
+
+def _client(ligne):
+    """Convertit une ligne en tuple dans l'ordre de COLONNES['clients'] ; None si elle est invalide
+
+    Invalide : identifiant renseigné mais non entier, ou nom vide.
+    """
+    client = tuple(_vide(ligne.get(c)) for c in COLONNES['clients'])
+    try:
+        id_client = None if client[0] is None else int(client[0])
+    except (TypeError, ValueError):
+        return None
+    if client[1] is None:
+        return None
+    return (id_client,) + client[1:]
+
+
+def _importer_clients(cursor, lot):
+    """Insère un lot de clients ; retourne les lignes rejetées
+
+    Sont rejetées, avant toute insertion, les lignes invalides et celles dont
+    l'identifiant ou l'email est déjà pris, en base ou par une ligne
+    précédente du lot : une ligne fautive n'interrompt pas l'import.
+    """
+    lignes = [(ligne, _client(ligne)) for ligne in lot]
+    ids_pris = _ids_existants(cursor, 'Client', 'id_client',
+                              {c[0] for _, c in lignes if c is not None and c[0] is not None})
+    emails_pris = _ids_existants(cursor, 'Client', 'email',
+                                 {c[5] for _, c in lignes if c is not None and c[5] is not None})
+    valides, rejets = [], []
+    for ligne, client in lignes:
+        if client is None or client[0] in ids_pris or client[5] in emails_pris:
+            rejets.append(ligne)
+            continue
+        if client[0] is not None:
+            ids_pris.add(client[0])
+        if client[5] is not None:
+            emails_pris.add(client[5])
+        valides.append(client)
+
+    cursor.executemany('''
+    INSERT INTO Client (id_client, nom, adresse, ville, code_postal, email, telephone)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', valides)
+    return rejets
+
+
+def _reservation(ligne):
+    """Convertit une ligne en (id_reservation, date_debut, date_fin, id_client, id_chambre) ; None si elle est invalide
+
+    Invalide : identifiant non entier, chambre absente, ou période vide,
+    inversée ou hors du calendrier (elle échapperait au contrôle des doubles
+    réservations).
+    """
+    try:
+        debut, fin = valider_periode(ligne.get('date_debut'), ligne.get('date_fin'))
+        id_client = _vide(ligne.get('id_client'))
+        return (int(ligne.get('id_reservation')), debut, fin,
+                None if id_client is None else int(id_client), int(ligne.get('id_chambre')))
+    except (TypeError, ValueError, ReservationInvalide):
+        return None
+
+
+def _chevauchements(cursor, sejours):
+    """Indices des séjours (id_chambre, date_debut, date_fin) qui occuperaient une nuit déjà prise
+
+    Nuit déjà prise en base (OccupationNuit) ou par un séjour précédent de la
+    liste dans la même chambre, à partir duquel le séjour est comparé par date
+    d'arrivée : le premier arrivé est gardé.
+    """
+    cursor.execute('''
+    SELECT S.key FROM json_each(?) S
+    WHERE EXISTS (
+        SELECT 1 FROM OccupationNuit O
+        WHERE O.id_chambre = json_extract(S.value, '$[0]')
+          AND O.nuit >= json_extract(S.value, '$[1]') AND O.nuit < json_extract(S.value, '$[2]')
+    )
+    ''', (json.dumps(sejours),))
+    refuses = {ligne[0] for ligne in cursor.fetchall()}
+    fin_occupee = {}
+    for i in sorted(range(len(sejours)), key=lambda i: (sejours[i][0], sejours[i][1])):
+        if i in refuses:
+            continue
+        id_chambre, debut, fin = sejours[i]
+        if debut < fin_occupee.get(id_chambre, debut):
+            refuses.add(i)
+        else:
+            fin_occupee[id_chambre] = fin
+    return refuses
+
+
+def _importer_reservations(cursor, lot, vues, archive):
+    """Insère un lot de réservations ; retourne les lignes rejetées
+
+    Chaque ligne est validée, puis les clés étrangères, les identifiants et
+    les nuits occupées le sont pour tout le lot avant la moindre insertion :
+    une ligne fautive est rejetée sans interrompre l'import. `vues` associe
+    aux réservations déjà rencontrées dans le fichier (lots précédents
+    compris) leurs dates et leur client : une ligne ne complète une
+    réservation que si elle vient du même fichier avec les mêmes valeurs ;
+    un identifiant déjà présent en base ou dans l'archive `archive` est
+    rejeté, la réservation existante n'est pas modifiée.
+    """
+    lignes = [(ligne, _reservation(ligne)) for ligne in lot]
+    lues = [r for _, r in lignes if r is not None]
+    clients = _ids_existants(cursor, 'Client', 'id_client', {r[3] for r in lues if r[3] is not None})
+    chambres = _ids_existants(cursor, 'Chambre', 'id_chambre', {r[4] for r in lues})
+    ids = {r[0] for r in lues}
+    existantes = _ids_existants(cursor, 'Reservation', 'id_reservation', ids)
+    archivees = identifiants_archives(archive, ids) if archive else set()
+    acceptees = []
+    for i, (ligne, reservation) in enumerate(lignes):
+        if reservation is None or (reservation[3] is not None and reservation[3] not in clients) or \
+                reservation[4] not in chambres or reservation[0] in archivees:
+            continue
+        id_reservation, valeurs = reservation[0], reservation[1:4]
+        if id_reservation in vues:
+            if vues[id_reservation] != valeurs:
+                continue
+        elif id_reservation in existantes:
+            continue
+        else:
+            vues[id_reservation] = valeurs
+        acceptees.append(i)
+    refusees = _chevauchements(cursor, [(lignes[i][1][4], lignes[i][1][1], lignes[i][1][2]) for i in acceptees])
+    acceptees = {i for n, i in enumerate(acceptees) if n not in refusees}
+    valides = [lignes[i][1] for i in sorted(acceptees)]
+    rejets = [ligne for i, (ligne, _) in enumerate(lignes) if i not in acceptees]
+
+    # Les lignes d'une réservation sur plusieurs chambres du même fichier ne la créent qu'une fois
+    cursor.executemany('''
+    INSERT INTO Reservation (id_reservation, date_debut, date_fin, id_client)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (id_reservation) DO NOTHING
+    ''', [r[:4] for r in valides])
+    cursor.executemany(
+        "INSERT INTO ReservationChambre (id_reservation, id_chambre) VALUES (?, ?)",
+        [(r[0], r[4]) for r in valides]
+    )
+    return rejets
+
+
+def importer(conn, entite, chemin, taille_lot=TAILLE_LOT, rejets=None, progression=None):
+    """Importe un fichier par lots, chaque lot dans sa propre transaction
+
+    Retourne (lignes importées, lignes rejetées, durée en secondes). Les lignes
+    invalides (identifiant non entier, période invalide), en conflit avec la
+    base ou une ligne précédente (identifiant ou email déjà pris, nuit déjà
+    occupée) ou dont le client ou la chambre n'existe pas sont rejetées et, si
+    `rejets` est un chemin, écrites dans ce fichier CSV. Un fichier sans l'une
+    des colonnes obligatoires est refusé (ErreurImport).
+    """
+    if entite == 'reservations':
+        fichier = next(f for _, nom, f in conn.execute("PRAGMA database_list") if nom == 'main')
+        inserer = functools.partial(_importer_reservations, vues={},
+                                    archive=chemin_archive(fichier) if fichier else None)
+    else:
+        inserer = _importer_clients
+    importees = rejetees = 0
+    t0 = time.perf_counter()
+    fichier_rejets = ecrivain_rejets = None
+    if rejets:
+        fichier_rejets = open(rejets, 'w', newline='', encoding='utf-8')
+        ecrivain_rejets = csv.DictWriter(fichier_rejets, COLONNES[entite], extrasaction='ignore')
+        ecrivain_rejets.writeheader()
+    try:
+        with reglages_chargement(conn):
+            for numero, lot in enumerate(_par_lots(lire_lignes(chemin, taille_lot), taille_lot), start=1):
+                manquantes = [c for c in COLONNES_OBLIGATOIRES[entite] if c not in lot[0]]
+                if manquantes:
+                    raise ErreurImport(f"Colonne(s) manquante(s) : {', '.join(manquantes)}")
+                try:
+                    with transaction(conn) as cursor:
+                        lignes_rejetees = inserer(cursor, lot)
+                except sqlite3.IntegrityError as e:
+                    raise ErreurImport(f"Lot {numero} (lignes {importees + rejetees + 1} et suivantes) : {e}") from e
+                importees += len(lot) - len(lignes_rejetees)
+                rejetees += len(lignes_rejetees)
+                if ecrivain_rejets:
+                    ecrivain_rejets.writerows(lignes_rejetees)
+                if progression:
+                    progression(importees, rejetees, time.perf_counter() - t0)
+    finally:
+        if fichier_rejets:
+            fichier_rejets.close()
+    return importees, rejetees, time.perf_counter() - t0
+
+
+def exporter(conn, entite, chemin, taille_lot=TAILLE_LOT):
+    """Exporte une table lot par lot (mémoire constante quelle que soit sa taille)
+
+    Retourne (lignes exportées, durée en secondes).
+    """
+    colonnes = COLONNES[entite]
+    cursor = conn.cursor()
+    cursor.execute(REQUETES_EXPORT[entite])
+    total = 0
+    t0 = time.perf_counter()
+    if _format_fichier(chemin) == 'parquet':
+        schema = pyarrow.schema(list(zip(colonnes, TYPES_PARQUET[entite])))
+        with pyarrow.parquet.ParquetWriter(chemin, schema) as ecrivain:
+            while lot := cursor.fetchmany(taille_lot):
+                ecrivain.write_table(pyarrow.Table.from_pylist([dict(zip(colonnes, ligne)) for ligne in lot], schema))
+                total += len(lot)
+    else:
+        with open(chemin, 'w', newline='', encoding='utf-8') as f:
+            ecrivain = csv.writer(f)
+            ecrivain.writerow(colonnes)
+            while lot := cursor.fetchmany(taille_lot):
+                ecrivain.writerows(lot)
+                total += len(lot)
+    return total, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("entite", choices=sorted(COLONNES))
+    parser.add_argument("fichier")
+    parser.add_argument("--db", default=DB_PATH, help="base SQLite (défaut : %(default)s)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+    parser.add_argument("--rejets", help="fichier CSV où écrire les lignes rejetées à l'import")
+    args = parser.parse_args(argv)
+
+    conn = configure_connection(sqlite3.connect(args.db))
+    try:
+        migrer(conn)
+        if args.action == "import":
+            def afficher(importees, rejetees, duree):
+                print(f"\r{importees} lignes importées, {rejetees} rejetées "
+                      f"({importees / duree:.0f} lignes/s)", end="", flush=True)
+            importees, rejetees, duree = importer(conn, args.entite, args.fichier, args.taille_lot,
+                                                  args.rejets, afficher)
+            print(f"\nImport terminé : {importees} lignes en {duree:.1f}s "
+                  f"({importees / duree if duree else 0:.0f} lignes/s), {rejetees} rejetées")
+        else:
+            total, duree = exporter(conn, args.entite, args.fichier, args.taille_lot)
+            print(f"Export terminé : {total} lignes en {duree:.1f}s ({total / duree if duree else 0:.0f} lignes/s)")
+    except ErreurImport as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
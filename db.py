@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Chemin de la base (surchargeable pour les tests de charge et benchmarks)
+DB_PATH = os.environ.get('HOTEL_DB', 'hotel.db')
+
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connexion SQLite qui retourne dans son pool lors de close()"""
+
+    pool = None
+
+    def close(self):
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+
+def configure_connection(conn):
+    """Applique les PRAGMA communs à toutes les connexions"""
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """Exécute un bloc dans une transaction BEGIN IMMEDIATE (verrou d'écriture pris dès le début)
+
+    Les lectures faites dans le bloc voient donc un état qu'aucune autre
+    session ne peut modifier avant le COMMIT.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+class ConnectionPool:
+    """Pool de connexions SQLite partagé entre les sessions d'un même processus
+
+    Les connexions sont ouvertes à la demande et conservées (jusqu'à max_idle)
+    pour être réutilisées : plus de coût d'ouverture ni de PRAGMA à chaque
+    rerun, et le cache de requêtes préparées de chaque connexion reste chaud.
+    """
+
+    def __init__(self, path=DB_PATH, max_idle=16, factory=PooledConnection):
+        self.path = path
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+            factory=self.factory,
+        )
+        configure_connection(conn)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """Retourne une connexion libre (ou en ouvre une nouvelle)"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn):
+        """Remet une connexion dans le pool ; retourne False si elle doit être fermée"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._closed or len(self._idle) >= self.max_idle:
+                conn.pool = None
+                return False
+            self._idle.append(conn)
+            return True
+
+    @contextmanager
+    def connection(self):
+        """Prête une connexion le temps d'un bloc with"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Ferme toutes les connexions inactives et désactive le pool"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.pool = None
+            conn.close()
@@ -0,0 +1,157 @@
+"""Maintenance de la base : lignes orphelines, purge du journal, statistiques de l'optimiseur et VACUUM
+
+Les orphelins sont supprimés règle par règle, chacune en une seule requête
+ensembliste (pas un aller-retour par ligne), le tout dans une transaction :
+liens chambre d'une réservation ou d'une chambre inexistante, réservations
+d'un client disparu, et, quand la base d'archive est attachée, pointages
+d'arrivée d'une réservation qui n'existe plus nulle part. Seules les
+références à une ligne absente sont des orphelins : une réservation sans
+chambre, qu'aucune clé étrangère n'interdit, est signalée mais conservée.
+Les triggers tiennent à jour occupation, statistiques et journal comme pour
+toute suppression. Depuis la migration 9, les clés étrangères empêchent d'en
+créer ; le nettoyage reste utile après un import fait sans elles.
+
+Le journal des modifications est purgé des modifications de plus de
+--retention-journal jours déjà appliquées par les répliques passées en
+--replique (replication.limite_purge).
+
+ANALYZE met à jour les statistiques de l'optimiseur de toutes les bases
+attachées (archive comprise) et PRAGMA optimize les complète. VACUUM
+(--vacuum) réécrit les fichiers pour rendre la place libérée par l'archivage
+et les suppressions : il bloque les écritures pendant toute sa durée.
+
+Usage : python maintenance.py --replique hotel_replica.db --vacuum
+"""
+import argparse
+import sqlite3
+import time
+
+from db import DB_PATH, configure_connection, transaction
+from replication import RETENTION_JOURS, limite_purge, purger_journal
+
+# Réservations dont le client n'existe plus
+_RESERVATIONS_SANS_CLIENT = '''
+SELECT R.id_reservation FROM Reservation R
+WHERE R.id_client IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM Client C WHERE C.id_client = R.id_client)
+'''
+
+# (table, requête) dans l'ordre d'application : les liens avant les réservations dont ils dépendent
+ORPHELINS = [
+    ('ReservationChambre', f'''
+    DELETE FROM ReservationChambre
+    WHERE id_reservation IN ({_RESERVATIONS_SANS_CLIENT})
+       OR NOT EXISTS (SELECT 1 FROM Reservation R WHERE R.id_reservation = ReservationChambre.id_reservation)
+       OR NOT EXISTS (SELECT 1 FROM Chambre CH WHERE CH.id_chambre = ReservationChambre.id_chambre)
+    '''),
+    ('Reservation', f'''
+    DELETE FROM Reservation
+    WHERE id_reservation IN ({_RESERVATIONS_SANS_CLIENT})
+    '''),
+]
+# Un pointage survit à l'archivage de sa réservation : il n'est orphelin que si elle manque aussi dans l'archive
+ORPHELINS_ARCHIVE = [
+    ('Arrivee', '''
+    DELETE FROM main.Arrivee
+    WHERE NOT EXISTS (SELECT 1 FROM main.Reservation R WHERE R.id_reservation = Arrivee.id_reservation)
+      AND NOT EXISTS (SELECT 1 FROM archive.Reservation A WHERE A.id_reservation = Arrivee.id_reservation)
+    '''),
+]
+
+
+def _schemas(conn):
+    """Bases attachées à la connexion (main, archive...), sans la base temporaire"""
+    return [nom for _, nom, _ in conn.execute("PRAGMA database_list") if nom != 'temp']
+
+
+def supprimer_orphelins(cursor):
+    """Supprime les lignes orphelines ; retourne {table: nombre de lignes supprimées}
+
+    Le curseur doit être dans une transaction. Les pointages d'arrivée ne sont
+    vérifiés que si la base d'archive est attachée.
+    """
+    regles = ORPHELINS + (ORPHELINS_ARCHIVE if 'archive' in _schemas(cursor.connection) else [])
+    supprimees = {}
+    for table, requete in regles:
+        cursor.execute(requete)
+        supprimees[table] = supprimees.get(table, 0) + cursor.rowcount
+    return supprimees
+
+
+def reservations_sans_chambre(cursor):
+    """Identifiants des réservations sans aucune chambre (à corriger à la main, jamais supprimées ici)"""
+    cursor.execute('''
+    SELECT R.id_reservation FROM Reservation R
+    WHERE NOT EXISTS (SELECT 1 FROM ReservationChambre RC WHERE RC.id_reservation = R.id_reservation)
+    ORDER BY R.id_reservation
+    ''')
+    return [ligne[0] for ligne in cursor.fetchall()]
+
+
+def _taille(conn, schema):
+    """Taille d'une base en octets (pages libres comprises)"""
+    pages, = conn.execute(f"PRAGMA {schema}.page_count").fetchone()
+    taille_page, = conn.execute(f"PRAGMA {schema}.page_size").fetchone()
+    return pages * taille_page
+
+
+def optimiser(conn, vacuum=False):
+    """ANALYZE et PRAGMA optimize sur toutes les bases attachées, puis VACUUM sur demande
+
+    Hors transaction. Retourne {schéma: taille du fichier (octets) avant et après}.
+    """
+    avant = {schema: _taille(conn, schema) for schema in _schemas(conn)}
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    if vacuum:
+        for schema in avant:
+            conn.execute(f"VACUUM {schema}")
+        # En WAL, le fichier ne rétrécit qu'au checkpoint
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {schema: (taille, _taille(conn, schema)) for schema, taille in avant.items()}
+
+
+def main():
+    # Importés ici : migrations importe ce module
+    from archive import attacher_archive
+    from migrations import migrer
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", default=None, help="base d'archive (par défaut <base>_archive.db)")
+    parser.add_argument("--retention-journal", type=float, default=RETENTION_JOURS,
+                        help="âge minimal en jours des modifications purgées du journal (défaut : %(default)s)")
+    parser.add_argument("--replique", action="append", default=[],
+                        help="réplique dont les modifications non appliquées sont gardées (répétable)")
+    parser.add_argument("--vacuum", action="store_true", help="réécrire les fichiers (bloque les écritures)")
+    args = parser.parse_args()
+
+    conn = configure_connection(sqlite3.connect(args.db))
+    migrer(conn)
+    attacher_archive(conn, args.archive)
+
+    t0 = time.perf_counter()
+    with transaction(conn) as cursor:
+        supprimees = supprimer_orphelins(cursor)
+    print(f"Orphelins supprimés en {time.perf_counter() - t0:.1f}s : "
+          + ", ".join(f"{table} {nombre}" for table, nombre in supprimees.items()))
+    sans_chambre = reservations_sans_chambre(conn.cursor())
+    if sans_chambre:
+        print(f"{len(sans_chambre)} réservation(s) sans chambre conservée(s) : "
+              + ", ".join(map(str, sans_chambre[:20])) + (" ..." if len(sans_chambre) > 20 else ""))
+
+    t0 = time.perf_counter()
+    limite = limite_purge(conn.cursor(), args.retention_journal, args.replique)
+    purgees = purger_journal(conn, limite)
+    print(f"Journal purgé jusqu'à la séquence {limite} en {time.perf_counter() - t0:.1f}s : {purgees} modification(s)")
+
+    t0 = time.perf_counter()
+    tailles = optimiser(conn, args.vacuum)
+    print(f"{'ANALYZE, optimize et VACUUM' if args.vacuum else 'ANALYZE et optimize'} en {time.perf_counter() - t0:.1f}s : "
+          + ", ".join(f"{schema} {avant / 1e6:.1f} Mo → {apres / 1e6:.1f} Mo"
+                      for schema, (avant, apres) in tailles.items()))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import threading
+import time
+
+from availability import format_date
+
+# Durée de vie des agrégats en cache (secondes) ; les écritures les invalident plus tôt
+TTL_SECONDES = 300
+
+_cache = {}
+_generations = {}
+_cache_lock = threading.Lock()
+
+
+def _memoiser(section, cle, calcul):
+    """Retourne la valeur en cache pour (section, cle) ou la calcule"""
+    maintenant = time.monotonic()
+    with _cache_lock:
+        entree = _cache.get((section, cle))
+        if entree is not None and entree[0] > maintenant:
+            return entree[1]
+        generation = _generations.get(section, 0)
+    valeur = calcul()
+    with _cache_lock:
+        # Une écriture survenue pendant le calcul rend la valeur obsolète : on ne la garde pas
+        if _generations.get(section, 0) == generation:
+            _cache[(section, cle)] = (maintenant + TTL_SECONDES, valeur)
+    return valeur
+
+
+# Sections dont les agrégats dépendent aussi d'une autre : les taux d'occupation ('reservations')
+# se rapportent au nombre de chambres de chaque hôtel
+DEPENDANCES = {'chambres': ('reservations',)}
+
+
+def invalider(*sections):
+    """Supprime du cache les agrégats des sections modifiées ('reservations', 'clients', 'chambres')"""
+    sections = set(sections).union(*(DEPENDANCES.get(section, ()) for section in sections))
+    with _cache_lock:
+        for section in sections:
+            _generations[section] = _generations.get(section, 0) + 1
+        for cle in [cle for cle in _cache if cle[0] in sections]:
+            del _cache[cle]
+
+
+def init_metrics(cursor):
+    """Crée la table StatNuit (occupation et revenu par hôtel et par nuit) et ses triggers
+
+    StatNuit est matérialisée de manière incrémentale à partir de OccupationNuit :
+    chaque nuit réservée ou libérée ajuste d'une unité le compteur de son hôtel,
+    sans jamais recalculer l'historique.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='StatNuit'")
+    stat_existante = cursor.fetchone() is not None
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS StatNuit (
+        id_hotel INTEGER NOT NULL,
+        nuit TEXT NOT NULL,
+        chambres_occupees INTEGER NOT NULL DEFAULT 0,
+        revenu REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (id_hotel, nuit)
+    ) WITHOUT ROWID
+    ''')
+    # Les arrivées et départs à venir sont cherchés par date
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservation_fin ON Reservation(date_fin)")
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stat_occupation_insert
+    AFTER INSERT ON OccupationNuit
+    BEGIN
+        INSERT INTO StatNuit (id_hotel, nuit, chambres_occupees, revenu)
+        SELECT CH.id_hotel, NEW.nuit, 1, COALESCE(TC.prix_base, 0)
+        FROM Chambre CH
+        LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+        WHERE CH.id_chambre = NEW.id_chambre
+        ON CONFLICT (id_hotel, nuit) DO UPDATE
+        SET chambres_occupees = chambres_occupees + 1,
+            revenu = revenu + excluded.revenu;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stat_occupation_delete
+    AFTER DELETE ON OccupationNuit
+    BEGIN
+        UPDATE StatNuit
+        SET chambres_occupees = chambres_occupees - 1,
+            revenu = revenu - COALESCE((
+                SELECT TC.prix_base
+                FROM Chambre CH
+                JOIN TypeChambre TC ON CH.id_type = TC.id_type
+                WHERE CH.id_chambre = OLD.id_chambre
+            ), 0)
+        WHERE nuit = OLD.nuit
+          AND id_hotel = (SELECT id_hotel FROM Chambre WHERE id_chambre = OLD.id_chambre);
+    END
+    ''')
+
+    # Remplissage initial à partir de l'occupation existante
+    if not stat_existante:
+        cursor.execute('''
+        INSERT INTO StatNuit (id_hotel, nuit, chambres_occupees, revenu)
+        SELECT CH.id_hotel, O.nuit, COUNT(*), COALESCE(SUM(TC.prix_base), 0)
+        FROM OccupationNuit O
+        JOIN Chambre CH ON O.id_chambre = CH.id_chambre
+        LEFT JOIN TypeChambre TC ON CH.id_type = TC.id_type
+        GROUP BY CH.id_hotel, O.nuit
+        ''')
+
+
+def init_montants_stat(cursor):
+    """Triggers de StatNuit fondés sur l'hôtel et le tarif enregistrés avec chaque nuit occupée
+
+    La suppression d'une nuit retire exactement ce que son insertion a ajouté
+    (availability.init_montants), quel que soit le tarif ou l'hôtel actuel de
+    la chambre : StatNuit ne dérive plus après un changement de tarif.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS trg_stat_occupation_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_stat_occupation_delete")
+    cursor.execute('''
+    CREATE TRIGGER trg_stat_occupation_insert
+    AFTER INSERT ON OccupationNuit
+    WHEN NEW.id_hotel IS NOT NULL
+    BEGIN
+        INSERT INTO StatNuit (id_hotel, nuit, chambres_occupees, revenu)
+        VALUES (NEW.id_hotel, NEW.nuit, 1, NEW.revenu)
+        ON CONFLICT (id_hotel, nuit) DO UPDATE
+        SET chambres_occupees = chambres_occupees + 1,
+            revenu = revenu + excluded.revenu;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_stat_occupation_delete
+    AFTER DELETE ON OccupationNuit
+    WHEN OLD.id_hotel IS NOT NULL
+    BEGIN
+        UPDATE StatNuit
+        SET chambres_occupees = chambres_occupees - 1,
+            revenu = revenu - OLD.revenu
+        WHERE id_hotel = OLD.id_hotel AND nuit = OLD.nuit;
+    END
+    ''')
+
+
+def totaux(cursor):
+    """Retourne le nombre total de réservations, de clients et de chambres"""
+    def compter(table):
+        return lambda: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return (
+        _memoiser('reservations', 'total', compter('Reservation')),
+        _memoiser('clients', 'total', compter('Client')),
+        _memoiser('chambres', 'total', compter('Chambre')),
+    )
+
+
+def occupation_par_hotel(cursor, date_debut, date_fin):
+    """Taux d'occupation et revenu de chaque hôtel sur les nuits de [date_debut, date_fin)
+
+    Chaque ligne contient (id_hotel, ville, nb_chambres, nuits_occupees, taux, revenu).
+    """
+    debut, fin = format_date(date_debut), format_date(date_fin)
+
+    def calcul():
+        cursor.execute('''
+        SELECT H.id_hotel, H.ville,
+               (SELECT COUNT(*) FROM Chambre CH WHERE CH.id_hotel = H.id_hotel),
+               COALESCE(S.occupees, 0), COALESCE(S.revenu, 0),
+               julianday(?) - julianday(?)
+        FROM Hotel H
+        LEFT JOIN (
+            SELECT id_hotel, SUM(chambres_occupees) AS occupees, SUM(revenu) AS revenu
+            FROM StatNuit
+            WHERE nuit >= ? AND nuit < ?
+            GROUP BY id_hotel
+        ) S ON S.id_hotel = H.id_hotel
+        ORDER BY H.ville
+        ''', (fin, debut, debut, fin))
+        lignes = []
+        for id_hotel, ville, nb_chambres, occupees, revenu, nb_nuits in cursor.fetchall():
+            capacite = nb_chambres * nb_nuits
+            taux = occupees / capacite if capacite else 0.0
+            lignes.append((id_hotel, ville, nb_chambres, occupees, taux, revenu))
+        return lignes
+
+    return _memoiser('reservations', ('occupation', debut, fin), calcul)
+
+
+def occupation_par_nuit(cursor, date_debut, date_fin):
+    """Taux d'occupation par nuit et par hôtel : {ville: {nuit: taux}}"""
+    debut, fin = format_date(date_debut), format_date(date_fin)
+
+    def calcul():
+        cursor.execute('''
+        SELECT H.ville, S.nuit, S.chambres_occupees * 1.0 / (
+            SELECT COUNT(*) FROM Chambre CH WHERE CH.id_hotel = H.id_hotel
+        )
+        FROM StatNuit S
+        JOIN Hotel H ON S.id_hotel = H.id_hotel
+        WHERE S.nuit >= ? AND S.nuit < ?
+        ORDER BY S.nuit
+        ''', (debut, fin))
+        series = {}
+        for ville, nuit, taux in cursor.fetchall():
+            series.setdefault(ville, {})[nuit] = taux
+        return series
+
+    return _memoiser('reservations', ('par_nuit', debut, fin), calcul)
+
+
+def duree_moyenne_sejour(cursor, date_debut, date_fin):
+    """Durée moyenne (en nuits) des séjours dont l'arrivée tombe dans [date_debut, date_fin)"""
+    debut, fin = format_date(date_debut), format_date(date_fin)
+
+    def calcul():
+        cursor.execute('''
+        SELECT AVG(julianday(date_fin) - julianday(date_debut))
+        FROM Reservation
+        WHERE date_debut >= ? AND date_debut < ?
+        ''', (debut, fin))
+        return cursor.fetchone()[0] or 0.0
+
+    return _memoiser('reservations', ('duree', debut, fin), calcul)
+
+
+def mouvements(cursor, jour_debut, jour_fin, limite=20):
+    """Arrivées et départs prévus entre jour_debut (inclus) et jour_fin (exclu)
+
+    Retourne deux listes de (id_reservation, date, nom du client).
+    """
+    debut, fin = format_date(jour_debut), format_date(jour_fin)
+
+    def calcul():
+        resultat = []
+        for colonne in ("date_debut", "date_fin"):
+            cursor.execute(f'''
+            SELECT R.id_reservation, R.{colonne}, C.nom
+            FROM Reservation R
+            JOIN Client C ON R.id_client = C.id_client
+            WHERE R.{colonne} >= ? AND R.{colonne} < ?
+            ORDER BY R.{colonne}, R.id_reservation
+            LIMIT ?
+            ''', (debut, fin, limite))
+            resultat.append(cursor.fetchall())
+        return tuple(resultat)
+
+    return _memoiser('reservations', ('mouvements', debut, fin, limite), calcul)
@@ -0,0 +1,328 @@
+"""Migrations versionnées du schéma (numéro de version stocké dans PRAGMA user_version)
+
+Chaque migration est une fonction qui reçoit un curseur ; elles sont appliquées
+dans l'ordre, dans une seule transaction, depuis la version de la base jusqu'à
+VERSION_SCHEMA. Toutes sont idempotentes (IF NOT EXISTS, vérifications
+préalables) pour pouvoir s'appliquer aussi bien à une base vide qu'à une base
+créée avant l'existence des migrations. Toute évolution du schéma, y compris
+la définition d'un trigger, s'ajoute en fin de liste sous un nouveau numéro.
+"""
+import metrics
+import replication
+from availability import CALENDRIER_DEBUT, CALENDRIER_FIN, init_availability, init_montants
+from db import transaction
+from maintenance import supprimer_orphelins
+from reports import init_rapports, init_versions_mois
+from search import init_recherche
+
+
+class ErreurMigration(Exception):
+    """Migration impossible sans intervention sur les données"""
+
+
+def creer_tables(cursor):
+    """Crée les tables du schéma hôtelier"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Hotel (
+        id_hotel INTEGER PRIMARY KEY,
+        ville TEXT NOT NULL,
+        pays TEXT NOT NULL,
+        code_postal INTEGER
+    )
+    ''')
+    # Les bases créées avec l'ancienne définition ont une colonne « R » à la place de « pays »
+    cursor.execute("SELECT name FROM pragma_table_info('Hotel')")
+    colonnes = {ligne[0] for ligne in cursor.fetchall()}
+    if 'R' in colonnes and 'pays' not in colonnes:
+        cursor.execute("ALTER TABLE Hotel RENAME COLUMN R TO pays")
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Client (
+        id_client INTEGER PRIMARY KEY,
+        nom TEXT NOT NULL,
+        adresse TEXT,
+        ville TEXT,
+        code_postal INTEGER,
+        email TEXT,
+        telephone TEXT
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS TypeChambre (
+        id_type INTEGER PRIMARY KEY,
+        libelle TEXT NOT NULL,
+        prix_base REAL
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Chambre (
+        id_chambre INTEGER PRIMARY KEY,
+        numero INTEGER,
+        etage INTEGER,
+        vue_mer INTEGER DEFAULT 0,
+        id_hotel INTEGER,
+        id_type INTEGER,
+        FOREIGN KEY (id_hotel) REFERENCES Hotel(id_hotel),
+        FOREIGN KEY (id_type) REFERENCES TypeChambre(id_type)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Reservation (
+        id_reservation INTEGER PRIMARY KEY,
+        date_debut TEXT NOT NULL,
+        date_fin TEXT NOT NULL,
+        id_client INTEGER,
+        FOREIGN KEY (id_client) REFERENCES Client(id_client)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ReservationChambre (
+        id_reservation INTEGER,
+        id_chambre INTEGER,
+        PRIMARY KEY (id_reservation, id_chambre),
+        FOREIGN KEY (id_reservation) REFERENCES Reservation(id_reservation),
+        FOREIGN KEY (id_chambre) REFERENCES Chambre(id_chambre)
+    )
+    ''')
+
+
+def creer_index(cursor):
+    """Index des requêtes fréquentes (recherche par dates, par client, par chambre, par hôtel, par nom)"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservation_dates ON Reservation(date_debut, date_fin)")
+    # Pagination par clé (date_debut, id_reservation) de la liste des réservations
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservation_debut ON Reservation(date_debut)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservation_client ON Reservation(id_client)")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reservationchambre_chambre
+    ON ReservationChambre(id_chambre, id_reservation)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chambre_hotel ON Chambre(id_hotel)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_client_nom ON Client(nom)")
+
+    # Unicité de l'email : les doublons existants doivent être corrigés avant de migrer
+    cursor.execute("UPDATE Client SET email = NULL WHERE trim(email) = ''")
+    cursor.execute('''
+    SELECT email, COUNT(*) FROM Client
+    WHERE email IS NOT NULL
+    GROUP BY email HAVING COUNT(*) > 1
+    LIMIT 10
+    ''')
+    doublons = cursor.fetchall()
+    if doublons:
+        raise ErreurMigration("Emails présents sur plusieurs clients : "
+                              + ", ".join(f"{email} ({nombre})" for email, nombre in doublons))
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_client_email ON Client(email)")
+
+
+def creer_arrivees(cursor):
+    """Table des arrivées : pour chaque réservation pointée par la réception, client arrivé ou no-show"""
+    # Sans clé étrangère : l'archivage déplace les réservations mais garde leur pointage pour les rapports
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Arrivee (
+        id_reservation INTEGER PRIMARY KEY,
+        statut TEXT NOT NULL CHECK (statut IN ('arrive', 'no_show')),
+        horodatage TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+    )
+    ''')
+    replication.init_journal(cursor)
+
+
+# Période d'une réservation : dates AAAA-MM-JJ, départ après l'arrivée, nuits couvertes par le calendrier
+# (hors calendrier, les triggers n'inscriraient aucune nuit dans OccupationNuit)
+CONDITION_PERIODE = (
+    "date(date_debut) = date_debut AND date(date_fin) = date_fin AND date_debut < date_fin"
+    f" AND date_debut >= '{CALENDRIER_DEBUT}' AND date_fin <= '{CALENDRIER_FIN}'"
+)
+
+# Définition courante des tables de réservation ({nom} : nom de la table, {reservation} : table référencée).
+# SQLite ne modifie ni la clé primaire, ni les clés étrangères, ni les contraintes d'une table existante :
+# une migration qui les change reconstruit les deux tables par _reconstruire_reservations.
+TABLE_RESERVATION = '''
+CREATE TABLE {nom} (
+    id_reservation INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_debut TEXT NOT NULL,
+    date_fin TEXT NOT NULL,
+    id_client INTEGER,
+    FOREIGN KEY (id_client) REFERENCES Client(id_client) ON DELETE RESTRICT,
+    CHECK (''' + CONDITION_PERIODE + ''')
+)
+'''
+TABLE_RESERVATION_CHAMBRE = '''
+CREATE TABLE {nom} (
+    id_reservation INTEGER,
+    id_chambre INTEGER,
+    PRIMARY KEY (id_reservation, id_chambre),
+    FOREIGN KEY (id_reservation) REFERENCES {reservation}(id_reservation) ON DELETE CASCADE,
+    FOREIGN KEY (id_chambre) REFERENCES Chambre(id_chambre) ON DELETE RESTRICT
+)
+'''
+
+
+def _definition_table(cursor, table):
+    """Instruction CREATE TABLE enregistrée pour une table"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone()[0]
+
+
+def _reconstruire_reservations(cursor):
+    """Recopie Reservation et ReservationChambre sous leur définition courante
+
+    Les index et triggers des deux tables sont recréés à l'identique. Les
+    identifiants sont conservés : la séquence AUTOINCREMENT repart du plus
+    grand d'entre eux. Les réservations qui violeraient la contrainte de
+    période doivent être corrigées avant de migrer.
+    """
+    cursor.execute(f'''
+    SELECT id_reservation, date_debut, date_fin FROM Reservation
+    WHERE NOT ({CONDITION_PERIODE})
+    LIMIT 10
+    ''')
+    invalides = cursor.fetchall()
+    if invalides:
+        raise ErreurMigration("Réservations aux dates invalides : "
+                              + ", ".join(f"{id_reservation} ({debut} - {fin})"
+                                          for id_reservation, debut, fin in invalides))
+
+    cursor.execute('''
+    SELECT sql FROM sqlite_master
+    WHERE tbl_name IN ('Reservation', 'ReservationChambre') AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''')
+    definitions = [sql for sql, in cursor.fetchall()]
+
+    cursor.execute(TABLE_RESERVATION.format(nom='Reservation_nouvelle'))
+    cursor.execute('''
+    INSERT INTO Reservation_nouvelle (id_reservation, date_debut, date_fin, id_client)
+    SELECT id_reservation, date_debut, date_fin, id_client FROM Reservation
+    ''')
+    # Les liens référencent la nouvelle table (renommée ensuite avec ses références) :
+    # supprimer l'ancienne ne déclenche aucune cascade sur eux
+    cursor.execute(TABLE_RESERVATION_CHAMBRE.format(nom='ReservationChambre_nouvelle',
+                                                    reservation='Reservation_nouvelle'))
+    cursor.execute('''
+    INSERT INTO ReservationChambre_nouvelle (id_reservation, id_chambre)
+    SELECT id_reservation, id_chambre FROM ReservationChambre
+    ''')
+
+    # DROP TABLE ne déclenche pas les triggers : occupation, statistiques et journal restent tels quels
+    cursor.execute("DROP TABLE ReservationChambre")
+    cursor.execute("DROP TABLE Reservation")
+    cursor.execute("ALTER TABLE Reservation_nouvelle RENAME TO Reservation")
+    cursor.execute("ALTER TABLE ReservationChambre_nouvelle RENAME TO ReservationChambre")
+    for sql in definitions:
+        cursor.execute(sql)
+
+
+def actions_cles_etrangeres(cursor):
+    """Actions ON DELETE des clés étrangères des réservations
+
+    Supprimer une réservation supprime ses liens chambre (CASCADE) ; un client
+    ou une chambre encore référencés ne peuvent pas être supprimés (RESTRICT).
+    Les orphelins, qui violeraient les contraintes (client, réservation ou
+    chambre absent), sont supprimés d'abord ; les réservations sans chambre
+    sont conservées.
+    """
+    supprimer_orphelins(cursor)
+    _reconstruire_reservations(cursor)
+
+
+def identifiants_sans_reutilisation(cursor):
+    """Identifiants de réservation jamais réattribués (AUTOINCREMENT)
+
+    Sans AUTOINCREMENT, SQLite attribue max(id) + 1 : une fois la dernière
+    réservation supprimée, son identifiant, ou ceux d'une réservation
+    archivée, pourraient être réattribués et se confondre dans l'historique
+    et les pointages d'arrivée. Les bases reconstruites par la migration 9
+    ont déjà la nouvelle définition. La séquence est ensuite portée au-delà
+    des identifiants déjà archivés, lus dans la base d'archive par défaut
+    (l'archivage la réaligne à chaque passage).
+    """
+    # Importé ici : archive importe ce module
+    from archive import aligner_sequence, chemin_archive, identifiant_max_archive
+
+    if 'AUTOINCREMENT' not in _definition_table(cursor, 'Reservation').upper():
+        _reconstruire_reservations(cursor)
+    cursor.execute("PRAGMA database_list")
+    fichier = next(f for _, nom, f in cursor.fetchall() if nom == 'main')
+    maximum = identifiant_max_archive(chemin_archive(fichier)) if fichier else None
+    if maximum is not None:
+        aligner_sequence(cursor, maximum)
+
+
+def contrainte_periode(cursor):
+    """Contrainte CHECK sur la période des réservations
+
+    Couvre aussi les écritures qui ne passent pas par booking.py (import,
+    requêtes directes). Les bases reconstruites par la migration 9 ou 10
+    ont déjà la nouvelle définition.
+    """
+    if 'CHECK' not in _definition_table(cursor, 'Reservation').upper():
+        _reconstruire_reservations(cursor)
+
+
+def montants_occupation(cursor):
+    """Hôtel et tarif de chaque nuit occupée fixés à la réservation, repris tels quels par StatNuit"""
+    init_montants(cursor)
+    metrics.init_montants_stat(cursor)
+
+
+def versions_mois(cursor):
+    """Version des données par mois pour le cache des rapports
+
+    Les résultats en cache portent une version de l'ancienne numérotation
+    (séquence du journal) : ils sont effacés, recalculés à la demande suivante.
+    """
+    init_versions_mois(cursor)
+    cursor.execute("DELETE FROM ResultatRapport")
+
+
+# (version, description, fonction) par ordre de version croissante
+MIGRATIONS = [
+    (1, "Tables de base", creer_tables),
+    (2, "Index des requêtes fréquentes et unicité de l'email client", creer_index),
+    (3, "Table d'occupation par nuit et triggers de disponibilité", init_availability),
+    (4, "Agrégats du tableau de bord (StatNuit)", metrics.init_metrics),
+    (5, "Recherche plein texte des clients (FTS5)", init_recherche),
+    (6, "Journal des modifications (CDC) de Client, Chambre, Reservation et ReservationChambre",
+     replication.init_journal),
+    (7, "Pointage des arrivées et des no-shows", creer_arrivees),
+    (8, "Cache des résultats de rapports (ResultatRapport)", init_rapports),
+    (9, "Suppression en cascade des liens chambre, clients et chambres référencés protégés", actions_cles_etrangeres),
+    (10, "Identifiants de réservation jamais réattribués (AUTOINCREMENT)", identifiants_sans_reutilisation),
+    (11, "Contrainte de période des réservations (dates valides et couvertes par le calendrier)", contrainte_periode),
+    (12, "Hôtel et tarif de chaque nuit occupée enregistrés pour les agrégats (StatNuit)", montants_occupation),
+    (13, "Journal des modifications (CDC) étendu à Hotel et TypeChambre", replication.init_journal),
+    (14, "Version des données de chaque mois pour le cache des rapports (VersionMois)", versions_mois),
+]
+VERSION_SCHEMA = MIGRATIONS[-1][0]
+
+
+def version_base(conn):
+    """Retourne la version du schéma enregistrée dans la base"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrer(conn, cible=VERSION_SCHEMA):
+    """Applique les migrations manquantes jusqu'à `cible` et retourne les versions appliquées
+
+    Une base déjà à jour ne coûte qu'une lecture de PRAGMA. Les migrations
+    s'exécutent dans une transaction BEGIN IMMEDIATE : en cas d'erreur rien
+    n'est appliqué, et deux processus qui démarrent ensemble ne migrent pas
+    la même base deux fois.
+    """
+    if version_base(conn) >= cible:
+        return []
+    appliquees = []
+    with transaction(conn) as cursor:
+        # Relue sous le verrou d'écriture : un autre processus a pu migrer entre-temps
+        version = version_base(conn)
+        for numero, description, appliquer in MIGRATIONS:
+            if version < numero <= cible:
+                appliquer(cursor)
+                appliquees.append(numero)
+        if appliquees:
+            cursor.execute(f"PRAGMA user_version = {appliquees[-1]}")
+    return appliquees
@@ -0,0 +1,99 @@
+"""Planning d'occupation : grille chambres × nuits d'un hôtel construite avec NumPy
+
+Les séjours de la fenêtre sont lus en une seule requête sur OccupationNuit
+(recherche par intervalle sur la clé (id_chambre, nuit)), regroupés en
+intervalles [première nuit, dernière nuit] par chambre et réservation, puis
+reportés dans la matrice par un tableau de différences cumulé : aucune boucle
+Python par nuit ni par chambre. Les taux par nuit et par chambre sont
+calculés sur la même matrice.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from availability import format_date
+
+# Statut de chaque case de la grille
+LIBRE, OCCUPEE, ARRIVEE = 0, 1, 2
+
+# Couleur RGB de chaque statut pour le rendu en image
+COULEURS = np.array([
+    (235, 235, 235),  # libre
+    (211, 47, 47),    # occupée
+    (245, 124, 0),    # nuit d'arrivée
+], dtype=np.uint8)
+
+
+class Planning:
+    """Grille d'occupation d'un hôtel : une ligne par chambre, une colonne par nuit"""
+
+    __slots__ = ('chambres', 'nuits', 'statuts')
+
+    def __init__(self, chambres, nuits, statuts):
+        self.chambres = chambres  # numéros de chambre, dans l'ordre des lignes
+        self.nuits = nuits        # dates des nuits, dans l'ordre des colonnes
+        self.statuts = statuts    # matrice int8 (chambres × nuits) de LIBRE / OCCUPEE / ARRIVEE
+
+    @property
+    def occupation(self):
+        """Matrice booléenne des nuits occupées"""
+        return self.statuts != LIBRE
+
+    def taux_par_nuit(self):
+        """Part des chambres occupées pour chaque nuit"""
+        if not self.chambres:
+            return np.zeros(len(self.nuits))
+        return self.occupation.mean(axis=0)
+
+    def nuits_par_chambre(self):
+        """Nombre de nuits occupées de chaque chambre sur la fenêtre"""
+        return self.occupation.sum(axis=1)
+
+    def taux_global(self):
+        """Part des nuits-chambres occupées sur toute la fenêtre"""
+        return float(self.occupation.mean()) if self.statuts.size else 0.0
+
+    def image(self, largeur_case=6, hauteur_case=4):
+        """Retourne la grille en image RGB (une case de largeur_case × hauteur_case pixels par nuit-chambre)"""
+        pixels = COULEURS[self.statuts]
+        return np.repeat(np.repeat(pixels, hauteur_case, axis=0), largeur_case, axis=1)
+
+
+def construire_planning(cursor, id_hotel, date_debut, date_fin):
+    """Construit la grille d'occupation d'un hôtel pour les nuits de [date_debut, date_fin)"""
+    debut, fin = date.fromisoformat(format_date(date_debut)), date.fromisoformat(format_date(date_fin))
+    nb_nuits = max((fin - debut).days, 0)
+    nuits = [debut + timedelta(days=i) for i in range(nb_nuits)]
+
+    cursor.execute("SELECT id_chambre, numero FROM Chambre WHERE id_hotel = ? ORDER BY numero", (id_hotel,))
+    chambres = cursor.fetchall()
+    statuts = np.zeros((len(chambres), nb_nuits), dtype=np.int8)
+    if not chambres or not nb_nuits:
+        return Planning([numero for _, numero in chambres], nuits, statuts)
+
+    # Un intervalle par (chambre, réservation), borné à la fenêtre ; écart en jours depuis le début
+    cursor.execute('''
+    SELECT O.id_chambre,
+           CAST(julianday(MIN(O.nuit)) - julianday(?) AS INTEGER),
+           CAST(julianday(MAX(O.nuit)) - julianday(?) AS INTEGER) + 1,
+           MIN(O.nuit) = R.date_debut
+    FROM Chambre CH
+    JOIN OccupationNuit O ON O.id_chambre = CH.id_chambre AND O.nuit >= ? AND O.nuit < ?
+    JOIN Reservation R ON R.id_reservation = O.id_reservation
+    WHERE CH.id_hotel = ?
+    GROUP BY O.id_chambre, O.id_reservation
+    ''', (debut.isoformat(), debut.isoformat(), debut.isoformat(), fin.isoformat(), id_hotel))
+    intervalles = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 4)
+
+    ids = np.array([id_chambre for id_chambre, _ in chambres], dtype=np.int64)
+    ordre = np.argsort(ids)
+    lignes = ordre[np.searchsorted(ids, intervalles[:, 0], sorter=ordre)]
+    debuts, fins, arrivees = intervalles[:, 1], intervalles[:, 2], intervalles[:, 3].astype(bool)
+
+    # Tableau de différences : +1 à la première nuit, -1 après la dernière, puis somme cumulée par ligne
+    differences = np.zeros((len(chambres), nb_nuits + 1), dtype=np.int16)
+    np.add.at(differences, (lignes, debuts), 1)
+    np.add.at(differences, (lignes, fins), -1)
+    statuts[np.cumsum(differences, axis=1)[:, :nb_nuits] > 0] = OCCUPEE
+    statuts[lignes[arrivees], debuts[arrivees]] = ARRIVEE
+    return Planning([numero for _, numero in chambres], nuits, statuts)
@@ -0,0 +1,154 @@
+"""Tarification dynamique : prix par nuit, par hôtel et par type de chambre
+
+Le prix d'une nuit est prix_base multiplié par quatre coefficients :
+occupation du type de chambre dans l'hôtel cette nuit-là, jour de la semaine,
+saison (mois) et anticipation (jours entre aujourd'hui et la nuit). Les règles
+par défaut sont dans REGLES_DEFAUT ; un fichier JSON de même structure désigné
+par la variable d'environnement HOTEL_REGLES_TARIF les remplace.
+
+La grille de tarifs est calculée d'un bloc avec NumPy sur toutes les
+combinaisons (hôtel, type) × nuits, à partir de l'occupation actuelle. Elle
+conserve aussi les sommes cumulées par ligne : le prix d'un séjour s'obtient
+par une soustraction, quelle que soit sa durée.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from availability import format_date
+
+# Nombre de nuits couvertes par la grille standard à partir d'aujourd'hui
+HORIZON_NUITS = 365
+
+REGLES_DEFAUT = {
+    # (taux d'occupation minimal, coefficient) : le dernier seuil atteint s'applique
+    'occupation': [[0.0, 0.9], [0.5, 1.0], [0.7, 1.1], [0.85, 1.25], [0.95, 1.5]],
+    # Lundi à dimanche
+    'jour_semaine': [1.0, 1.0, 1.0, 1.0, 1.15, 1.2, 1.0],
+    # Janvier à décembre
+    'saison': [0.9, 0.9, 1.0, 1.0, 1.05, 1.15, 1.3, 1.3, 1.1, 1.0, 0.9, 1.15],
+    # (jours d'anticipation minimaux, coefficient) : dernière minute plus chère, réservation précoce moins chère
+    'anticipation': [[0, 1.1], [3, 1.0], [60, 0.95]],
+}
+
+
+def charger_regles():
+    """Retourne les règles de tarification (fichier HOTEL_REGLES_TARIF s'il est défini)"""
+    chemin = os.environ.get('HOTEL_REGLES_TARIF')
+    if not chemin:
+        return REGLES_DEFAUT
+    with open(chemin, encoding='utf-8') as f:
+        regles = json.load(f)
+    return {**REGLES_DEFAUT, **regles}
+
+
+def _coefficients_par_palier(paliers, valeurs):
+    """Coefficient du dernier palier atteint par chaque valeur (paliers triés par seuil croissant)"""
+    seuils = np.array([seuil for seuil, _ in paliers], dtype=float)
+    coefficients = np.array([coefficient for _, coefficient in paliers], dtype=float)
+    indices = np.searchsorted(seuils, valeurs, side='right') - 1
+    return np.where(indices >= 0, coefficients[np.clip(indices, 0, None)], 1.0)
+
+
+class GrilleTarifs:
+    """Prix par nuit de chaque combinaison (hôtel, type de chambre) sur une fenêtre de nuits"""
+
+    __slots__ = ('debut', 'combinaisons', 'tarifs', 'cumuls')
+
+    def __init__(self, debut, combinaisons, tarifs):
+        self.debut = debut                # date de la première nuit
+        self.combinaisons = combinaisons  # {(id_hotel, id_type): indice de ligne}
+        self.tarifs = tarifs              # matrice (combinaisons × nuits) des prix par nuit
+        self.cumuls = np.concatenate([np.zeros((len(tarifs), 1)), np.cumsum(tarifs, axis=1)], axis=1)
+
+    @property
+    def fin(self):
+        return self.debut + timedelta(days=self.tarifs.shape[1])
+
+    def couvre(self, date_debut, date_fin):
+        """Indique si toutes les nuits de [date_debut, date_fin) sont dans la grille"""
+        return self.debut <= _date(date_debut) and _date(date_fin) <= self.fin
+
+    def prix_nuits(self, id_hotel, id_type, date_debut, date_fin):
+        """Prix de chaque nuit de [date_debut, date_fin) (None si la combinaison est inconnue)"""
+        ligne = self.combinaisons.get((id_hotel, id_type))
+        if ligne is None:
+            return None
+        i, j = (_date(date_debut) - self.debut).days, (_date(date_fin) - self.debut).days
+        return self.tarifs[ligne, i:j]
+
+    def prix_sejour(self, id_hotel, id_type, date_debut, date_fin):
+        """Prix total d'un séjour sur [date_debut, date_fin) (None si la combinaison est inconnue)"""
+        ligne = self.combinaisons.get((id_hotel, id_type))
+        if ligne is None:
+            return None
+        i, j = (_date(date_debut) - self.debut).days, (_date(date_fin) - self.debut).days
+        return round(float(self.cumuls[ligne, j] - self.cumuls[ligne, i]), 2)
+
+
+def _date(valeur):
+    return date.fromisoformat(format_date(valeur))
+
+
+def fenetre(date_debut, date_fin, aujourd_hui=None):
+    """Fenêtre de nuits de la grille à utiliser pour un séjour
+
+    La grille standard (aujourd'hui + HORIZON_NUITS) est partagée par toutes
+    les recherches ; un séjour qui en sort reçoit une grille à ses dates.
+    """
+    aujourd_hui = aujourd_hui or date.today()
+    debut, fin = _date(date_debut), _date(date_fin)
+    horizon = aujourd_hui + timedelta(days=HORIZON_NUITS)
+    if aujourd_hui <= debut and fin <= horizon:
+        return aujourd_hui, horizon
+    return debut, fin
+
+
+def calculer_grille(cursor, date_debut, date_fin, regles=None, aujourd_hui=None):
+    """Calcule la grille de tarifs de toutes les combinaisons (hôtel, type) pour les nuits de [date_debut, date_fin)"""
+    regles = regles or charger_regles()
+    aujourd_hui = aujourd_hui or date.today()
+    debut, fin = _date(date_debut), _date(date_fin)
+    nb_nuits = max((fin - debut).days, 0)
+
+    cursor.execute('''
+    SELECT CH.id_hotel, CH.id_type, COUNT(*), COALESCE(TC.prix_base, 0)
+    FROM Chambre CH
+    JOIN TypeChambre TC ON CH.id_type = TC.id_type
+    GROUP BY CH.id_hotel, CH.id_type
+    ORDER BY CH.id_hotel, CH.id_type
+    ''')
+    lignes = cursor.fetchall()
+    combinaisons = {(id_hotel, id_type): i for i, (id_hotel, id_type, _, _) in enumerate(lignes)}
+    capacites = np.array([nb for _, _, nb, _ in lignes], dtype=float)
+    prix_base = np.array([prix for _, _, _, prix in lignes], dtype=float)
+
+    # Nuits occupées par (hôtel, type) et par nuit : une recherche par intervalle sur la clé (id_chambre, nuit)
+    occupees = np.zeros((len(lignes), nb_nuits))
+    if lignes and nb_nuits:
+        cursor.execute('''
+        SELECT CH.id_hotel, CH.id_type, CAST(julianday(O.nuit) - julianday(?) AS INTEGER), COUNT(*)
+        FROM Chambre CH
+        JOIN OccupationNuit O ON O.id_chambre = CH.id_chambre AND O.nuit >= ? AND O.nuit < ?
+        GROUP BY CH.id_hotel, CH.id_type, O.nuit
+        ''', (debut.isoformat(), debut.isoformat(), fin.isoformat()))
+        comptes = cursor.fetchall()
+        if comptes:
+            indices = np.array([combinaisons[(h, t)] for h, t, _, _ in comptes])
+            colonnes = np.array([c[2] for c in comptes])
+            occupees[indices, colonnes] = [c[3] for c in comptes]
+    taux = occupees / np.maximum(capacites, 1)[:, None]
+
+    # Coefficients calendaires calculés une fois par nuit, puis diffusés sur toutes les lignes
+    nuits = np.arange(np.datetime64(debut.isoformat()), np.datetime64(debut.isoformat()) + nb_nuits)
+    jours_semaine = (nuits.view('int64') + 3) % 7  # 0 = lundi ; le 1970-01-01 était un jeudi
+    mois = nuits.astype('datetime64[M]').astype(int) % 12
+    anticipation = (nuits - np.datetime64(aujourd_hui.isoformat())).astype(int)
+    calendrier = (np.array(regles['jour_semaine'])[jours_semaine]
+                  * np.array(regles['saison'])[mois]
+                  * _coefficients_par_palier(regles['anticipation'], anticipation))
+
+    tarifs = prix_base[:, None] * _coefficients_par_palier(regles['occupation'], taux) * calendrier[None, :]
+    return GrilleTarifs(debut, combinaisons, np.round(tarifs, 2))
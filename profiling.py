@@ -0,0 +1,280 @@
+"""Profilage des requêtes SQL et des pages (optionnel)
+
+Activé par la variable d'environnement HOTEL_PROFILING=1 : le pool ouvre alors
+des connexions instrumentées qui mesurent chaque requête (durée d'exécution et
+de lecture des lignes, nombre de lignes, plan EXPLAIN QUERY PLAN). Désactivé,
+le pool utilise les connexions ordinaires et rien n'est mesuré.
+
+Les requêtes plus lentes que HOTEL_SLOW_QUERY_MS (100 ms par défaut) sont
+journalisées avec leur texte complet et leurs paramètres.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from db import PooledConnection
+
+ACTIF = os.environ.get('HOTEL_PROFILING', '') not in ('', '0')
+SEUIL_LENT_MS = float(os.environ.get('HOTEL_SLOW_QUERY_MS', 100))
+SEUIL_PAGE_LENTE_MS = float(os.environ.get('HOTEL_SLOW_PAGE_MS', 1000))
+NB_REQUETES_LENTES = 100
+
+logger = logging.getLogger(__name__)
+
+_requetes = {}
+_pages = {}
+_lentes = deque(maxlen=NB_REQUETES_LENTES)
+_lock = threading.Lock()
+
+# Un SCAN sans index est un parcours complet de la table
+_SCAN_COMPLET = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)$')
+_EXPLICABLES = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class StatRequete:
+    """Cumul des mesures d'une requête (texte SQL normalisé)"""
+
+    __slots__ = ('sql', 'appels', 'duree', 'duree_max', 'lignes', 'plan', 'scans_complets')
+
+    def __init__(self, sql, plan):
+        self.sql = sql
+        self.appels = 0
+        self.duree = 0.0
+        self.duree_max = 0.0
+        self.lignes = 0
+        self.plan = plan
+        self.scans_complets = [m.group(1) for m in map(_SCAN_COMPLET.match, plan or []) if m]
+
+
+class StatPage:
+    """Cumul des temps de rendu d'une page du menu"""
+
+    __slots__ = ('page', 'rendus', 'duree', 'duree_max')
+
+    def __init__(self, page):
+        self.page = page
+        self.rendus = 0
+        self.duree = 0.0
+        self.duree_max = 0.0
+
+
+class _Mesure:
+    """Exécution en cours : la durée et les lignes s'accumulent jusqu'à la dernière lecture"""
+
+    __slots__ = ('stat', 'sql', 'parametres', 'duree', 'signalee')
+
+    def __init__(self, stat, sql, parametres):
+        self.stat = stat
+        self.sql = sql
+        self.parametres = parametres
+        self.duree = 0.0
+        self.signalee = False
+
+    def ajouter(self, duree, lignes):
+        with _lock:
+            self.duree += duree
+            self.stat.duree += duree
+            self.stat.duree_max = max(self.stat.duree_max, self.duree)
+            self.stat.lignes += lignes
+            lente = not self.signalee and self.duree * 1000 >= SEUIL_LENT_MS
+            if lente:
+                self.signalee = True
+                _lentes.append({
+                    'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'duree_ms': round(self.duree * 1000, 3),
+                    'sql': self.sql,
+                    'parametres': repr(self.parametres),
+                })
+        if lente:
+            logger.warning("Requête lente (%.1f ms) : %s ; paramètres : %r",
+                           self.duree * 1000, self.sql, self.parametres)
+
+
+def normaliser(sql):
+    """Texte SQL sur une ligne, utilisé comme clé d'agrégation"""
+    return ' '.join(sql.split())
+
+
+def _plan(conn, sql, parametres):
+    """Retourne les lignes de EXPLAIN QUERY PLAN (None si la requête ne s'y prête pas)"""
+    if not sql.lstrip().upper().startswith(_EXPLICABLES):
+        return None
+    try:
+        lignes = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parametres).fetchall()
+    except sqlite3.Error:
+        return None
+    return [ligne[3] for ligne in lignes]
+
+
+def _debuter(conn, sql, parametres, parametres_plan):
+    """Enregistre un appel de la requête et retourne sa mesure"""
+    cle = normaliser(sql)
+    with _lock:
+        stat = _requetes.get(cle)
+    if stat is None:
+        # Plan calculé une seule fois par requête, hors du temps mesuré
+        stat = StatRequete(cle, _plan(conn, sql, parametres_plan))
+        with _lock:
+            stat = _requetes.setdefault(cle, stat)
+    with _lock:
+        stat.appels += 1
+    return _Mesure(stat, sql, parametres)
+
+
+class CurseurProfile(sqlite3.Cursor):
+    """Curseur qui mesure ses exécutions et les lectures de lignes qui suivent"""
+
+    _mesure = None
+
+    def execute(self, sql, parametres=()):
+        self._mesure = mesure = _debuter(self.connection, sql, parametres, parametres)
+        t0 = time.perf_counter()
+        super().execute(sql, parametres)
+        mesure.ajouter(time.perf_counter() - t0, 0 if self.description else max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_parametres):
+        seq_parametres = list(seq_parametres)
+        exemple = seq_parametres[0] if seq_parametres else ()
+        self._mesure = mesure = _debuter(self.connection, sql, f"<{len(seq_parametres)} lignes>", exemple)
+        t0 = time.perf_counter()
+        super().executemany(sql, seq_parametres)
+        mesure.ajouter(time.perf_counter() - t0, max(self.rowcount, 0))
+        return self
+
+    def _lire(self, lecture, *args):
+        t0 = time.perf_counter()
+        resultat = lecture(*args)
+        if self._mesure is not None:
+            lignes = len(resultat) if isinstance(resultat, list) else int(resultat is not None)
+            self._mesure.ajouter(time.perf_counter() - t0, lignes)
+        return resultat
+
+    def fetchone(self):
+        return self._lire(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._lire(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._lire(super().fetchall)
+
+    def __next__(self):
+        ligne = self._lire(super().fetchone)
+        if ligne is None:
+            raise StopIteration
+        return ligne
+
+
+class ConnexionProfilee(PooledConnection):
+    """Connexion du pool dont toutes les requêtes passent par un CurseurProfile"""
+
+    def cursor(self, factory=CurseurProfile):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametres=()):
+        return self.cursor().execute(sql, parametres)
+
+    def executemany(self, sql, seq_parametres):
+        return self.cursor().executemany(sql, seq_parametres)
+
+
+def classe_connexion():
+    """Classe de connexion à utiliser pour le pool selon que le profilage est actif"""
+    return ConnexionProfilee if ACTIF else PooledConnection
+
+
+def debut_page():
+    """Retourne l'instant de début du rendu (None si le profilage est désactivé)"""
+    return time.perf_counter() if ACTIF else None
+
+
+def fin_page(page, debut):
+    """Enregistre le temps de rendu d'une page commencé à `debut`"""
+    if debut is None:
+        return
+    duree = time.perf_counter() - debut
+    with _lock:
+        stat = _pages.setdefault(page, StatPage(page))
+        stat.rendus += 1
+        stat.duree += duree
+        stat.duree_max = max(stat.duree_max, duree)
+    if duree * 1000 >= SEUIL_PAGE_LENTE_MS:
+        logger.warning("Page lente (%.1f ms) : %s", duree * 1000, page)
+
+
+def reinitialiser():
+    """Efface toutes les mesures"""
+    with _lock:
+        _requetes.clear()
+        _pages.clear()
+        _lentes.clear()
+
+
+def instantane():
+    """Retourne une copie des mesures (requêtes triées par durée cumulée décroissante)"""
+    with _lock:
+        requetes = [{
+            'sql': s.sql,
+            'appels': s.appels,
+            'duree_totale_ms': round(s.duree * 1000, 3),
+            'duree_moyenne_ms': round(s.duree * 1000 / s.appels, 3) if s.appels else 0.0,
+            'duree_max_ms': round(s.duree_max * 1000, 3),
+            'lignes': s.lignes,
+            'plan': s.plan,
+            'scans_complets': s.scans_complets,
+        } for s in _requetes.values()]
+        pages = [{
+            'page': p.page,
+            'rendus': p.rendus,
+            'duree_totale_ms': round(p.duree * 1000, 3),
+            'duree_moyenne_ms': round(p.duree * 1000 / p.rendus, 3),
+            'duree_max_ms': round(p.duree_max * 1000, 3),
+        } for p in _pages.values()]
+        lentes = list(_lentes)
+    requetes.sort(key=lambda r: r['duree_totale_ms'], reverse=True)
+    pages.sort(key=lambda p: p['duree_totale_ms'], reverse=True)
+    return {'actif': ACTIF, 'seuil_lent_ms': SEUIL_LENT_MS, 'requetes': requetes, 'pages': pages,
+            'requetes_lentes': lentes}
+
+
+def exporter_json():
+    return json.dumps(instantane(), indent=2, ensure_ascii=False)
+
+
+def _etiquette(valeur):
+    """Échappe une valeur d'étiquette Prometheus"""
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exporter_prometheus():
+    """Retourne les mesures au format texte d'exposition Prometheus"""
+    donnees = instantane()
+    metriques = [
+        ('hotel_requete_appels_total', 'counter', "Nombre d'exécutions de la requête",
+         'requetes', 'sql', lambda r: r['appels']),
+        ('hotel_requete_duree_secondes_total', 'counter', "Durée cumulée de la requête",
+         'requetes', 'sql', lambda r: r['duree_totale_ms'] / 1000),
+        ('hotel_requete_duree_max_secondes', 'gauge', "Durée de l'exécution la plus longue",
+         'requetes', 'sql', lambda r: r['duree_max_ms'] / 1000),
+        ('hotel_requete_lignes_total', 'counter', "Lignes lues ou modifiées par la requête",
+         'requetes', 'sql', lambda r: r['lignes']),
+        ('hotel_requete_scan_complet', 'gauge', "1 si le plan parcourt une table entière",
+         'requetes', 'sql', lambda r: int(bool(r['scans_complets']))),
+        ('hotel_page_rendus_total', 'counter', "Nombre de rendus de la page",
+         'pages', 'page', lambda p: p['rendus']),
+        ('hotel_page_duree_secondes_total', 'counter', "Durée cumulée de rendu de la page",
+         'pages', 'page', lambda p: p['duree_totale_ms'] / 1000),
+    ]
+    lignes = []
+    for nom, type_metrique, aide, section, etiquette, valeur in metriques:
+        lignes.append(f"# HELP {nom} {aide}")
+        lignes.append(f"# TYPE {nom} {type_metrique}")
+        for element in donnees[section]:
+            lignes.append(f'{nom}{{{etiquette}="{_etiquette(element[etiquette])}"}} {valeur(element)}')
+    return "\n".join(lignes) + "\n"
@@ -0,0 +1,326 @@
+"""Journal des modifications (change data capture) et réplique en lecture seule
+
+Des triggers enregistrent chaque insertion, modification et suppression sur
+Hotel, TypeChambre, Client, Chambre, Reservation, ReservationChambre et Arrivee
+dans JournalModifications, table en ajout seul dont le numéro de séquence
+(AUTOINCREMENT) ne décroît jamais, même après une purge. Il sert :
+- de clé de version peu coûteuse pour les caches (sequences_par_section) :
+  toute écriture, quel que soit le processus, change la séquence de sa section ;
+- à tenir à jour une réplique (fichier SQLite secondaire ou base en mémoire)
+  pour les rapports et les sauvegardes, sans contention avec la réception.
+
+La réplique est initialisée par l'API de sauvegarde en ligne de SQLite (une
+lecture en WAL ne bloque pas les écritures), puis rattrapée en rejouant les
+modifications postérieures par ordre de séquence : le coût du rattrapage est
+proportionnel au nombre de modifications, pas à la taille de la base. Les
+triggers dérivés de la réplique (occupation, StatNuit, recherche) restent
+actifs pour que ses tables dérivées suivent ; seuls ceux du journal y sont
+supprimés. Hotel et TypeChambre sont journalisées pour que ces triggers y
+lisent les mêmes hôtels et tarifs que sur la source.
+
+Le journal est purgé par la maintenance (purger_journal, limite_purge) : les
+modifications plus anciennes que RETENTION_JOURS et déjà appliquées par les
+répliques indiquées ; une réplique en retard sur la purge est réinitialisée.
+
+Usage : python replication.py hotel_replica.db --suivre
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from db import DB_PATH, configure_connection, transaction
+
+# {table: (colonnes de la clé, colonnes journalisées)}
+TABLES_JOURNALISEES = {
+    'Hotel': (('id_hotel',), ('id_hotel', 'ville', 'pays', 'code_postal')),
+    'TypeChambre': (('id_type',), ('id_type', 'libelle', 'prix_base')),
+    'Client': (('id_client',), ('id_client', 'nom', 'adresse', 'ville', 'code_postal', 'email', 'telephone')),
+    'Chambre': (('id_chambre',), ('id_chambre', 'numero', 'etage', 'vue_mer', 'id_hotel', 'id_type')),
+    'Reservation': (('id_reservation',), ('id_reservation', 'date_debut', 'date_fin', 'id_client')),
+    'ReservationChambre': (('id_reservation', 'id_chambre'), ('id_reservation', 'id_chambre')),
+    'Arrivee': (('id_reservation',), ('id_reservation', 'statut', 'horodatage')),
+}
+# StatNuit n'est pas journalisée par trigger (ses triggers la dérivent déjà dans la réplique) ; seul
+# l'archivage, qui la modifie directement, y inscrit ses lignes avec leurs valeurs absolues
+TABLES_REJOUEES = {
+    **TABLES_JOURNALISEES,
+    'StatNuit': (('id_hotel', 'nuit'), ('id_hotel', 'nuit', 'chambres_occupees', 'revenu')),
+}
+# Sections de cache du dépôt (repository) et tables qui les composent
+SECTIONS = {
+    'reservations': ('Reservation', 'ReservationChambre', 'Arrivee'),
+    'clients': ('Client',),
+    'chambres': ('Chambre', 'TypeChambre', 'Hotel'),
+}
+TAILLE_LOT = 5000
+INTERVALLE_SECONDES = 1.0
+# Âge minimal des modifications purgées par la maintenance
+RETENTION_JOURS = float(os.environ.get('HOTEL_JOURNAL_RETENTION_JOURS', 7))
+
+
+def _triggers(table):
+    return [f'trg_journal_{table.lower()}_{operation}' for operation in ('insert', 'update', 'delete')]
+
+
+def init_journal(cursor):
+    """Crée le journal des modifications et ses triggers (recréés pour appliquer leur dernière définition)
+
+    Seules les tables existantes reçoivent leurs triggers : la migration qui
+    crée une table journalisée rappelle init_journal.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS JournalModifications (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_nom TEXT NOT NULL,
+        operation TEXT NOT NULL CHECK (operation IN ('I', 'U', 'D')),
+        cle TEXT NOT NULL,
+        ligne TEXT,
+        horodatage TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    )
+    ''')
+    # Dernière séquence de chaque table (clé de version des caches)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_table ON JournalModifications(table_nom, seq)")
+    # Séquence jusqu'à laquelle le journal a été purgé : une réplique plus ancienne doit être réinitialisée
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS JournalPurge (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    )
+    ''')
+
+    for table, (cle, colonnes) in TABLES_JOURNALISEES.items():
+        if not _table_existe(cursor.connection, table):
+            continue
+        for nom in _triggers(table):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+
+        def cle_de(ligne):
+            return "json_array(" + ", ".join(f"{ligne}.{c}" for c in cle) + ")"
+
+        def ligne_de(ligne):
+            return "json_object(" + ", ".join(f"'{c}', {ligne}.{c}" for c in colonnes) + ")"
+
+        # Une modification porte l'ancienne clé (ligne à modifier) et la nouvelle ligne complète
+        for nom, evenement, operation, cle_sql, ligne_sql in zip(
+            _triggers(table),
+            ('INSERT', 'UPDATE', 'DELETE'),
+            ('I', 'U', 'D'),
+            (cle_de('NEW'), cle_de('OLD'), cle_de('OLD')),
+            (ligne_de('NEW'), ligne_de('NEW'), 'NULL'),
+        ):
+            cursor.execute(f'''
+            CREATE TRIGGER {nom}
+            AFTER {evenement} ON {table}
+            BEGIN
+                INSERT INTO JournalModifications (table_nom, operation, cle, ligne)
+                VALUES ('{table}', '{operation}', {cle_sql}, {ligne_sql});
+            END
+            ''')
+
+
+def derniere_sequence(cursor):
+    """Dernier numéro de séquence attribué (0 si le journal n'a jamais rien reçu)"""
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'JournalModifications'")
+    ligne = cursor.fetchone()
+    return ligne[0] if ligne else 0
+
+
+def sequences_par_section(cursor):
+    """Dernière séquence de chaque section de cache : {section: seq} (une recherche d'index par table)"""
+    tables = [table for tables in SECTIONS.values() for table in tables]
+    cursor.execute("SELECT " + ", ".join(
+        "(SELECT MAX(seq) FROM JournalModifications WHERE table_nom = ?)" for _ in tables
+    ), tables)
+    par_table = dict(zip(tables, cursor.fetchone()))
+    return {section: max(par_table[t] or 0 for t in tables) for section, tables in SECTIONS.items()}
+
+
+def purger_journal(conn, jusqu_a):
+    """Supprime les modifications de séquence <= jusqu_a (déjà appliquées par toutes les répliques)
+
+    La dernière modification de chaque table est conservée : sequences_par_section
+    ne doit jamais revenir en arrière. Retourne le nombre de lignes supprimées.
+    """
+    with transaction(conn) as cursor:
+        cursor.execute('''
+        DELETE FROM JournalModifications
+        WHERE seq <= ?
+          AND seq NOT IN (SELECT MAX(seq) FROM JournalModifications GROUP BY table_nom)
+        ''', (jusqu_a,))
+        supprimees = cursor.rowcount
+        cursor.execute('''
+        INSERT INTO JournalPurge (id, seq)
+        VALUES (1, MIN(?, (SELECT seq FROM sqlite_sequence WHERE name = 'JournalModifications')))
+        ON CONFLICT (id) DO UPDATE SET seq = MAX(seq, excluded.seq)
+        ''', (jusqu_a,))
+        return supprimees
+
+
+def position_replique(chemin):
+    """Séquence appliquée par une réplique (fichier), lue sans la modifier ; None si elle n'a jamais été initialisée"""
+    if not os.path.exists(chemin):
+        return None
+    replica = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+    try:
+        return _position(replica)[0] if _table_existe(replica, 'EtatReplique') else None
+    finally:
+        replica.close()
+
+
+def limite_purge(cursor, retention_jours=RETENTION_JOURS, repliques=()):
+    """Séquence jusqu'à laquelle purger le journal
+
+    Dernière modification enregistrée il y a plus de `retention_jours` jours,
+    sans dépasser la position des répliques listées (chemins de fichiers) :
+    une réplique jamais initialisée n'en retient aucune, elle commencera par
+    une sauvegarde complète.
+    """
+    cursor.execute('''
+    SELECT seq FROM JournalModifications
+    WHERE horodatage < strftime('%Y-%m-%dT%H:%M:%f', 'now', ?)
+    ORDER BY seq DESC
+    LIMIT 1
+    ''', (f'-{retention_jours} days',))
+    ligne = cursor.fetchone()
+    limite = ligne[0] if ligne else 0
+    for chemin in repliques:
+        position = position_replique(chemin)
+        if position is not None:
+            limite = min(limite, position)
+    return limite
+
+
+def _position(replica):
+    ligne = replica.execute("SELECT seq, version_schema FROM EtatReplique").fetchone()
+    return ligne if ligne else (None, None)
+
+
+def initialiser_replique(source, replica):
+    """Copie complète de la source dans la réplique par l'API de sauvegarde en ligne
+
+    La position de départ est lue dans la copie elle-même : elle correspond
+    exactement à l'instantané copié. Retourne cette position.
+    """
+    source.backup(replica)
+    for table in TABLES_JOURNALISEES:
+        for nom in _triggers(table):
+            replica.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    seq = derniere_sequence(replica.cursor())
+    version_schema = replica.execute("PRAGMA user_version").fetchone()[0]
+    replica.execute("DELETE FROM JournalModifications")
+    replica.execute('''
+    CREATE TABLE IF NOT EXISTS EtatReplique (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL,
+        version_schema INTEGER NOT NULL
+    )
+    ''')
+    replica.execute("INSERT OR REPLACE INTO EtatReplique (id, seq, version_schema) VALUES (1, ?, ?)",
+                    (seq, version_schema))
+    replica.commit()
+    return seq
+
+
+def _appliquer(cursor, table, operation, cle, ligne):
+    """Rejoue une modification avec la même opération SQL que sur la source (les triggers dérivés suivent)"""
+    colonnes_cle, _ = TABLES_REJOUEES[table]
+    condition = " AND ".join(f"{c} = ?" for c in colonnes_cle)
+    if operation == 'I':
+        cursor.execute(f"INSERT INTO {table} ({', '.join(ligne)}) VALUES ({', '.join('?' * len(ligne))})",
+                       list(ligne.values()))
+    elif operation == 'U':
+        cursor.execute(f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in ligne)} WHERE {condition}",
+                       list(ligne.values()) + cle)
+    else:
+        cursor.execute(f"DELETE FROM {table} WHERE {condition}", cle)
+
+
+def rattraper(source, replica, taille_lot=TAILLE_LOT):
+    """Applique à la réplique les modifications postérieures à sa position
+
+    Chaque lot est appliqué dans une transaction avec la nouvelle position :
+    un arrêt en cours de route ne rejoue ni ne perd aucune modification. La
+    réplique est réinitialisée par sauvegarde si elle n'a jamais été
+    initialisée, si le schéma de la source a changé ou si les modifications
+    qui lui manquent ont été purgées. Retourne le nombre de modifications appliquées
+    (None si la réplique a été réinitialisée).
+    """
+    seq, version_schema = _position(replica) if _table_existe(replica, 'EtatReplique') else (None, None)
+    if seq is None or version_schema != source.execute("PRAGMA user_version").fetchone()[0]:
+        initialiser_replique(source, replica)
+        return None
+    purge = source.execute("SELECT COALESCE(MAX(seq), 0) FROM JournalPurge").fetchone()[0]
+    if seq < purge:
+        initialiser_replique(source, replica)
+        return None
+
+    appliquees = 0
+    while True:
+        lot = source.execute('''
+        SELECT seq, table_nom, operation, cle, ligne
+        FROM JournalModifications
+        WHERE seq > ?
+        ORDER BY seq
+        LIMIT ?
+        ''', (seq, taille_lot)).fetchall()
+        if not lot:
+            return appliquees
+        cursor = replica.cursor()
+        cursor.execute("BEGIN")
+        try:
+            for _, table, operation, cle, ligne in lot:
+                _appliquer(cursor, table, operation, json.loads(cle), json.loads(ligne) if ligne else None)
+            seq = lot[-1][0]
+            cursor.execute("UPDATE EtatReplique SET seq = ?", (seq,))
+        except BaseException:
+            replica.rollback()
+            raise
+        replica.commit()
+        appliquees += len(lot)
+
+
+def _table_existe(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def ouvrir_replique(chemin):
+    """Ouvre (ou crée) une réplique ; ':memory:' donne un instantané en mémoire"""
+    replica = sqlite3.connect(chemin, check_same_thread=False)
+    if chemin != ':memory:':
+        configure_connection(replica)
+    # Les lignes sont rejouées dans l'ordre de la source : les clés étrangères y ont déjà été vérifiées
+    replica.execute("PRAGMA foreign_keys = OFF")
+    return replica
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("replique", help="fichier de la réplique")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--suivre", action="store_true", help="rattraper en continu")
+    parser.add_argument("--intervalle", type=float, default=INTERVALLE_SECONDES)
+    args = parser.parse_args()
+
+    source = configure_connection(sqlite3.connect(args.db))
+    replica = ouvrir_replique(args.replique)
+    while True:
+        t0 = time.perf_counter()
+        appliquees = rattraper(source, replica)
+        duree = (time.perf_counter() - t0) * 1000
+        if appliquees is None:
+            print(f"Réplique initialisée par sauvegarde en {duree:.0f} ms (séquence {_position(replica)[0]})",
+                  flush=True)
+        elif appliquees or not args.suivre:
+            print(f"{appliquees} modification(s) appliquée(s) en {duree:.1f} ms (séquence {_position(replica)[0]})",
+                  flush=True)
+        if not args.suivre:
+            break
+        time.sleep(args.intervalle)
+    source.close()
+    replica.close()
+
+
+if __name__ == "__main__":
+    main()
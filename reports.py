@@ -0,0 +1,563 @@
+"""Rapports mensuels calculés en arrière-plan dans un pool de processus, résultats mis en cache
+
+Quatre rapports (RAPPORTS) : revenu par type de chambre, occupation par étage
+et vue mer, fréquence de séjour des clients et taux de no-show. Une demande
+(rapport, mois, hôtels) est découpée en parties (hôtel, mois) calculées par un
+ProcessPoolExecutor : le calcul ne bloque ni le script Streamlit ni le GIL du
+serveur, et plusieurs parties avancent en parallèle. Chaque processus de
+calcul garde sa connexion, en lecture seule (PRAGMA query_only) et avec la
+base d'archive attachée : les mois archivés restent couverts.
+
+Les lignes de chaque partie sont enregistrées dans ResultatRapport avec la
+version des données de son mois (VersionMois, tenue par triggers) : une
+écriture sur une réservation, ses chambres ou son pointage ne change que la
+version des mois de sa période, une écriture sur Hotel, TypeChambre ou
+Chambre celle de tous les mois. Une partie n'est recalculée que si la version
+de son mois a changé (celle des mois précédents aussi pour la fréquence de
+séjour, qui lit l'historique) et une demande déjà faite se relit sans calcul ;
+seule la version la plus récente est gardée par partie. La version et la
+durée du plus long séjour sont lues par les processus de calcul : la
+soumission ne fait que des lectures indexées.
+
+Le taux de no-show ne porte que sur les arrivées pointées par la réception
+(table Arrivee) ; les arrivées non pointées sont comptées à part.
+
+Usage : python reports.py revenu --debut 2025-01 --mois 12 --sortie revenu.csv
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+
+from availability import CALENDRIER_DEBUT, CALENDRIER_FIN
+from db import DB_PATH, configure_connection, transaction
+
+NB_PROCESSUS = int(os.environ.get('HOTEL_RAPPORTS_PROCESSUS', 0)) or os.cpu_count()
+PARQUET_DISPONIBLE = importlib.util.find_spec('pyarrow') is not None
+
+def _sejours(condition):
+    """CTE sejours : (id_reservation, id_client, date_debut, date_fin, id_chambre) des séjours de l'hôtel
+
+    Les réservations retenues par `condition` viennent de ReservationHistorique
+    (index sur date_debut dans les deux bases) ; leurs liens chambre sont lus
+    par clé dans la base de chaque réservation : jointe, la vue
+    ReservationChambreHistorique serait matérialisée en entier. CROSS JOIN
+    fixe l'ordre des jointures (la base d'archive n'a pas de statistiques).
+    """
+    return f'''
+retenues AS (
+    SELECT id_reservation, id_client, date_debut, date_fin, archivee
+    FROM ReservationHistorique R
+    WHERE {condition}
+),
+sejours AS (
+    SELECT R.id_reservation, R.id_client, R.date_debut, R.date_fin, RC.id_chambre
+    FROM retenues R
+    CROSS JOIN main.ReservationChambre RC ON RC.id_reservation = R.id_reservation
+    CROSS JOIN Chambre CH ON CH.id_chambre = RC.id_chambre
+    WHERE R.archivee = 0 AND CH.id_hotel = :id_hotel
+    UNION ALL
+    SELECT R.id_reservation, R.id_client, R.date_debut, R.date_fin, AC.id_chambre
+    FROM retenues R
+    CROSS JOIN archive.ReservationChambre AC ON AC.id_reservation = R.id_reservation
+    CROSS JOIN Chambre CH ON CH.id_chambre = AC.id_chambre
+    WHERE R.archivee = 1 AND CH.id_hotel = :id_hotel
+)'''
+
+
+# Nuits occupées dans le mois par chambre ; la borne basse sur date_debut (durée du plus long séjour)
+# limite la recherche par index aux séjours qui peuvent encore couvrir le mois
+_NUITS_PAR_CHAMBRE = _sejours("R.date_debut >= :debut_fenetre AND R.date_debut < :fin AND R.date_fin > :debut") + ''',
+nuits AS (
+    SELECT id_chambre, TOTAL(julianday(MIN(date_fin, :fin)) - julianday(MAX(date_debut, :debut))) AS nuits
+    FROM sejours
+    GROUP BY id_chambre
+)'''
+
+# Réservations (distinctes) de l'hôtel dont l'arrivée tombe dans [debut, limite)
+_ARRIVEES = _sejours("R.date_debut >= :debut AND R.date_debut < :limite") + ''',
+arrivees AS (
+    SELECT DISTINCT id_reservation, id_client FROM sejours
+)'''
+
+
+class Rapport:
+    """Définition d'un rapport : colonnes et requête d'une partie
+
+    Un rapport cumulatif lit aussi les mois précédents (historique des
+    clients) : la version d'une partie est alors celle de tous les mois
+    jusqu'au sien.
+    """
+
+    def __init__(self, titre, colonnes, requete, cumulatif=False):
+        self.titre = titre
+        self.cumulatif = cumulatif
+        self.colonnes = ('mois', 'hotel') + colonnes
+        self.requete = requete
+
+
+RAPPORTS = {
+    'revenu': Rapport(
+        "Revenu par type de chambre",
+        ('type_chambre', 'chambres', 'nuits_vendues', 'revenu', 'taux_occupation'), f'''
+        WITH {_NUITS_PAR_CHAMBRE}
+        SELECT :mois, H.ville, TC.libelle, COUNT(*),
+               CAST(TOTAL(N.nuits) AS INTEGER),
+               ROUND(TOTAL(N.nuits * TC.prix_base), 2),
+               ROUND(TOTAL(N.nuits) / (COUNT(*) * :jours), 4)
+        FROM Chambre CH
+        JOIN Hotel H ON H.id_hotel = CH.id_hotel
+        LEFT JOIN TypeChambre TC ON TC.id_type = CH.id_type
+        LEFT JOIN nuits N ON N.id_chambre = CH.id_chambre
+        WHERE CH.id_hotel = :id_hotel
+        GROUP BY CH.id_type
+        ORDER BY TC.prix_base
+        '''),
+    'occupation': Rapport(
+        "Occupation par étage et vue mer",
+        ('etage', 'vue_mer', 'chambres', 'nuits_occupees', 'nuits_disponibles', 'taux_occupation'), f'''
+        WITH {_NUITS_PAR_CHAMBRE}
+        SELECT :mois, H.ville, CH.etage, CH.vue_mer, COUNT(*),
+               CAST(TOTAL(N.nuits) AS INTEGER),
+               COUNT(*) * :jours,
+               ROUND(TOTAL(N.nuits) / (COUNT(*) * :jours), 4)
+        FROM Chambre CH
+        JOIN Hotel H ON H.id_hotel = CH.id_hotel
+        LEFT JOIN nuits N ON N.id_chambre = CH.id_chambre
+        WHERE CH.id_hotel = :id_hotel
+        GROUP BY CH.etage, CH.vue_mer
+        ORDER BY CH.etage, CH.vue_mer
+        '''),
+    'frequence': Rapport(
+        "Fréquence de séjour des clients",
+        ('sejours', 'clients', 'sejours_par_client', 'clients_plusieurs_sejours',
+         'clients_recurrents', 'part_recurrents'), f'''
+        WITH {_ARRIVEES},
+        par_client AS (
+            SELECT A.id_client, COUNT(*) AS sejours,
+                   EXISTS (SELECT 1 FROM ReservationHistorique P
+                           WHERE P.id_client = A.id_client AND P.date_debut < :debut) AS recurrent
+            FROM arrivees A
+            GROUP BY A.id_client
+        )
+        SELECT :mois, H.ville,
+               CAST(TOTAL(C.sejours) AS INTEGER),
+               COUNT(C.id_client),
+               ROUND(TOTAL(C.sejours) / NULLIF(COUNT(C.id_client), 0), 3),
+               CAST(TOTAL(C.sejours >= 2) AS INTEGER),
+               CAST(TOTAL(C.recurrent) AS INTEGER),
+               ROUND(TOTAL(C.recurrent) / NULLIF(COUNT(C.id_client), 0), 4)
+        FROM Hotel H
+        LEFT JOIN par_client C ON 1
+        WHERE H.id_hotel = :id_hotel
+        ''', cumulatif=True),
+    'no_show': Rapport(
+        "Taux de no-show",
+        ('arrivees_prevues', 'clients_arrives', 'no_shows', 'non_pointees', 'taux_no_show'), f'''
+        WITH {_ARRIVEES}
+        SELECT :mois, H.ville,
+               COUNT(X.id_reservation),
+               CAST(TOTAL(A.statut = 'arrive') AS INTEGER),
+               CAST(TOTAL(A.statut = 'no_show') AS INTEGER),
+               COUNT(X.id_reservation) - COUNT(A.statut),
+               ROUND(TOTAL(A.statut = 'no_show') / NULLIF(COUNT(A.statut), 0), 4)
+        FROM Hotel H
+        LEFT JOIN arrivees X ON 1
+        LEFT JOIN main.Arrivee A ON A.id_reservation = X.id_reservation
+        WHERE H.id_hotel = :id_hotel
+        '''),
+}
+
+
+def init_rapports(cursor):
+    """Crée la table des résultats de rapports (une ligne JSON par partie hôtel × mois)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ResultatRapport (
+        rapport TEXT NOT NULL,
+        id_hotel INTEGER NOT NULL,
+        mois TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        lignes TEXT NOT NULL,
+        duree_ms REAL NOT NULL,
+        calcule_le TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now')),
+        PRIMARY KEY (rapport, id_hotel, mois)
+    ) WITHOUT ROWID
+    ''')
+
+
+def liste_mois(debut, nb_mois):
+    """Mois consécutifs ('AAAA-MM') à partir de `debut` (date ou 'AAAA-MM')"""
+    annee, mois = (debut.year, debut.month) if isinstance(debut, date) else map(int, debut[:7].split('-'))
+    return [f"{annee + (mois - 1 + i) // 12:04d}-{(mois - 1 + i) % 12 + 1:02d}" for i in range(nb_mois)]
+
+
+def _triggers_versions():
+    """(nom, table, événement, condition sur VersionMois) des triggers qui changent la version des mois"""
+    def periode(ligne):
+        return f"mois BETWEEN substr({ligne}.date_debut, 1, 7) AND substr({ligne}.date_fin, 1, 7)"
+
+    def periode_reservation(ligne):
+        return (f"mois BETWEEN (SELECT substr(date_debut, 1, 7) FROM Reservation "
+                f"WHERE id_reservation = {ligne}.id_reservation) "
+                f"AND (SELECT substr(date_fin, 1, 7) FROM Reservation WHERE id_reservation = {ligne}.id_reservation)")
+
+    triggers = [
+        ('insert', 'Reservation', 'INSERT', periode('NEW')),
+        ('update', 'Reservation', 'UPDATE', f"{periode('OLD')} OR {periode('NEW')}"),
+        ('delete', 'Reservation', 'DELETE', periode('OLD')),
+    ]
+    for table in ('ReservationChambre', 'Arrivee'):
+        triggers += [
+            ('insert', table, 'INSERT', periode_reservation('NEW')),
+            ('update', table, 'UPDATE', f"{periode_reservation('OLD')} OR {periode_reservation('NEW')}"),
+            ('delete', table, 'DELETE', periode_reservation('OLD')),
+        ]
+    # Lues par les rapports pour tous les mois
+    for table in ('Hotel', 'TypeChambre', 'Chambre'):
+        triggers += [(operation, table, operation.upper(), '1') for operation in ('insert', 'update', 'delete')]
+    return [(f"trg_version_mois_{table.lower()}_{operation}", table, evenement, condition)
+            for operation, table, evenement, condition in triggers]
+
+
+def init_versions_mois(cursor):
+    """Crée VersionMois (version des données de chaque mois du calendrier) et ses triggers
+
+    Une écriture donne aux mois qu'elle touche une même version, supérieure à
+    toutes les versions existantes (numérotation commune à tous les mois).
+    Une réservation archivée n'est plus dans Reservation : le pointage tardif
+    d'une arrivée archivée ne change aucune version.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS VersionMois (
+        mois TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_version_mois_version ON VersionMois(version)")
+    debut, fin = date.fromisoformat(CALENDRIER_DEBUT), date.fromisoformat(CALENDRIER_FIN)
+    cursor.executemany("INSERT OR IGNORE INTO VersionMois (mois, version) VALUES (?, 0)",
+                       [(mois,) for mois in liste_mois(debut, (fin.year - debut.year) * 12 + fin.month - debut.month)])
+    for nom, table, evenement, condition in _triggers_versions():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+        cursor.execute(f'''
+        CREATE TRIGGER {nom}
+        AFTER {evenement} ON {table}
+        BEGIN
+            UPDATE VersionMois SET version = (SELECT MAX(version) FROM VersionMois) + 1
+            WHERE {condition};
+        END
+        ''')
+
+
+def versions_mois(cursor, rapport, mois):
+    """Version courante des données de chaque mois d'une demande : {mois: version}"""
+    if RAPPORTS[rapport].cumulatif:
+        cursor.execute("SELECT mois, version FROM VersionMois WHERE mois <= ? ORDER BY mois", (mois[-1],))
+        versions, courante = {}, 0
+        for m, version in cursor.fetchall():
+            courante = max(courante, version)
+            versions[m] = courante
+    else:
+        cursor.execute("SELECT mois, version FROM VersionMois WHERE mois BETWEEN ? AND ?", (mois[0], mois[-1]))
+        versions = dict(cursor.fetchall())
+    return {m: versions.get(m, 0) for m in mois}
+
+
+def _parametres(id_hotel, mois, duree_max, aujourd_hui):
+    """Paramètres nommés d'une partie : bornes du mois, fenêtre des séjours et limite des arrivées"""
+    debut = date.fromisoformat(mois + '-01')
+    fin = (debut + timedelta(days=31)).replace(day=1)
+    return {
+        'id_hotel': id_hotel,
+        'mois': mois,
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'jours': (fin - debut).days,
+        'debut_fenetre': (debut - timedelta(days=duree_max)).isoformat(),
+        # Une arrivée future ne peut pas encore être un no-show
+        'limite': min(fin, aujourd_hui + timedelta(days=1)).isoformat(),
+    }
+
+
+# Connexion du processus de calcul, ouverte par _init_processus
+_connexion = None
+# Durée du plus long séjour et version de VersionMois à laquelle elle a été mesurée
+_duree_max = (None, 0)
+
+
+def _init_processus(chemin):
+    """Ouvre la connexion du processus de calcul : lecture seule, base d'archive attachée"""
+    global _connexion
+    # Importé ici : archive importe migrations, qui importe ce module
+    from archive import attacher_archive
+    _connexion = attacher_archive(configure_connection(sqlite3.connect(chemin)))
+    _connexion.execute("PRAGMA query_only = ON")
+
+
+def _duree_max_sejour():
+    """Séjour le plus long, archives comprises : borne basse de la recherche des séjours d'un mois
+
+    Les deux parcours complets ne sont refaits que si une réservation a
+    changé (l'archivage supprime dans la base principale).
+    """
+    global _duree_max
+    version = _connexion.execute("SELECT MAX(version) FROM VersionMois").fetchone()[0]
+    if _duree_max[0] != version:
+        duree = max(_connexion.execute(
+            f"SELECT MAX(julianday(date_fin) - julianday(date_debut)) FROM {schema}.Reservation").fetchone()[0] or 0
+            for schema in ('main', 'archive'))
+        _duree_max = (version, int(duree))
+    return _duree_max[1]
+
+
+def calculer_partie(rapport, id_hotel, mois, aujourd_hui):
+    """Calcule une partie dans un processus de calcul ; retourne (lignes, durée en ms, version des données)
+
+    La version est lue avant les données : une écriture concurrente ne peut
+    que faire recalculer la partie à la demande suivante.
+    """
+    debut = time.perf_counter()
+    version = versions_mois(_connexion.cursor(), rapport, [mois])[mois]
+    lignes = _connexion.execute(RAPPORTS[rapport].requete,
+                                _parametres(id_hotel, mois, _duree_max_sejour(), aujourd_hui)).fetchall()
+    return lignes, (time.perf_counter() - debut) * 1000, version
+
+
+class Tache:
+    """Suivi d'une demande : parties à calculer, parties terminées, erreur éventuelle"""
+
+    def __init__(self, id_tache, rapport, mois, hotels, versions, total, en_cache):
+        self.id_tache = id_tache
+        self.rapport = rapport
+        self.mois = mois
+        self.hotels = hotels
+        # Version des données de chaque mois à la soumission : {mois: version}
+        self.versions = versions
+        self.total = total
+        self.en_cache = en_cache
+        self.terminees = en_cache
+        self.erreur = None
+        self.debut = time.perf_counter()
+        self.duree = None
+        self.finie = threading.Event()
+
+    @property
+    def termine(self):
+        return self.finie.is_set()
+
+    def progression(self):
+        """Part des parties terminées (cache compris), entre 0 et 1"""
+        return self.terminees / self.total if self.total else 1.0
+
+
+class MoteurRapports:
+    """File de calcul des rapports : un pool de processus partagé par toutes les sessions
+
+    Les processus ne sont créés qu'à la première partie à calculer. Deux
+    demandes identiques sur la même version des données partagent une tâche.
+    """
+
+    def __init__(self, pool, nb_processus=NB_PROCESSUS):
+        self.pool = pool
+        self.nb_processus = nb_processus
+        self._executeur = None
+        self._taches = {}
+        self._en_cours = {}
+        self._compteur = itertools.count(1)
+        self._verrou = threading.Lock()
+
+    def _executeur_processus(self):
+        with self._verrou:
+            if self._executeur is None:
+                # spawn : un fork copierait les threads et connexions du serveur Streamlit
+                self._executeur = ProcessPoolExecutor(
+                    self.nb_processus, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_processus, initargs=(self.pool.path,))
+            return self._executeur
+
+    def soumettre(self, rapport, debut, nb_mois, hotels=None, forcer=False, aujourd_hui=None):
+        """Met une demande en file et retourne l'identifiant de sa tâche
+
+        Les parties déjà en cache pour la version courante des données de leur
+        mois ne sont pas recalculées (sauf forcer=True) ; une demande
+        identique en cours retourne la tâche existante. Seules des lectures
+        indexées sont faites ici, dans le thread appelant.
+        """
+        if rapport not in RAPPORTS:
+            raise ValueError(f"Rapport inconnu : {rapport}")
+        aujourd_hui = aujourd_hui or date.today()
+        mois = liste_mois(debut, nb_mois)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            versions = versions_mois(cursor, rapport, mois)
+            if not hotels:
+                hotels = [h for h, in cursor.execute("SELECT id_hotel FROM Hotel")]
+            hotels = tuple(sorted(hotels))
+            cle = (rapport, tuple(mois), hotels, tuple(versions.values()))
+            with self._verrou:
+                if not forcer and cle in self._en_cours:
+                    return self._en_cours[cle]
+            en_cache = set()
+            if not forcer:
+                cursor.execute("SELECT id_hotel, mois, version FROM ResultatRapport "
+                               "WHERE rapport = ? AND mois BETWEEN ? AND ?", (rapport, mois[0], mois[-1]))
+                en_cache = {(h, m) for h, m, version in cursor.fetchall() if version >= versions[m]}
+            parties = [(h, m) for m in mois for h in hotels if (h, m) not in en_cache]
+
+        with self._verrou:
+            tache = Tache(next(self._compteur), rapport, mois, hotels, versions,
+                          len(mois) * len(hotels), len(mois) * len(hotels) - len(parties))
+            self._taches[tache.id_tache] = tache
+            self._en_cours[cle] = tache.id_tache
+        if not parties:
+            self._terminer(tache, cle)
+            return tache.id_tache
+
+        executeur = self._executeur_processus()
+        for id_hotel, m in parties:
+            try:
+                future = executeur.submit(calculer_partie, rapport, id_hotel, m, aujourd_hui)
+            except BrokenProcessPool:
+                # Un processus de calcul a été tué (mémoire...) : nouveau pool pour cette demande et les suivantes
+                with self._verrou:
+                    if self._executeur is executeur:
+                        self._executeur = None
+                executeur = self._executeur_processus()
+                future = executeur.submit(calculer_partie, rapport, id_hotel, m, aujourd_hui)
+            future.add_done_callback(
+                lambda f, id_hotel=id_hotel, m=m: self._partie_terminee(tache, cle, id_hotel, m, f))
+        return tache.id_tache
+
+    def _partie_terminee(self, tache, cle, id_hotel, mois, future):
+        """Enregistre le résultat d'une partie (appelée dans un thread de l'exécuteur)"""
+        try:
+            lignes, duree_ms, version = future.result()
+            with self.pool.connection() as conn:
+                with transaction(conn) as cursor:
+                    # Une partie d'une version plus ancienne, terminée en retard, ne remplace pas une version plus récente
+                    cursor.execute('''
+                    INSERT INTO ResultatRapport (rapport, id_hotel, mois, version, lignes, duree_ms)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (rapport, id_hotel, mois) DO UPDATE SET
+                        version = excluded.version, lignes = excluded.lignes, duree_ms = excluded.duree_ms,
+                        calcule_le = excluded.calcule_le
+                    WHERE excluded.version >= ResultatRapport.version
+                    ''', (tache.rapport, id_hotel, mois, version, json.dumps(lignes), duree_ms))
+        except Exception as e:
+            tache.erreur = tache.erreur or f"{type(e).__name__}: {e}"
+        with self._verrou:
+            tache.terminees += 1
+            fin = tache.terminees == tache.total
+        if fin:
+            self._terminer(tache, cle)
+
+    def _terminer(self, tache, cle):
+        with self._verrou:
+            if self._en_cours.get(cle) == tache.id_tache:
+                del self._en_cours[cle]
+        tache.duree = time.perf_counter() - tache.debut
+        tache.finie.set()
+
+    def tache(self, id_tache):
+        """Tâche d'après son identifiant (None si inconnue, par exemple après un redémarrage)"""
+        return self._taches.get(id_tache)
+
+    def attendre(self, id_tache, delai=None):
+        """Attend la fin d'une tâche ; retourne True si elle est terminée"""
+        return self._taches[id_tache].finie.wait(delai)
+
+    def resultat(self, id_tache):
+        """Colonnes et lignes d'une tâche terminée, par mois puis hôtel
+
+        Chaque partie est lue dans sa dernière version : celle de la tâche ou,
+        si une tâche plus récente l'a recalculée entre-temps, une plus récente.
+        """
+        tache = self._taches[id_tache]
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                f"SELECT id_hotel, mois, version, lignes FROM ResultatRapport WHERE rapport = ? "
+                f"AND mois BETWEEN ? AND ? AND id_hotel IN ({', '.join('?' * len(tache.hotels))})",
+                (tache.rapport, tache.mois[0], tache.mois[-1], *tache.hotels))
+            parties = {(mois, id_hotel): json.loads(lignes) for id_hotel, mois, version, lignes in cursor
+                       if version >= tache.versions[mois]}
+        lignes = [tuple(ligne) for cle in sorted(parties) for ligne in parties[cle]]
+        return RAPPORTS[tache.rapport].colonnes, lignes
+
+    def fermer(self):
+        """Arrête les processus de calcul (les parties non commencées sont abandonnées)"""
+        with self._verrou:
+            executeur, self._executeur = self._executeur, None
+        if executeur is not None:
+            executeur.shutdown(cancel_futures=True)
+
+
+def en_csv(colonnes, lignes):
+    """Contenu d'un fichier CSV (octets UTF-8) avec ligne d'en-tête"""
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    ecrivain.writerow(colonnes)
+    ecrivain.writerows(lignes)
+    return tampon.getvalue().encode('utf-8')
+
+
+def en_parquet(colonnes, lignes):
+    """Contenu d'un fichier Parquet (octets) ; nécessite pyarrow, chargé seulement ici"""
+    import pyarrow
+    import pyarrow.parquet
+    tampon = io.BytesIO()
+    table = pyarrow.table({colonne: [ligne[i] for ligne in lignes] for i, colonne in enumerate(colonnes)})
+    pyarrow.parquet.write_table(table, tampon)
+    return tampon.getvalue()
+
+
+def main():
+    from db import ConnectionPool
+    from migrations import migrer
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rapport", choices=sorted(RAPPORTS))
+    parser.add_argument("--debut", required=True, help="premier mois (AAAA-MM)")
+    parser.add_argument("--mois", type=int, default=12, help="nombre de mois")
+    parser.add_argument("--hotel", type=int, action="append", help="hôtel (tous par défaut ; répétable)")
+    parser.add_argument("--processus", type=int, default=NB_PROCESSUS)
+    parser.add_argument("--forcer", action="store_true", help="recalculer même les parties en cache")
+    parser.add_argument("--sortie", help="fichier .csv ou .parquet (résumé seulement sinon)")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = configure_connection(sqlite3.connect(args.db))
+    migrer(conn)
+    conn.close()
+    pool = ConnectionPool(args.db)
+    moteur = MoteurRapports(pool, args.processus)
+    try:
+        id_tache = moteur.soumettre(args.rapport, args.debut, args.mois, args.hotel, args.forcer)
+        tache = moteur.tache(id_tache)
+        while not moteur.attendre(id_tache, 1.0):
+            print(f"  {tache.terminees}/{tache.total} parties")
+        if tache.erreur:
+            raise SystemExit(f"Échec du rapport : {tache.erreur}")
+        colonnes, lignes = moteur.resultat(id_tache)
+        print(f"{RAPPORTS[args.rapport].titre} : {len(lignes)} lignes, {tache.total} parties dont "
+              f"{tache.en_cache} en cache, en {tache.duree:.2f}s ({args.processus} processus)")
+        if args.sortie:
+            contenu = en_parquet(colonnes, lignes) if args.sortie.endswith('.parquet') else en_csv(colonnes, lignes)
+            with open(args.sortie, 'wb') as fichier:
+                fichier.write(contenu)
+    finally:
+        moteur.fermer()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""Couche d'accès aux données : dépôts par entité et objets ligne typés
+
+Les méthodes de lecture sont mises en cache avec st.cache_data, la clé
+comprenant les paramètres et un numéro de version par section de données.
+Les méthodes d'écriture incrémentent ce numéro : un rerun qui ne modifie
+rien ne touche pas SQLite, et toute écriture rend les lectures concernées
+obsolètes pour toutes les sessions du processus. Les écritures des autres
+processus (API, import en masse, archivage) sont détectées à chaque rerun par
+la séquence du journal des modifications (synchroniser_versions).
+"""
+import functools
+import threading
+
+import streamlit as st
+
+import booking
+import metrics
+from archive import attacher_archive, clients_avec_archives, nb_reservations_archivees, sejours_client
+from availability import bloc_chambres_libres, chambres_disponibles, format_date
+from replication import sequences_par_section
+from search import rechercher_clients
+
+# planning et pricing (NumPy) sont importés dans les méthodes qui s'en servent : seules les pages
+# Planning et de réservation les chargent
+
+# Filet de sécurité : les écritures externes sont normalement vues au rerun suivant (synchroniser_versions)
+TTL_CACHE_SECONDES = 60
+
+_versions = {'reservations': 0, 'clients': 0, 'chambres': 0}
+# Dernière séquence du journal vue pour chaque section (None : à relire sans invalider)
+_sequences = dict.fromkeys(_versions)
+_versions_lock = threading.Lock()
+
+
+def version(section):
+    """Retourne le numéro de version courant d'une section de données"""
+    with _versions_lock:
+        return _versions[section]
+
+
+def marquer_modifie(*sections):
+    """Signale une écriture : les lectures en cache de ces sections sont invalidées"""
+    with _versions_lock:
+        for section in sections:
+            _versions[section] += 1
+            # La séquence a avancé avec cette écriture, déjà prise en compte
+            _sequences[section] = None
+    metrics.invalider(*sections)
+
+
+def synchroniser_versions(pool):
+    """Invalide les sections modifiées par un autre processus depuis le dernier appel (une requête indexée)"""
+    conn = pool.acquire()
+    try:
+        sequences = sequences_par_section(conn.cursor())
+    finally:
+        conn.close()
+    with _versions_lock:
+        modifiees = [section for section, seq in sequences.items()
+                     if _sequences[section] is not None and _sequences[section] != seq]
+        for section in modifiees:
+            _versions[section] += 1
+        _sequences.update(sequences)
+    if modifiees:
+        metrics.invalider(*modifiees)
+
+
+def lecture_cachee(*sections):
+    """Décore une méthode de lecture d'un dépôt pour la mettre en cache selon les versions des sections"""
+    def decorateur(methode):
+        @st.cache_data(ttl=TTL_CACHE_SECONDES, max_entries=512, show_spinner=False)
+        def executer(_depot, nom, chemin, versions, *args, **kwargs):
+            return methode(_depot, *args, **kwargs)
+
+        @functools.wraps(methode)
+        def enveloppe(self, *args, **kwargs):
+            versions = tuple(version(s) for s in sections)
+            return executer(self, methode.__qualname__, self.pool.path, versions, *args, **kwargs)
+
+        enveloppe.sans_cache = methode
+        return enveloppe
+    return decorateur
+
+
+class Ligne:
+    """Base des objets ligne : attributs fixes déclarés dans __slots__, construits depuis un tuple SQLite"""
+
+    __slots__ = ()
+
+    def __init__(self, *valeurs):
+        for nom, valeur in zip(self.__slots__, valeurs):
+            setattr(self, nom, valeur)
+
+    @classmethod
+    def depuis_lignes(cls, lignes):
+        return [cls(*ligne) for ligne in lignes]
+
+    def _valeurs(self):
+        return tuple(getattr(self, nom) for nom in self.__slots__)
+
+    def __eq__(self, autre):
+        return type(self) is type(autre) and self._valeurs() == autre._valeurs()
+
+    def __repr__(self):
+        champs = ", ".join(f"{nom}={getattr(self, nom)!r}" for nom in self.__slots__)
+        return f"{type(self).__name__}({champs})"
+
+
+class Hotel(Ligne):
+    __slots__ = ('id_hotel', 'ville', 'pays', 'code_postal')
+    id_hotel: int
+    ville: str
+    pays: str
+    code_postal: int
+
+
+class Client(Ligne):
+    __slots__ = ('id_client', 'nom', 'adresse', 'ville', 'code_postal', 'email', 'telephone')
+    id_client: int
+    nom: str
+    adresse: str
+    ville: str
+    code_postal: int
+    email: str
+    telephone: str
+
+
+class Chambre(Ligne):
+    __slots__ = ('id_chambre', 'numero')
+    id_chambre: int
+    numero: int
+
+
+class TypeChambre(Ligne):
+    __slots__ = ('id_type', 'libelle', 'prix_base')
+    id_type: int
+    libelle: str
+    prix_base: float
+
+
+class ChambreDisponible(Ligne):
+    __slots__ = ('id_chambre', 'numero', 'etage', 'ville', 'libelle', 'prix_base', 'id_hotel', 'id_type')
+    id_chambre: int
+    numero: int
+    etage: int
+    ville: str
+    libelle: str
+    prix_base: float
+    id_hotel: int
+    id_type: int
+
+
+class ReservationLigne(Ligne):
+    __slots__ = ('id_reservation', 'date_debut', 'date_fin', 'nom_client', 'chambres', 'villes', 'arrivee')
+    id_reservation: int
+    date_debut: str
+    date_fin: str
+    nom_client: str
+    chambres: str
+    villes: str
+    arrivee: str
+
+
+class OccupationHotel(Ligne):
+    __slots__ = ('id_hotel', 'ville', 'nb_chambres', 'nuits_occupees', 'taux', 'revenu')
+    id_hotel: int
+    ville: str
+    nb_chambres: int
+    nuits_occupees: int
+    taux: float
+    revenu: float
+
+
+class Mouvement(Ligne):
+    __slots__ = ('id_reservation', 'date', 'nom_client')
+    id_reservation: int
+    date: str
+    nom_client: str
+
+
+class SejourHistorique(Ligne):
+    __slots__ = ('id_reservation', 'date_debut', 'date_fin', 'chambres', 'villes', 'archivee')
+    id_reservation: int
+    date_debut: str
+    date_fin: str
+    chambres: str
+    villes: str
+    archivee: int
+
+
+class Depot:
+    """Base des dépôts : accès au pool de connexions"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+
+class HotelRepository(Depot):
+
+    @lecture_cachee('chambres')
+    def lister(self):
+        """Retourne tous les hôtels triés par ville"""
+        with self.pool.connection() as conn:
+            lignes = conn.execute("SELECT id_hotel, ville, pays, code_postal FROM Hotel ORDER BY ville").fetchall()
+        return Hotel.depuis_lignes(lignes)
+
+
+class ChambreRepository(Depot):
+
+    @lecture_cachee('chambres')
+    def lister(self):
+        """Retourne toutes les chambres (identifiant et numéro)"""
+        with self.pool.connection() as conn:
+            lignes = conn.execute("SELECT id_chambre, numero FROM Chambre").fetchall()
+        return Chambre.depuis_lignes(lignes)
+
+    @lecture_cachee('reservations', 'chambres')
+    def disponibles(self, date_debut, date_fin):
+        """Retourne les chambres libres sur toutes les nuits de [date_debut, date_fin)"""
+        with self.pool.connection() as conn:
+            lignes = chambres_disponibles(conn.cursor(), date_debut, date_fin)
+        return ChambreDisponible.depuis_lignes(lignes)
+
+    @lecture_cachee('chambres')
+    def types(self):
+        """Retourne les types de chambre"""
+        with self.pool.connection() as conn:
+            lignes = conn.execute("SELECT id_type, libelle, prix_base FROM TypeChambre ORDER BY prix_base").fetchall()
+        return TypeChambre.depuis_lignes(lignes)
+
+    @lecture_cachee('reservations', 'chambres')
+    def nb_libres(self, id_hotel, id_type, date_debut, date_fin):
+        """Nombre de chambres d'un type libres dans un hôtel sur [date_debut, date_fin)"""
+        with self.pool.connection() as conn:
+            return len(bloc_chambres_libres(conn.cursor(), id_hotel, id_type, date_debut, date_fin))
+
+
+class TarifRepository(Depot):
+    """Tarifs dynamiques (module pricing), recalculés après chaque réservation"""
+
+    @lecture_cachee('reservations', 'chambres')
+    def grille(self, date_debut, date_fin):
+        """Retourne la grille de tarifs (GrilleTarifs) de toutes les combinaisons (hôtel, type) sur [date_debut, date_fin)"""
+        from pricing import calculer_grille
+        with self.pool.connection() as conn:
+            return calculer_grille(conn.cursor(), date_debut, date_fin)
+
+    def grille_sejour(self, date_debut, date_fin):
+        """Retourne la grille couvrant un séjour : la grille standard partagée s'il tombe dans l'horizon"""
+        from pricing import fenetre
+        return self.grille(*fenetre(date_debut, date_fin))
+
+
+class ClientRepository(Depot):
+
+    @lecture_cachee('clients')
+    def lister(self, limite=None):
+        """Retourne les clients triés par nom (les `limite` premiers si précisé)"""
+        with self.pool.connection() as conn:
+            lignes = conn.execute('''
+            SELECT id_client, nom, adresse, ville, code_postal, email, telephone
+            FROM Client
+            ORDER BY nom
+            LIMIT ?
+            ''', (-1 if limite is None else limite,)).fetchall()
+        return Client.depuis_lignes(lignes)
+
+    @lecture_cachee('clients')
+    def rechercher(self, texte, limite=20):
+        """Retourne les clients dont le nom, l'email, le téléphone ou la ville commence par les mots saisis"""
+        with self.pool.connection() as conn:
+            lignes = rechercher_clients(conn.cursor(), texte, limite)
+        return Client.depuis_lignes(lignes)
+
+    def creer(self, nom, adresse, ville, code_postal, email, telephone):
+        """Ajoute un client et retourne son identifiant"""
+        with self.pool.connection() as conn:
+            id_client = booking.creer_client(conn, nom, adresse, ville, code_postal, email, telephone)
+        marquer_modifie('clients')
+        return id_client
+
+    def supprimer(self, id_client):
+        """Supprime un client (IntegrityError s'il a des réservations)"""
+        self.supprimer_plusieurs([id_client])
+
+    def supprimer_plusieurs(self, ids, cascade=False):
+        """Supprime des clients, avec leurs réservations si cascade ; retourne (clients, réservations) supprimés"""
+        with self.pool.connection() as conn:
+            supprimes = booking.supprimer_clients(conn, ids, cascade)
+        marquer_modifie('clients')
+        if cascade:
+            marquer_modifie('reservations')
+        return supprimes
+
+
+class HistoriqueRepository(Depot):
+    """Historique complet (réservations courantes et archivées) par la base d'archive attachée
+
+    Le pool doit être réservé à ces lectures : une connexion où l'archive est
+    attachée verrouille aussi l'archive à chaque écriture.
+    """
+
+    @lecture_cachee('reservations')
+    def sejours_client(self, id_client):
+        """Retourne tous les séjours d'un client, archivés compris, du plus récent au plus ancien"""
+        with self.pool.connection() as conn:
+            lignes = sejours_client(attacher_archive(conn).cursor(), id_client)
+        return SejourHistorique.depuis_lignes(lignes)
+
+    def nb_archivees(self, id_client):
+        """Nombre de réservations archivées d'un client"""
+        with self.pool.connection() as conn:
+            return nb_reservations_archivees(attacher_archive(conn).cursor(), id_client)
+
+    def clients_avec_archives(self, ids):
+        """Parmi `ids`, clients qui ont des réservations archivées"""
+        with self.pool.connection() as conn:
+            return clients_avec_archives(attacher_archive(conn).cursor(), ids)
+
+
+class StatistiquesRepository(Depot):
+    """Agrégats du tableau de bord (mis en cache et invalidés par le module metrics)"""
+
+    def totaux(self):
+        """Retourne (réservations, clients, chambres)"""
+        with self.pool.connection() as conn:
+            return metrics.totaux(conn.cursor())
+
+    def occupation_par_hotel(self, date_debut, date_fin):
+        with self.pool.connection() as conn:
+            return OccupationHotel.depuis_lignes(metrics.occupation_par_hotel(conn.cursor(), date_debut, date_fin))
+
+    def occupation_par_nuit(self, date_debut, date_fin):
+        """Retourne {ville: {nuit: taux}}"""
+        with self.pool.connection() as conn:
+            return metrics.occupation_par_nuit(conn.cursor(), date_debut, date_fin)
+
+    def duree_moyenne_sejour(self, date_debut, date_fin):
+        with self.pool.connection() as conn:
+            return metrics.duree_moyenne_sejour(conn.cursor(), date_debut, date_fin)
+
+    @lecture_cachee('reservations', 'chambres')
+    def planning(self, id_hotel, date_debut, date_fin):
+        """Retourne la grille d'occupation (Planning) d'un hôtel sur [date_debut, date_fin)"""
+        from planning import construire_planning
+        with self.pool.connection() as conn:
+            return construire_planning(conn.cursor(), id_hotel, date_debut, date_fin)
+
+    def mouvements(self, jour_debut, jour_fin):
+        """Retourne (arrivées, départs) sous forme de listes de Mouvement"""
+        with self.pool.connection() as conn:
+            arrivees, departs = metrics.mouvements(conn.cursor(), jour_debut, jour_fin)
+        return Mouvement.depuis_lignes(arrivees), Mouvement.depuis_lignes(departs)
+
+
+class ReservationRepository(Depot):
+
+    @lecture_cachee('reservations', 'clients', 'chambres')
+    def page(self, taille_page, apres=None, date_min=None, date_max=None, id_hotel=None, nom_client=None):
+        """Retourne une page de réservations triées par date d'arrivée décroissante
+
+        La pagination se fait par clé (seek) : `apres` est le couple
+        (date_debut, id_reservation) de la dernière ligne de la page précédente,
+        ce qui évite les OFFSET dont le coût croît avec le numéro de page.
+        """
+        with self.pool.connection() as conn:
+            lignes = lister_reservations(conn.cursor(), taille_page, apres, date_min, date_max,
+                                         id_hotel, nom_client)
+        return ReservationLigne.depuis_lignes(lignes)
+
+    def creer(self, id_client, date_debut, date_fin, chambres):
+        """Crée une réservation (ChambreIndisponible si une chambre est prise) et retourne son identifiant"""
+        with self.pool.connection() as conn:
+            id_reservation = booking.creer_reservation(conn, id_client, date_debut, date_fin, chambres)
+        marquer_modifie('reservations')
+        return id_reservation
+
+    def creer_groupe(self, id_client, id_hotel, id_type, nb_chambres, date_debut, date_fin):
+        """Réserve un bloc de chambres d'un type et retourne (id_reservation, chambres)"""
+        with self.pool.connection() as conn:
+            resultat = booking.reserver_groupe(conn, id_client, id_hotel, id_type, nb_chambres,
+                                               date_debut, date_fin)
+        marquer_modifie('reservations')
+        return resultat
+
+    @lecture_cachee('reservations', 'chambres')
+    def chambres(self, id_reservation):
+        """Retourne les chambres d'une réservation"""
+        with self.pool.connection() as conn:
+            lignes = conn.execute('''
+            SELECT CH.id_chambre, CH.numero
+            FROM ReservationChambre RC
+            JOIN Chambre CH ON RC.id_chambre = CH.id_chambre
+            WHERE RC.id_reservation = ?
+            ORDER BY CH.numero
+            ''', (id_reservation,)).fetchall()
+        return Chambre.depuis_lignes(lignes)
+
+    def modifier(self, id_reservation, date_debut, date_fin, chambres=None):
+        """Change les dates d'une réservation (et ses chambres si `chambres` est précisé)"""
+        with self.pool.connection() as conn:
+            booking.modifier_reservation(conn, id_reservation, date_debut, date_fin, chambres)
+        marquer_modifie('reservations')
+
+    def ajouter_chambre(self, id_reservation, id_chambre):
+        """Ajoute une chambre à une réservation"""
+        with self.pool.connection() as conn:
+            booking.ajouter_chambre(conn, id_reservation, id_chambre)
+        marquer_modifie('reservations')
+
+    def retirer_chambre(self, id_reservation, id_chambre):
+        """Retire une chambre d'une réservation"""
+        with self.pool.connection() as conn:
+            booking.retirer_chambre(conn, id_reservation, id_chambre)
+        marquer_modifie('reservations')
+
+    def pointer_arrivee(self, id_reservation, statut):
+        """Pointe l'arrivée ('arrive') ou l'absence ('no_show') du client"""
+        with self.pool.connection() as conn:
+            booking.pointer_arrivee(conn, id_reservation, statut)
+        marquer_modifie('reservations')
+
+    def supprimer(self, id_reservation):
+        """Supprime une réservation et ses liens chambre"""
+        with self.pool.connection() as conn:
+            booking.supprimer_reservation(conn, id_reservation)
+        marquer_modifie('reservations')
+
+    def supprimer_plusieurs(self, ids):
+        """Supprime des réservations en une transaction ; retourne le nombre supprimé"""
+        with self.pool.connection() as conn:
+            nombre = booking.supprimer_reservations(conn, ids)
+        marquer_modifie('reservations')
+        return nombre
+
+
+def lister_reservations(cursor, taille_page, apres=None, date_min=None, date_max=None,
+                        id_hotel=None, nom_client=None):
+    """Requête d'une page de réservations ; chaque ligne contient
+    (id_reservation, date_debut, date_fin, nom du client, numéros des chambres, villes des hôtels,
+    statut d'arrivée ou None)
+    """
+    conditions = ["EXISTS (SELECT 1 FROM ReservationChambre RC WHERE RC.id_reservation = R.id_reservation)"]
+    params = []
+    if apres is not None:
+        conditions.append("(R.date_debut, R.id_reservation) < (?, ?)")
+        params.extend(apres)
+    if date_min is not None:
+        conditions.append("R.date_fin >= ?")
+        params.append(format_date(date_min))
+    if date_max is not None:
+        conditions.append("R.date_debut <= ?")
+        params.append(format_date(date_max))
+    if id_hotel is not None:
+        conditions.append('''EXISTS (
+            SELECT 1 FROM ReservationChambre RC
+            JOIN Chambre CH ON RC.id_chambre = CH.id_chambre
+            WHERE RC.id_reservation = R.id_reservation AND CH.id_hotel = ?
+        )''')
+        params.append(id_hotel)
+    if nom_client:
+        conditions.append("C.nom LIKE ?")
+        params.append(f"%{nom_client}%")
+    params.append(taille_page)
+
+    cursor.execute(f'''
+    WITH page AS (
+        SELECT R.id_reservation, R.date_debut, R.date_fin, C.nom
+        FROM Reservation R
+        JOIN Client C ON R.id_client = C.id_client
+        WHERE {" AND ".join(conditions)}
+        ORDER BY R.date_debut DESC, R.id_reservation DESC
+        LIMIT ?
+    )
+    SELECT P.id_reservation, P.date_debut, P.date_fin, P.nom,
+           GROUP_CONCAT(CH.numero, ', '), GROUP_CONCAT(DISTINCT H.ville),
+           (SELECT A.statut FROM Arrivee A WHERE A.id_reservation = P.id_reservation)
+    FROM page P
+    JOIN ReservationChambre RC ON P.id_reservation = RC.id_reservation
+    JOIN Chambre CH ON RC.id_chambre = CH.id_chambre
+    JOIN Hotel H ON CH.id_hotel = H.id_hotel
+    GROUP BY P.id_reservation
+    ORDER BY P.date_debut DESC, P.id_reservation DESC
+    ''', params)
+    return cursor.fetchall()
@@ -0,0 +1,107 @@
+"""Recherche plein texte des clients (FTS5)
+
+ClientRecherche est une table FTS5 à contenu externe : elle n'indexe que les
+colonnes nom, email, telephone et ville de Client, tenue à jour par triggers.
+Le tokenizer unicode61 sans diacritiques rend la recherche insensible à la
+casse et aux accents ; chaque mot saisi est cherché comme préfixe.
+
+Toutes les correspondances sont classées dans SQLite par bm25(), avant la
+limite : le meilleur client est trouvé même parmi des milliers de
+correspondances d'un préfixe courant. Chaque mot est cherché à la fois comme
+préfixe et comme mot complet : un mot complet compte double, et chaque
+colonne est pondérée (_POIDS). Le classement parcourt toute la liste des
+documents de chaque préfixe, quelques dizaines de millisecondes pour un
+préfixe de deux lettres sur 500 000 clients.
+"""
+import re
+
+TRIGGERS_RECHERCHE = (
+    'trg_recherche_client_insert',
+    'trg_recherche_client_delete',
+    'trg_recherche_client_update',
+)
+LIMITE_RESULTATS = 20
+
+# Poids des colonnes dans le classement (ordre des colonnes de ClientRecherche) : le nom compte le plus
+_POIDS = {'nom': 10, 'email': 4, 'telephone': 4, 'ville': 1}
+
+
+def init_recherche(cursor):
+    """Crée l'index plein texte des clients et ses triggers, puis l'alimente (idempotent)"""
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS ClientRecherche USING fts5(
+        nom, email, telephone, ville,
+        content='Client', content_rowid='id_client',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    ''')
+
+    for nom in TRIGGERS_RECHERCHE:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    cursor.execute('''
+    CREATE TRIGGER trg_recherche_client_insert
+    AFTER INSERT ON Client
+    BEGIN
+        INSERT INTO ClientRecherche (rowid, nom, email, telephone, ville)
+        VALUES (NEW.id_client, NEW.nom, NEW.email, NEW.telephone, NEW.ville);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_recherche_client_delete
+    AFTER DELETE ON Client
+    BEGIN
+        INSERT INTO ClientRecherche (ClientRecherche, rowid, nom, email, telephone, ville)
+        VALUES ('delete', OLD.id_client, OLD.nom, OLD.email, OLD.telephone, OLD.ville);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER trg_recherche_client_update
+    AFTER UPDATE OF id_client, nom, email, telephone, ville ON Client
+    BEGIN
+        INSERT INTO ClientRecherche (ClientRecherche, rowid, nom, email, telephone, ville)
+        VALUES ('delete', OLD.id_client, OLD.nom, OLD.email, OLD.telephone, OLD.ville);
+        INSERT INTO ClientRecherche (rowid, nom, email, telephone, ville)
+        VALUES (NEW.id_client, NEW.nom, NEW.email, NEW.telephone, NEW.ville);
+    END
+    ''')
+
+    # Reconstruit l'index à partir de la table Client (clients existants)
+    cursor.execute("INSERT INTO ClientRecherche (ClientRecherche) VALUES ('rebuild')")
+
+
+def requete_fts(texte):
+    """Traduit une saisie libre en requête FTS5 : chaque mot devient un préfixe obligatoire
+
+    Le mot complet est ajouté en alternative : il ne change pas les
+    correspondances mais augmente le score bm25 des clients qui le contiennent.
+    Retourne None si la saisie ne contient aucun mot (ponctuation seule).
+    """
+    mots = re.findall(r'\w+', texte)
+    if not mots:
+        return None
+    return ' AND '.join(f'("{mot}"* OR "{mot}")' for mot in mots)
+
+
+def rechercher_clients(cursor, texte, limite=LIMITE_RESULTATS):
+    """Retourne les clients correspondant à la saisie, les plus pertinents d'abord
+
+    Chaque ligne contient (id_client, nom, adresse, ville, code_postal, email, telephone).
+    """
+    requete = requete_fts(texte)
+    if requete is None:
+        return []
+    # bm25() est négatif : plus il est petit, plus le client est pertinent
+    cursor.execute(f'''
+    SELECT C.id_client, C.nom, C.adresse, C.ville, C.code_postal, C.email, C.telephone
+    FROM (
+        SELECT rowid AS id_client, bm25(ClientRecherche, {', '.join(map(str, _POIDS.values()))}) AS rang
+        FROM ClientRecherche
+        WHERE ClientRecherche MATCH ?
+        ORDER BY rang
+        LIMIT ?
+    ) F
+    JOIN Client C ON C.id_client = F.id_client
+    ORDER BY F.rang, C.nom, C.id_client
+    ''', (requete, limite))
+    return cursor.fetchall()
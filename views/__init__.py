@@ -0,0 +1 @@
+"""Pages de l'application Streamlit (chargées à la première visite par st.navigation)"""
@@ -0,0 +1,92 @@
+"""Page Gestion des Clients : recherche, historique des séjours et suppression"""
+import streamlit as st
+import sqlite3
+
+from repository import ClientRepository, HistoriqueRepository
+from views.common import get_pool, get_pool_historique
+
+TAILLE_LISTE_CLIENTS = 25
+
+clients_repo = ClientRepository(get_pool())
+historique_repo = HistoriqueRepository(get_pool_historique())
+
+st.header("Gestion des Clients")
+
+# Recherche indexée ; sans saisie, seuls les premiers clients par ordre alphabétique sont affichés
+recherche = st.text_input("Rechercher un client", placeholder="Nom, email, téléphone ou ville",
+                          key="recherche_clients").strip()
+if recherche:
+    clients = clients_repo.rechercher(recherche, limite=TAILLE_LISTE_CLIENTS)
+else:
+    clients = clients_repo.lister(limite=TAILLE_LISTE_CLIENTS)
+
+if clients:
+    st.subheader("Résultats de la recherche" if recherche else "Liste des Clients")
+    if len(clients) == TAILLE_LISTE_CLIENTS:
+        st.caption(f"{TAILLE_LISTE_CLIENTS} premiers clients affichés : précisez la recherche pour les autres")
+    for client in clients:
+        with st.expander(f"{client.nom} ({client.email})"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Nom:** {client.nom}")
+                st.write(f"**Adresse:** {client.adresse}")
+                st.write(f"**Ville:** {client.ville} ({client.code_postal})")
+            with col2:
+                st.write(f"**Email:** {client.email}")
+                st.write(f"**Téléphone:** {client.telephone}")
+
+            if st.checkbox("Historique des séjours", key=f"historique_client_{client.id_client}"):
+                sejours = historique_repo.sejours_client(client.id_client)
+                if sejours:
+                    st.dataframe(
+                        [
+                            {
+                                "Réservation": s.id_reservation,
+                                "Arrivée": s.date_debut,
+                                "Départ": s.date_fin,
+                                "Chambres": s.chambres,
+                                "Hôtels": s.villes,
+                                "Archivée": bool(s.archivee),
+                            }
+                            for s in sejours
+                        ],
+                        hide_index=True
+                    )
+                else:
+                    st.info("Aucun séjour")
+
+            # Boutons d'action
+            col_edit, col_delete = st.columns(2)
+            with col_delete:
+                if st.button(f"Supprimer", key=f"delete_client_{client.id_client}"):
+                    try:
+                        if historique_repo.nb_archivees(client.id_client):
+                            raise sqlite3.IntegrityError("Réservations archivées")
+                        clients_repo.supprimer(client.id_client)
+                        st.success("Client supprimé!")
+                        st.rerun()  # Changé de st.experimental_rerun() à st.rerun()
+                    except sqlite3.IntegrityError:
+                        st.error("Impossible de supprimer : client a des réservations associées")
+
+    # Suppression groupée parmi les clients affichés, en une seule transaction
+    with st.expander("Supprimer plusieurs clients"):
+        noms = {c.id_client: f"{c.nom} ({c.email})" for c in clients}
+        selection = st.multiselect("Clients à supprimer", list(noms.keys()), format_func=noms.get,
+                                   key="selection_suppression_clients")
+        cascade = st.checkbox("Supprimer aussi leurs réservations", key="suppression_cascade")
+        if st.button("Supprimer la sélection", disabled=not selection, key="supprimer_selection_clients"):
+            archives = historique_repo.clients_avec_archives(selection)
+            if archives:
+                st.error("Impossible de supprimer des clients qui ont des réservations archivées : "
+                         + ", ".join(noms[id_client] for id_client in sorted(archives)))
+            else:
+                try:
+                    nb_clients, nb_reservations = clients_repo.supprimer_plusieurs(selection, cascade)
+                    st.session_state.pop("selection_suppression_clients", None)
+                    st.success(f"{nb_clients} client(s) et {nb_reservations} réservation(s) supprimé(s)")
+                    st.rerun()
+                except sqlite3.IntegrityError:
+                    st.error("Impossible de supprimer : au moins un client a des réservations associées "
+                             "(cochez « Supprimer aussi leurs réservations »)")
+else:
+    st.info("Aucun client trouvé")
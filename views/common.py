@@ -0,0 +1,94 @@
+"""Ressources partagées par les pages : pool de connexions, mise à jour du schéma et sélecteur de client
+
+Les ressources sont créées une seule fois par processus (st.cache_resource),
+quelle que soit la page visitée en premier.
+"""
+import streamlit as st
+import sqlite3
+
+from db import DB_PATH, ConnectionPool
+import migrations
+import profiling
+from reports import MoteurRapports
+
+@st.cache_resource
+def init_database():
+    """Met le schéma à jour (une fois par processus) et remplit une base neuve avec des données d'exemple"""
+    conn = get_connection()
+    try:
+        if migrations.version_base(conn) < migrations.VERSION_SCHEMA:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            nouvelle_base = not cursor.fetchall()
+            migrations.migrer(conn)
+            if nouvelle_base:
+                insert_sample_data(cursor)
+                conn.commit()
+    finally:
+        conn.close()
+
+def insert_sample_data(cursor):
+    """Insère des données d'exemple"""
+    try:
+        # Hôtels
+        cursor.execute("INSERT OR IGNORE INTO Hotel VALUES (1, 'Paris', 'France', 75001)")
+        cursor.execute("INSERT OR IGNORE INTO Hotel VALUES (2, 'Lyon', 'France', 69002)")
+        
+        # Types de chambres
+        cursor.execute("INSERT OR IGNORE INTO TypeChambre VALUES (1, 'Simple', 80)")
+        cursor.execute("INSERT OR IGNORE INTO TypeChambre VALUES (2, 'Double', 120)")
+        
+        # Clients
+        cursor.execute("INSERT OR IGNORE INTO Client VALUES (1, 'Jean Dupont', '12 Rue de Paris', 'Paris', 75001, 'jean@email.fr', '0612345678')")
+        cursor.execute("INSERT OR IGNORE INTO Client VALUES (2, 'Marie Leroy', '5 Avenue Victor Hugo', 'Lyon', 69002, 'marie@email.fr', '0623456789')")
+        cursor.execute("INSERT OR IGNORE INTO Client VALUES (3, 'mohamed', '8 Boulevard Saint-Michel', 'Marseille', 13005, 'mohamed@email.fr', '0634567890')")
+        
+        # Chambres
+        cursor.execute("INSERT OR IGNORE INTO Chambre VALUES (1, 201, 2, 0, 1, 1)")
+        cursor.execute("INSERT OR IGNORE INTO Chambre VALUES (2, 502, 5, 1, 1, 2)")
+        cursor.execute("INSERT OR IGNORE INTO Chambre VALUES (3, 305, 3, 0, 2, 1)")
+        cursor.execute("INSERT OR IGNORE INTO Chambre VALUES (4, 410, 4, 0, 2, 2)")
+        
+        # Réservations
+        cursor.execute("INSERT OR IGNORE INTO Reservation VALUES (1, '2025-05-27', '2025-05-28', 3)")
+        cursor.execute("INSERT OR IGNORE INTO Reservation VALUES (2, '2025-07-01', '2025-07-05', 2)")
+        cursor.execute("INSERT OR IGNORE INTO Reservation VALUES (3, '2025-05-27', '2025-05-28', 3)")
+        
+        # Liens réservation-chambre
+        cursor.execute("INSERT OR IGNORE INTO ReservationChambre VALUES (1, 1)")
+        cursor.execute("INSERT OR IGNORE INTO ReservationChambre VALUES (2, 2)")
+        cursor.execute("INSERT OR IGNORE INTO ReservationChambre VALUES (3, 3)")
+        
+    except sqlite3.Error as e:
+        st.error(f"Erreur lors de l'insertion des données: {e}")
+
+@st.cache_resource
+def get_pool():
+    """Pool de connexions partagé par toutes les sessions du processus"""
+    return ConnectionPool(DB_PATH, factory=profiling.classe_connexion())
+
+@st.cache_resource
+def get_pool_historique():
+    """Pool distinct pour les lectures de l'historique : ses connexions attachent la base d'archive"""
+    return ConnectionPool(DB_PATH, max_idle=4, factory=profiling.classe_connexion())
+
+@st.cache_resource
+def get_moteur_rapports():
+    """Moteur de rapports partagé par toutes les sessions (processus de calcul créés à la première demande)"""
+    return MoteurRapports(get_pool())
+
+def get_connection():
+    """Retourne une connexion du pool (close() la remet dans le pool)"""
+    return get_pool().acquire()
+
+def choisir_client(clients_repo, cle):
+    """Sélecteur de client à saisie semi-automatique ; retourne l'id du client choisi (None sinon)"""
+    saisie = st.text_input("Rechercher un client", placeholder="Nom, email, téléphone ou ville", key=f"{cle}_saisie")
+    if not saisie.strip():
+        return None
+    clients = clients_repo.rechercher(saisie)
+    if not clients:
+        st.info("Aucun client ne correspond à la recherche")
+        return None
+    client_options = {f"{client.nom} - {client.email} (ID: {client.id_client})": client.id_client for client in clients}
+    return client_options[st.selectbox("Sélectionner un client", list(client_options.keys()), key=f"{cle}_choix")]
@@ -0,0 +1,75 @@
+"""Page Tableau de Bord : totaux, occupation et revenu d'une période, arrivées et départs à venir"""
+import streamlit as st
+from datetime import date, timedelta
+
+from repository import StatistiquesRepository
+from views.common import get_pool
+
+statistiques_repo = StatistiquesRepository(get_pool())
+
+st.header("Tableau de Bord")
+
+nb_reservations, nb_clients, nb_chambres = statistiques_repo.totaux()
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Total Réservations", nb_reservations)
+with col2:
+    st.metric("Total Clients", nb_clients)
+with col3:
+    st.metric("Total Chambres", nb_chambres)
+
+# Période analysée (nuits de la date de début incluse à la date de fin exclue)
+col_debut, col_fin = st.columns(2)
+with col_debut:
+    periode_debut = st.date_input("Début de période", value=date.today(), key="periode_debut")
+with col_fin:
+    periode_fin = st.date_input("Fin de période", value=date.today() + timedelta(days=30), key="periode_fin")
+
+if periode_debut < periode_fin:
+    occupation = statistiques_repo.occupation_par_hotel(periode_debut, periode_fin)
+    nuits_total = sum(h.nuits_occupees for h in occupation)
+    capacite_total = sum(h.nb_chambres for h in occupation) * (periode_fin - periode_debut).days
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Taux d'occupation", f"{(nuits_total / capacite_total if capacite_total else 0):.1%}")
+    with col2:
+        st.metric("Revenu", f"{sum(h.revenu for h in occupation):,.0f}€")
+    with col3:
+        st.metric("Durée moyenne de séjour",
+                  f"{statistiques_repo.duree_moyenne_sejour(periode_debut, periode_fin):.1f} nuit(s)")
+
+    st.subheader("Par hôtel")
+    st.dataframe(
+        [
+            {"Hôtel": h.ville, "Chambres": h.nb_chambres, "Nuits occupées": h.nuits_occupees,
+             "Taux d'occupation": f"{h.taux:.1%}", "Revenu (€)": round(h.revenu, 2)}
+            for h in occupation
+        ],
+        hide_index=True
+    )
+
+    par_nuit = statistiques_repo.occupation_par_nuit(periode_debut, periode_fin)
+    if par_nuit:
+        st.subheader("Occupation par nuit")
+        nuits = [(periode_debut + timedelta(days=i)).strftime('%Y-%m-%d')
+                 for i in range((periode_fin - periode_debut).days)]
+        st.line_chart({ville: [serie.get(n, 0.0) for n in nuits] for ville, serie in par_nuit.items()})
+else:
+    st.error("La fin de période doit être postérieure au début")
+
+# Arrivées et départs des 7 prochains jours
+arrivees, departs = statistiques_repo.mouvements(date.today(), date.today() + timedelta(days=7))
+col_arr, col_dep = st.columns(2)
+with col_arr:
+    st.subheader("Arrivées à venir")
+    for m in arrivees:
+        st.write(f"{m.date} - Réservation #{m.id_reservation} - {m.nom_client}")
+    if not arrivees:
+        st.info("Aucune arrivée prévue")
+with col_dep:
+    st.subheader("Départs à venir")
+    for m in departs:
+        st.write(f"{m.date} - Réservation #{m.id_reservation} - {m.nom_client}")
+    if not departs:
+        st.info("Aucun départ prévu")
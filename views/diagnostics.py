@@ -0,0 +1,60 @@
+"""Page Diagnostics (?diagnostics=1) : requêtes SQL et temps de rendu mesurés par le module profiling"""
+import streamlit as st
+
+import profiling
+
+st.header("Diagnostics")
+
+if not profiling.ACTIF:
+    st.info("Profilage désactivé : relancer l'application avec HOTEL_PROFILING=1 pour mesurer les requêtes")
+else:
+    donnees = profiling.instantane()
+    requetes = donnees['requetes']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Requêtes distinctes", len(requetes))
+    with col2:
+        st.metric("Exécutions", sum(r['appels'] for r in requetes))
+    with col3:
+        st.metric("Temps SQL cumulé", f"{sum(r['duree_totale_ms'] for r in requetes):,.1f} ms")
+
+    st.subheader("Requêtes")
+    st.dataframe(
+        [
+            {"Requête": r['sql'], "Appels": r['appels'], "Total (ms)": r['duree_totale_ms'],
+             "Moyenne (ms)": r['duree_moyenne_ms'], "Max (ms)": r['duree_max_ms'], "Lignes": r['lignes'],
+             "Scan complet": ", ".join(r['scans_complets']), "Plan": " | ".join(r['plan'] or [])}
+            for r in requetes
+        ],
+        hide_index=True
+    )
+
+    st.subheader("Temps de rendu par page")
+    st.dataframe(
+        [
+            {"Page": p['page'], "Rendus": p['rendus'], "Total (ms)": p['duree_totale_ms'],
+             "Moyenne (ms)": p['duree_moyenne_ms'], "Max (ms)": p['duree_max_ms']}
+            for p in donnees['pages']
+        ],
+        hide_index=True
+    )
+
+    st.subheader(f"Requêtes lentes (≥ {donnees['seuil_lent_ms']:g} ms)")
+    for lente in reversed(donnees['requetes_lentes']):
+        with st.expander(f"{lente['date']} - {lente['duree_ms']} ms"):
+            st.code(lente['sql'], language="sql")
+            st.write(f"**Paramètres:** {lente['parametres']}")
+    if not donnees['requetes_lentes']:
+        st.info("Aucune requête lente")
+
+    col_json, col_prom, col_reset = st.columns(3)
+    with col_json:
+        st.download_button("Exporter en JSON", profiling.exporter_json(),
+                           file_name="diagnostics.json", mime="application/json")
+    with col_prom:
+        st.download_button("Exporter (Prometheus)", profiling.exporter_prometheus(),
+                           file_name="diagnostics.prom", mime="text/plain")
+    with col_reset:
+        if st.button("Réinitialiser les mesures"):
+            profiling.reinitialiser()
+            st.rerun()
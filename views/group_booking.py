@@ -0,0 +1,58 @@
+"""Page Réservation de Groupe : bloc de chambres d'un même type dans un hôtel"""
+import streamlit as st
+from datetime import date, timedelta
+
+from booking import ChambreIndisponible
+from repository import (
+    ChambreRepository, ClientRepository, HotelRepository, ReservationRepository, TarifRepository,
+)
+from views.common import choisir_client, get_pool
+
+hotels_repo = HotelRepository(get_pool())
+chambres_repo = ChambreRepository(get_pool())
+clients_repo = ClientRepository(get_pool())
+reservations_repo = ReservationRepository(get_pool())
+tarifs_repo = TarifRepository(get_pool())
+
+st.header("Réservation de Groupe")
+
+client_id = choisir_client(clients_repo, "client_groupe")
+
+hotels = {f"{h.ville} (ID: {h.id_hotel})": h.id_hotel for h in hotels_repo.lister()}
+types = {f"{t.libelle} ({t.prix_base}€/nuit)": t.id_type for t in chambres_repo.types()}
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    id_hotel = hotels[st.selectbox("Hôtel", list(hotels.keys()), key="groupe_hotel")]
+with col2:
+    id_type = types[st.selectbox("Type de chambre", list(types.keys()), key="groupe_type")]
+with col3:
+    nb_chambres = st.number_input("Nombre de chambres", min_value=1, max_value=500, value=10, step=1)
+
+col1, col2 = st.columns(2)
+with col1:
+    date_debut = st.date_input("Date d'arrivée", value=date.today(), key="groupe_debut")
+with col2:
+    date_fin = st.date_input("Date de départ", value=date.today() + timedelta(days=1), key="groupe_fin")
+
+if date_debut < date_fin:
+    nb_libres = chambres_repo.nb_libres(id_hotel, id_type, date_debut, date_fin)
+    st.write(f"{nb_libres} chambre(s) de ce type disponible(s) sur la période")
+    prix = tarifs_repo.grille_sejour(date_debut, date_fin).prix_sejour(id_hotel, id_type, date_debut, date_fin)
+    if prix is not None:
+        st.write(f"Tarif actuel : {prix:.2f}€ par chambre pour le séjour, soit {prix * nb_chambres:.2f}€ pour le bloc")
+
+    if st.button("Réserver le bloc", disabled=client_id is None or nb_libres < nb_chambres):
+        try:
+            new_id, chambres = reservations_repo.creer_groupe(
+                client_id, id_hotel, id_type, nb_chambres, date_debut, date_fin
+            )
+            st.success(f"Réservation #{new_id} confirmée pour {len(chambres)} chambre(s)!")
+        except ChambreIndisponible as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Erreur lors de la création de la réservation: {str(e)}")
+    if client_id is None:
+        st.info("Recherchez puis sélectionnez le client qui réserve pour le groupe")
+else:
+    st.error("La date de départ doit être postérieure à la date d'arrivée")
@@ -0,0 +1,33 @@
+"""Page Nouveau Client : formulaire de création"""
+import streamlit as st
+import sqlite3
+
+from repository import ClientRepository
+from views.common import get_pool
+
+clients_repo = ClientRepository(get_pool())
+
+st.header("Ajouter un Nouveau Client")
+
+with st.form("nouveau_client"):
+    nom = st.text_input("Nom complet *", placeholder="Ex: Jean Dupont")
+    adresse = st.text_input("Adresse *", placeholder="Ex: 12 Rue de la Paix")
+    ville = st.text_input("Ville *", placeholder="Ex: Paris")
+    code_postal = st.number_input("Code postal *", min_value=0, step=1, format="%d")
+    email = st.text_input("Email *", placeholder="Ex: jean.dupont@email.fr")
+    telephone = st.text_input("Téléphone *", placeholder="Ex: 0612345678")
+
+    submitted = st.form_submit_button("Enregistrer le Client")
+
+    if submitted:
+        if nom and adresse and ville and code_postal and email and telephone:
+            try:
+                clients_repo.creer(nom, adresse, ville, code_postal, email, telephone)
+                st.success(f"Client {nom} ajouté avec succès!")
+
+            except sqlite3.IntegrityError:
+                st.error("Erreur: Un client avec cet email existe déjà")
+            except Exception as e:
+                st.error(f"Erreur: {str(e)}")
+        else:
+            st.error("Veuillez remplir tous les champs obligatoires (*)")
@@ -0,0 +1,58 @@
+"""Page Nouvelle Réservation : choix du client, des dates et d'une chambre libre"""
+import streamlit as st
+from datetime import date, timedelta
+
+from booking import ChambreIndisponible
+from repository import ChambreRepository, ClientRepository, ReservationRepository, TarifRepository
+from views.common import choisir_client, get_pool
+
+chambres_repo = ChambreRepository(get_pool())
+clients_repo = ClientRepository(get_pool())
+reservations_repo = ReservationRepository(get_pool())
+tarifs_repo = TarifRepository(get_pool())
+
+st.header("Nouvelle Réservation")
+
+if not clients_repo.lister(limite=1):
+    st.warning("Aucun client trouvé. Veuillez d'abord ajouter des clients.")
+else:
+    # Hors du formulaire pour que les résultats se mettent à jour à chaque saisie
+    client_id = choisir_client(clients_repo, "client_reservation")
+
+    with st.form("nouvelle_reservation"):
+        col1, col2 = st.columns(2)
+        with col1:
+            date_debut = st.date_input("Date d'arrivée", value=date.today())
+        with col2:
+            date_fin = st.date_input("Date de départ", value=date.today() + timedelta(days=1))
+
+        if date_debut < date_fin:
+            chambres_dispo = chambres_repo.disponibles(date_debut, date_fin)
+
+            if chambres_dispo:
+                grille = tarifs_repo.grille_sejour(date_debut, date_fin)
+                chambre_options = {
+                    f"Chambre {ch.numero} - {ch.ville} ({ch.libelle}) - "
+                    f"{grille.prix_sejour(ch.id_hotel, ch.id_type, date_debut, date_fin):.2f}€ le séjour": ch.id_chambre
+                    for ch in chambres_dispo
+                }
+                selected_chambre_display = st.selectbox("Sélectionner une chambre", list(chambre_options.keys()))
+                chambre_id = chambre_options[selected_chambre_display]
+
+                submitted = st.form_submit_button("Confirmer la Réservation")
+
+                if submitted and client_id is None:
+                    st.error("Veuillez d'abord rechercher et sélectionner un client")
+                elif submitted:
+                    try:
+                        new_id = reservations_repo.creer(client_id, date_debut, date_fin, [chambre_id])
+                        st.success(f"Réservation #{new_id} confirmée avec succès!")
+
+                    except ChambreIndisponible as e:
+                        st.error(f"{e}. Veuillez choisir une autre chambre.")
+                    except Exception as e:
+                        st.error(f"Erreur lors de la création de la réservation: {str(e)}")
+            else:
+                st.error("Aucune chambre disponible pour cette période")
+        else:
+            st.error("La date de départ doit être postérieure à la date d'arrivée")
@@ -0,0 +1,55 @@
+"""Page Planning : grille d'occupation chambres × nuits d'un hôtel"""
+import streamlit as st
+import time
+from datetime import date, timedelta
+
+from repository import HotelRepository, StatistiquesRepository
+from views.common import get_pool
+
+hotels_repo = HotelRepository(get_pool())
+statistiques_repo = StatistiquesRepository(get_pool())
+
+st.header("Planning d'Occupation")
+
+hotels = {f"{h.ville} (ID: {h.id_hotel})": h.id_hotel for h in hotels_repo.lister()}
+col1, col2, col3 = st.columns(3)
+with col1:
+    id_hotel = hotels[st.selectbox("Hôtel", list(hotels.keys()), key="planning_hotel")]
+with col2:
+    planning_debut = st.date_input("Première nuit", value=date.today(), key="planning_debut")
+with col3:
+    nb_nuits = st.slider("Nombre de nuits", min_value=7, max_value=365, value=90, key="planning_nuits")
+
+debut_calcul = time.perf_counter()
+planning = statistiques_repo.planning(id_hotel, planning_debut, planning_debut + timedelta(days=nb_nuits))
+duree_calcul = time.perf_counter() - debut_calcul
+
+if planning.chambres:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Taux d'occupation", f"{planning.taux_global():.1%}")
+    with col2:
+        st.metric("Chambres", len(planning.chambres))
+    with col3:
+        st.metric("Nuits", len(planning.nuits))
+
+    st.image(planning.image(), caption=(
+        f"Chambres {planning.chambres[0]} à {planning.chambres[-1]} (lignes) × nuits du "
+        f"{planning.nuits[0]} au {planning.nuits[-1]} (colonnes) — "
+        f"⬜ libre, 🟥 occupée, 🟧 nuit d'arrivée"
+    ))
+
+    st.subheader("Occupation par nuit")
+    st.bar_chart({"Taux d'occupation": dict(zip(map(str, planning.nuits), planning.taux_par_nuit()))})
+
+    st.subheader("Nuits occupées par chambre")
+    st.dataframe(
+        [
+            {"Chambre": numero, "Nuits occupées": int(nuits), "Taux": f"{nuits / len(planning.nuits):.0%}"}
+            for numero, nuits in zip(planning.chambres, planning.nuits_par_chambre())
+        ],
+        hide_index=True
+    )
+    st.caption(f"Grille obtenue en {duree_calcul * 1000:.0f} ms")
+else:
+    st.info("Aucune chambre dans cet hôtel")
@@ -0,0 +1,68 @@
+"""Page Rapports : rapports mensuels calculés en arrière-plan, résultats en cache et téléchargement"""
+import streamlit as st
+from datetime import date
+
+import reports
+from repository import HotelRepository
+from views.common import get_moteur_rapports, get_pool
+
+moteur = get_moteur_rapports()
+hotels_repo = HotelRepository(get_pool())
+
+st.header("Rapports")
+
+hotels = {f"{h.ville} (ID: {h.id_hotel})": h.id_hotel for h in hotels_repo.lister()}
+col1, col2, col3 = st.columns(3)
+with col1:
+    rapport = st.selectbox("Rapport", list(reports.RAPPORTS), format_func=lambda r: reports.RAPPORTS[r].titre,
+                           key="rapport_nom")
+with col2:
+    aujourd_hui = date.today()
+    premier_mois = st.date_input("Premier mois", value=date(aujourd_hui.year - 1, aujourd_hui.month, 1),
+                                 key="rapport_debut")
+with col3:
+    nb_mois = st.number_input("Nombre de mois", min_value=1, max_value=240, value=12, key="rapport_nb_mois")
+choix_hotels = st.multiselect("Hôtels (tous si aucun)", list(hotels.keys()), key="rapport_hotels")
+
+col1, col2 = st.columns(2)
+with col1:
+    lancer = st.button("Générer le rapport")
+with col2:
+    forcer = st.button("Recalculer", help="Ignore les résultats en cache (après un changement de tarif de base)")
+if lancer or forcer:
+    st.session_state.rapport_tache = moteur.soumettre(
+        rapport, premier_mois, int(nb_mois), [hotels[h] for h in choix_hotels], forcer=forcer
+    )
+
+@st.fragment(run_every=1)
+def suivre(id_tache):
+    """Barre de progression rafraîchie chaque seconde ; relance la page quand la tâche est terminée"""
+    tache = moteur.tache(id_tache)
+    if tache.termine:
+        st.rerun(scope="app")
+    st.progress(tache.progression(), text=f"{tache.terminees}/{tache.total} parties (hôtel × mois) calculées")
+
+tache = moteur.tache(st.session_state.get("rapport_tache"))
+if tache is None:
+    st.info("Choisissez un rapport puis lancez sa génération : le calcul se fait en arrière-plan")
+elif not tache.termine:
+    st.caption(f"{reports.RAPPORTS[tache.rapport].titre} de {tache.mois[0]} à {tache.mois[-1]}")
+    suivre(tache.id_tache)
+elif tache.erreur:
+    st.error(f"Échec du rapport : {tache.erreur}")
+else:
+    colonnes, lignes = moteur.resultat(tache.id_tache)
+    st.subheader(f"{reports.RAPPORTS[tache.rapport].titre} de {tache.mois[0]} à {tache.mois[-1]}")
+    st.caption(f"{tache.total} parties dont {tache.en_cache} lues en cache, en {tache.duree:.2f} s")
+    st.dataframe([dict(zip(colonnes, ligne)) for ligne in lignes], hide_index=True)
+
+    nom_fichier = f"{tache.rapport}_{tache.mois[0]}_{tache.mois[-1]}"
+    # Fichiers générés au clic seulement, pas à chaque relance de la page
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Télécharger (CSV)", lambda: reports.en_csv(colonnes, lignes),
+                           file_name=f"{nom_fichier}.csv", mime="text/csv")
+    with col2:
+        if reports.PARQUET_DISPONIBLE:
+            st.download_button("Télécharger (Parquet)", lambda: reports.en_parquet(colonnes, lignes),
+                               file_name=f"{nom_fichier}.parquet", mime="application/octet-stream")
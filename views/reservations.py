@@ -0,0 +1,208 @@
+"""Page Gestion des Réservations : liste filtrée et paginée, modification et suppression"""
+import streamlit as st
+import sqlite3
+from datetime import date, datetime
+
+from booking import STATUTS_ARRIVEE, ChambreIndisponible, ReservationInvalide
+from repository import ChambreRepository, HotelRepository, ReservationRepository
+from views.common import get_pool
+
+TAILLES_PAGE = [10, 25, 50, 100]
+
+hotels_repo = HotelRepository(get_pool())
+chambres_repo = ChambreRepository(get_pool())
+reservations_repo = ReservationRepository(get_pool())
+
+st.header("Gestion des Réservations")
+
+# Filtres appliqués côté SQL
+hotels = {"Tous les hôtels": None}
+hotels.update({f"{h.ville} (ID: {h.id_hotel})": h.id_hotel for h in hotels_repo.lister()})
+
+col_f1, col_f2, col_f3, col_f4, col_f5 = st.columns([2, 2, 2, 3, 1])
+with col_f1:
+    filtre_date_min = st.date_input("Du", value=None, key="filtre_date_min")
+with col_f2:
+    filtre_date_max = st.date_input("Au", value=None, key="filtre_date_max")
+with col_f3:
+    filtre_hotel = hotels[st.selectbox("Hôtel", list(hotels.keys()), key="filtre_hotel")]
+with col_f4:
+    filtre_nom = st.text_input("Nom du client", key="filtre_nom").strip()
+with col_f5:
+    taille_page = st.selectbox("Par page", TAILLES_PAGE, index=1, key="taille_page")
+
+# Pile des clés de début de page ; remise à zéro quand les filtres changent
+filtres = (filtre_date_min, filtre_date_max, filtre_hotel, filtre_nom, taille_page)
+if st.session_state.get('reservations_filtres') != filtres:
+    st.session_state.reservations_filtres = filtres
+    st.session_state.reservations_curseurs = [None]
+curseurs = st.session_state.reservations_curseurs
+
+# Une ligne de plus que la page pour savoir s'il existe une page suivante
+reservations = reservations_repo.page(
+    taille_page + 1, apres=curseurs[-1],
+    date_min=filtre_date_min, date_max=filtre_date_max,
+    id_hotel=filtre_hotel, nom_client=filtre_nom
+)
+page_suivante = len(reservations) > taille_page
+reservations = reservations[:taille_page]
+
+col_prec, col_page, col_suiv = st.columns([1, 2, 1])
+with col_prec:
+    if st.button("◀ Précédente", disabled=len(curseurs) == 1):
+        curseurs.pop()
+        st.rerun()
+with col_page:
+    st.write(f"Page {len(curseurs)}")
+with col_suiv:
+    if st.button("Suivante ▶", disabled=not page_suivante):
+        curseurs.append((reservations[-1].date_debut, reservations[-1].id_reservation))
+        st.rerun()
+
+if reservations:
+    st.subheader("Liste des Réservations")
+    for reservation in reservations:
+        with st.expander(f"Réservation #{reservation.id_reservation} - {reservation.nom_client}"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Client:** {reservation.nom_client}")
+                st.write(f"**Dates:** {reservation.date_debut} au {reservation.date_fin}")
+            with col2:
+                st.write(f"**Chambre:** {reservation.chambres}")
+                st.write(f"**Hôtel:** {reservation.villes}")
+                st.write(f"**Arrivée:** {STATUTS_ARRIVEE.get(reservation.arrivee, 'Non pointée')}")
+
+            # Boutons d'action
+            col_edit, col_delete = st.columns(2)
+            with col_edit:
+                if st.button(f"Modifier", key=f"edit_{reservation.id_reservation}"):
+                    st.session_state[f'edit_reservation_{reservation.id_reservation}'] = True
+                    # Utiliser st.rerun() au lieu de st.experimental_rerun()
+                    st.rerun()
+
+            with col_delete:
+                if st.button(f"Supprimer", key=f"delete_{reservation.id_reservation}"):
+                    try:
+                        reservations_repo.supprimer(reservation.id_reservation)
+                        st.success("Réservation supprimée!")
+                        # Utiliser st.rerun() au lieu de st.experimental_rerun()
+                        st.rerun()
+                    except sqlite3.Error as e:
+                        st.error(f"Erreur lors de la suppression: {e}")
+
+            # Pointage à partir de la date d'arrivée (taux de no-show des rapports)
+            if reservation.date_debut <= date.today().isoformat():
+                for colonne, (statut, libelle) in zip(st.columns(2), STATUTS_ARRIVEE.items()):
+                    with colonne:
+                        if st.button(libelle, key=f"{statut}_{reservation.id_reservation}",
+                                     disabled=reservation.arrivee == statut):
+                            try:
+                                reservations_repo.pointer_arrivee(reservation.id_reservation, statut)
+                                st.rerun()
+                            except (ReservationInvalide, sqlite3.Error) as e:
+                                st.error(f"Erreur lors du pointage: {e}")
+
+            # Formulaire de modification (si activé)
+            if st.session_state.get(f'edit_reservation_{reservation.id_reservation}', False):
+                st.subheader("Modifier la Réservation")
+
+                # Récupérer les chambres (uniquement pour la réservation en cours d'édition)
+                chambres_reservation = reservations_repo.chambres(reservation.id_reservation)
+                groupe = len(chambres_reservation) > 1
+
+                with st.form(f"edit_form_{reservation.id_reservation}"):
+                    nouvelle_date_debut = st.date_input(
+                        "Nouvelle date d'arrivée", 
+                        value=datetime.strptime(reservation.date_debut, "%Y-%m-%d").date(),
+                        key=f"date_debut_{reservation.id_reservation}"
+                    )
+                    nouvelle_date_fin = st.date_input(
+                        "Nouvelle date de départ", 
+                        value=datetime.strptime(reservation.date_fin, "%Y-%m-%d").date(),
+                        key=f"date_fin_{reservation.id_reservation}"
+                    )
+
+                    # Une réservation de groupe garde ses chambres ; elles se gèrent une à une ci-dessous
+                    nouvelles_chambres = None
+                    if not groupe:
+                        chambre_options = {f"Chambre {ch.numero}": ch.id_chambre for ch in chambres_repo.lister()}
+                        current_chambre = f"Chambre {reservation.chambres}"
+                        default_index = list(chambre_options.keys()).index(current_chambre) if current_chambre in chambre_options else 0
+
+                        nouvelle_chambre_display = st.selectbox(
+                            "Nouvelle chambre", 
+                            list(chambre_options.keys()),
+                            index=default_index,
+                            key=f"chambre_{reservation.id_reservation}"
+                        )
+                        nouvelles_chambres = [chambre_options[nouvelle_chambre_display]]
+
+                    col_save, col_cancel = st.columns(2)
+                    with col_save:
+                        if st.form_submit_button("Enregistrer"):
+                            try:
+                                reservations_repo.modifier(
+                                    reservation.id_reservation, 
+                                    nouvelle_date_debut, 
+                                    nouvelle_date_fin, 
+                                    nouvelles_chambres
+                                )
+                                st.success("Réservation modifiée avec succès!")
+                                del st.session_state[f'edit_reservation_{reservation.id_reservation}']
+                                st.rerun()
+                            except (ChambreIndisponible, ReservationInvalide, sqlite3.Error) as e:
+                                st.error(f"Erreur lors de la modification: {e}")
+
+                    with col_cancel:
+                        if st.form_submit_button("Annuler"):
+                            del st.session_state[f'edit_reservation_{reservation.id_reservation}']
+                            st.rerun()
+
+                # Ajout et retrait de chambres, sans toucher aux autres chambres de la réservation
+                st.write(f"**Chambres ({len(chambres_reservation)}):**")
+                for ch in chambres_reservation:
+                    col_numero, col_retirer = st.columns([3, 1])
+                    with col_numero:
+                        st.write(f"Chambre {ch.numero}")
+                    with col_retirer:
+                        if groupe and st.button("Retirer", key=f"retirer_{reservation.id_reservation}_{ch.id_chambre}"):
+                            try:
+                                reservations_repo.retirer_chambre(reservation.id_reservation, ch.id_chambre)
+                                st.rerun()
+                            except (ReservationInvalide, sqlite3.Error) as e:
+                                st.error(f"Erreur lors du retrait: {e}")
+
+                chambres_libres = {
+                    f"Chambre {ch.numero} - {ch.ville} ({ch.libelle})": ch.id_chambre
+                    for ch in chambres_repo.disponibles(reservation.date_debut, reservation.date_fin)
+                }
+                if chambres_libres:
+                    col_ajout, col_bouton = st.columns([3, 1])
+                    with col_ajout:
+                        chambre_ajoutee = st.selectbox("Ajouter une chambre", list(chambres_libres.keys()),
+                                                       key=f"ajout_{reservation.id_reservation}")
+                    with col_bouton:
+                        if st.button("Ajouter", key=f"ajouter_{reservation.id_reservation}"):
+                            try:
+                                reservations_repo.ajouter_chambre(reservation.id_reservation,
+                                                                  chambres_libres[chambre_ajoutee])
+                                st.rerun()
+                            except (ChambreIndisponible, ReservationInvalide, sqlite3.Error) as e:
+                                st.error(f"Erreur lors de l'ajout: {e}")
+
+    # Suppression groupée parmi les réservations de la page, en une seule transaction
+    with st.expander("Supprimer plusieurs réservations"):
+        noms = {r.id_reservation: r.nom_client for r in reservations}
+        selection = st.multiselect("Réservations à supprimer", list(noms.keys()),
+                                   format_func=lambda id_reservation: f"#{id_reservation} - {noms[id_reservation]}",
+                                   key="selection_suppression")
+        if st.button("Supprimer la sélection", disabled=not selection, key="supprimer_selection"):
+            try:
+                nombre = reservations_repo.supprimer_plusieurs(selection)
+                st.session_state.pop("selection_suppression", None)
+                st.success(f"{nombre} réservation(s) supprimée(s)")
+                st.rerun()
+            except sqlite3.Error as e:
+                st.error(f"Erreur lors de la suppression: {e}")
+else:
+    st.info("Aucune réservation trouvée")
@@ -0,0 +1,39 @@
+"""Page Chambres Disponibles : chambres libres sur une période et prix du séjour"""
+import streamlit as st
+from datetime import date, timedelta
+
+from repository import ChambreRepository, TarifRepository
+from views.common import get_pool
+
+chambres_repo = ChambreRepository(get_pool())
+tarifs_repo = TarifRepository(get_pool())
+
+st.header("Recherche de Chambres Disponibles")
+
+col1, col2 = st.columns(2)
+with col1:
+    date_debut = st.date_input("Date d'arrivée", value=date.today())
+with col2:
+    date_fin = st.date_input("Date de départ", value=date.today() + timedelta(days=1))
+
+if st.button("Rechercher"):
+    if date_debut >= date_fin:
+        st.error("La date de départ doit être postérieure à la date d'arrivée")
+    else:
+        chambres_dispo = chambres_repo.disponibles(date_debut, date_fin)
+
+        if chambres_dispo:
+            st.success(f"{len(chambres_dispo)} chambre(s) disponible(s)")
+            grille = tarifs_repo.grille_sejour(date_debut, date_fin)
+            nb_nuits = (date_fin - date_debut).days
+            for chambre in chambres_dispo:
+                prix = grille.prix_sejour(chambre.id_hotel, chambre.id_type, date_debut, date_fin)
+                col1, col2, col3 = st.columns([2, 2, 1])
+                with col1:
+                    st.write(f"**Chambre {chambre.numero}** (Étage {chambre.etage})")
+                    st.write(f"{chambre.ville}")
+                with col2:
+                    st.write(f"Type: {chambre.libelle}")
+                    st.write(f"Séjour: {prix:.2f}€ (moy. {prix / nb_nuits:.2f}€/nuit)")
+        else:
+            st.error("Aucune chambre disponible pour cette période")